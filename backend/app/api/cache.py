@@ -0,0 +1,41 @@
+import hashlib
+from typing import Any, Optional
+from fastapi import Request, Response
+
+# Cache-Control per kind of route.
+# Catalog data is the same for everyone, so shared caches may keep it, but exercises
+# can be edited, so it is only served unchecked for a minute; per-user data must
+# always be revalidated. Revalidation is cheap thanks to the ETag.
+CACHE_POLICIES = {
+    "catalog": "public, max-age=60, must-revalidate",
+    "private": "private, no-cache",
+}
+
+def compute_etag(*parts: Any) -> str:
+    """
+    Weak ETag built from whatever identifies the current state of a response
+    (document update times, version counters, query params...).
+    """
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).hexdigest()[:20]
+    return f'W/"{digest}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    # Weak comparison: ignore the W/ prefix on both sides
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+def check_not_modified(request: Request, response: Response, etag: str, policy: str = "private") -> Optional[Response]:
+    """
+    Set ETag/Cache-Control on `response` and return a 304 response if the
+    client already has this version. Endpoints return it as-is when not None.
+    """
+    headers = {"ETag": etag, "Cache-Control": CACHE_POLICIES[policy]}
+    response.headers.update(headers)
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return None
@@ -16,6 +16,23 @@ reusable_oauth2 = OAuth2PasswordBearer(
     tokenUrl=f"{settings.API_V1_STR}/login/access-token"
 )
 
+def get_user_from_token(db: firestore.Client, token: str) -> Optional[User]:
+    """
+    Resolve a JWT to its user, or None if the token is invalid.
+    Used directly by WebSocket endpoints, which cannot send an Authorization header.
+    """
+    try:
+        payload = jwt.decode(
+            token, settings.SECRET_KEY, algorithms=[security.ALGORITHM]
+        )
+        token_data = payload.get("sub")
+    except (JWTError, ValidationError):
+        return None
+    if not token_data:
+        return None
+    # token_data is string (user_id)
+    return crud.get(db, id=token_data)
+
 def get_current_user(
     db: firestore.Client = Depends(get_db), token: str = Depends(reusable_oauth2)
 ) -> User:
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, users, routines, tracking, diet, social, nutrition, exercises, notifications
+from app.api.v1.endpoints import auth, users, routines, tracking, diet, social, nutrition, exercises, notifications, leaderboard
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
@@ -11,4 +11,5 @@ api_router.include_router(diet.router, prefix="/diets", tags=["diet"])
 api_router.include_router(nutrition.router, prefix="/nutrition", tags=["nutrition"])
 api_router.include_router(social.router, prefix="/social", tags=["social"])
 api_router.include_router(notifications.router, prefix="/notifications", tags=["notifications"])
+api_router.include_router(leaderboard.router, prefix="/leaderboard", tags=["leaderboard"])
 api_router.include_router(auth.router, tags=["login"])
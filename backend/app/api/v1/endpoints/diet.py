@@ -1,12 +1,13 @@
 import unicodedata
 from firebase_admin import firestore as firebase_firestore
 from starlette.concurrency import run_in_threadpool
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from typing import List, Any
 from app.api.deps import get_current_user
 from app.schemas.user import User
 from app.schemas.diet import DietPlan, DietPlanCreate, FoodItem
 from app.core.config import settings
+from app.api.cache import CACHE_POLICIES
 import uuid
 from datetime import datetime
 
@@ -23,6 +24,7 @@ def normalize(text: str) -> str:
 
 @router.get("/search", response_model=List[FoodItem])
 async def search_food(
+    response: Response,
     q: str = Query(..., min_length=2),
     page: int = 1
 ):
@@ -30,6 +32,8 @@ async def search_food(
     Search for food in the local Firestore 'foods' database.
     Falls back to a generic item if nothing is found.
     """
+    # The foods catalog is only changed by the seed scripts
+    response.headers["Cache-Control"] = CACHE_POLICIES["catalog"]
     def _search():
         db = firebase_firestore.client()
         q_normalized = normalize(q)
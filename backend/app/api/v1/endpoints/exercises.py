@@ -1,22 +1,32 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from google.cloud import firestore
 
+from app.api import deps
 from app.db.session import get_db
 from app.schemas import exercise as schemas
 from app.services.exercise import exercise as crud
+from app.api.cache import compute_etag, check_not_modified
 
 router = APIRouter()
 
 @router.get("/", response_model=List[schemas.Exercise])
 def read_exercises(
+    request: Request,
+    response: Response,
     db: firestore.Client = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
 ):
     """
     Retrieve exercises.
+    Cacheable: revalidated with an ETag built from the catalog version.
     """
+    etag = compute_etag("exercises", crud.get_catalog_version(db), skip, limit)
+    not_modified = check_not_modified(request, response, etag, policy="catalog")
+    if not_modified:
+        return not_modified
+
     exercises = crud.get_multi(db, skip=skip, limit=limit)
     return exercises
 
@@ -31,3 +41,21 @@ def create_exercise(
     """
     exercise = crud.create(db=db, obj_in=exercise_in)
     return exercise
+
+@router.put("/{exercise_id}", response_model=schemas.Exercise)
+def update_exercise(
+    *,
+    db: firestore.Client = Depends(get_db),
+    exercise_id: str,
+    exercise_in: schemas.ExerciseUpdate,
+    current_user: Any = Depends(deps.get_current_active_user),
+):
+    """
+    Update an exercise. Routines showing it are patched to the new details.
+    The catalog is shared, so only admins may edit it.
+    """
+    if not getattr(current_user, 'is_admin', False):
+        raise HTTPException(status_code=403, detail="Not authorized to update exercises")
+    if not crud.get(db, id=exercise_id):
+        raise HTTPException(status_code=404, detail="Exercise not found")
+    return crud.update(db, id=exercise_id, obj_in=exercise_in)
@@ -0,0 +1,92 @@
+from datetime import date
+from typing import Any
+from fastapi import APIRouter, Depends, HTTPException, Query
+from google.cloud import firestore
+
+from app.db.session import get_db
+from app.schemas import leaderboard as schemas
+from app.schemas.user import User
+from app.core.challenges import METRICS, PERIODS
+from app.services.challenges import challenges
+from app.services.leaderboard import leaderboard as crud_leaderboard, friends_leaderboard
+from app.api import deps
+
+router = APIRouter()
+
+@router.get("/global", response_model=schemas.LeaderboardPage)
+def read_global_leaderboard(
+    db: firestore.Client = Depends(get_db),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Page of the global XP leaderboard, highest XP first.
+    """
+    return crud_leaderboard.top(db, offset=offset, limit=limit)
+
+@router.get("/global/me", response_model=schemas.LeaderboardPosition)
+def read_my_global_position(
+    db: firestore.Client = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Current user's rank and percentile in the global leaderboard.
+    """
+    return crud_leaderboard.position(db, current_user.id, current_user.xp or 0)
+
+@router.get("/friends", response_model=schemas.LeaderboardPage)
+def read_friends_leaderboard(
+    db: firestore.Client = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Current user ranked against their mutual follows.
+    """
+    return friends_leaderboard.get(db, current_user)
+
+def _check_challenge(period: str, metric: str) -> None:
+    if period not in PERIODS or metric not in METRICS:
+        raise HTTPException(status_code=404, detail="Challenge not found")
+
+@router.get("/challenges/archive/{window}", response_model=schemas.ChallengeArchive)
+def read_challenge_archive(
+    window: str,
+    db: firestore.Client = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Final standings of a finished window (e.g. 2024-W07 or 2024-02).
+    """
+    archive = challenges.get_archive(db, window)
+    if not archive:
+        raise HTTPException(status_code=404, detail="Challenge window not archived")
+    return archive
+
+@router.get("/challenges/{period}/{metric}", response_model=schemas.ChallengePage)
+def read_challenge_standings(
+    period: str,
+    metric: str,
+    db: firestore.Client = Depends(get_db),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Current weekly or monthly challenge (period: week|month, metric: volume|sessions|calories).
+    """
+    _check_challenge(period, metric)
+    return challenges.standings(db, period, metric, date.today(), offset=offset, limit=limit)
+
+@router.get("/challenges/{period}/{metric}/me", response_model=schemas.ChallengePosition)
+def read_my_challenge_position(
+    period: str,
+    metric: str,
+    db: firestore.Client = Depends(get_db),
+    current_user: User = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Current user's rank in the current window of a challenge.
+    """
+    _check_challenge(period, metric)
+    return challenges.position(db, period, metric, date.today(), current_user.id)
@@ -1,21 +1,30 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from google.cloud import firestore
 import pytz
 from datetime import datetime
 
 from app.db.session import get_db
 from app.api import deps
+from app.api.cache import compute_etag, check_not_modified
+from app.services.user import user as crud_user
 from app.schemas.notification import Notification
 
 router = APIRouter()
 
 @router.get("/", response_model=List[Notification])
 def get_notifications(
+    request: Request,
+    response: Response,
     db: firestore.Client = Depends(get_db),
     current_user: Any = Depends(deps.get_current_active_user),
     limit: int = 30
 ):
+    etag = compute_etag(current_user.id, current_user.cache_versions.get("notifications", 0), limit)
+    not_modified = check_not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+
     docs = db.collection("notifications")\
         .where(filter=firestore.FieldFilter("user_id", "==", current_user.id))\
         .order_by("created_at", direction=firestore.Query.DESCENDING)\
@@ -44,5 +53,6 @@ def mark_read(
         raise HTTPException(status_code=403, detail="Not authorized")
     
     doc_ref.update({"read": True})
+    crud_user.bump_cache_version(db, current_user.id, "notifications")
     data["read"] = True
     return Notification(id=doc.id, **data)
@@ -1,100 +1,144 @@
 from fastapi import APIRouter, Depends, HTTPException, Body
-from typing import Any
+from typing import Any, Optional
 from app.api.deps import get_current_user
 from app.schemas.user import User
-from app.schemas.nutrition import NutritionLogCreate, DailyNutritionStats, NutritionLogBase
-from firebase_admin import firestore
-from datetime import datetime
+from app.schemas.nutrition import NutritionLogCreate, NutritionBulkLogCreate, DailyNutritionStats, NutritionHistory
+from google.cloud import firestore
+from datetime import date, datetime, timedelta
 
-router = APIRouter()
+from app.db.session import get_db
+from app.core.periods import month_key, week_key
+from app.services.nutrition import nutrition_log as crud_nutrition, summarize_days
+
+MAX_HISTORY_DAYS = 731
 
-def get_nutrition_ref(user_id: str, date_str: str):
-    return firestore.client().collection('users').document(user_id).collection('nutrition_logs').document(date_str)
+router = APIRouter()
 
 @router.get("/today", response_model=DailyNutritionStats)
 async def get_today_nutrition(
+    db: firestore.Client = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
-    print(f"DEBUG: get_today_nutrition called for user {current_user.id}")
     """
     Get nutrition stats for today.
     """
     date_str = datetime.now().strftime("%Y-%m-%d")
-    doc_ref = get_nutrition_ref(current_user.id, date_str)
-    doc = doc_ref.get()
-    
+    data = crud_nutrition.get_day(db, current_user.id, date_str)
+
     # Get user goal (default 2000 if not set)
     user_goal = current_user.daily_calorie_goal if hasattr(current_user, 'daily_calorie_goal') and current_user.daily_calorie_goal else 2000
 
-    if not doc.exists:
+    if not data:
         return DailyNutritionStats(date=date_str, goal_calories=user_goal)
-    
-    data = doc.to_dict()
+
     return DailyNutritionStats(goal_calories=user_goal, **data)
 
 @router.post("/log", response_model=DailyNutritionStats)
 async def log_food(
     log: NutritionLogCreate,
+    db: firestore.Client = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
     """
     Log a food item consumed today.
+    Totals are incremented server-side, so concurrent logs from different devices are never lost.
     """
     date_str = datetime.now().strftime("%Y-%m-%d")
-    doc_ref = get_nutrition_ref(current_user.id, date_str)
-    doc = doc_ref.get()
+    user_goal = current_user.daily_calorie_goal if hasattr(current_user, 'daily_calorie_goal') and current_user.daily_calorie_goal else 2000
 
+    # Single blind write: no read needed before appending
+    crud_nutrition.log_entries(db, current_user.id, date_str, [crud_nutrition.build_entry(log)], goal=user_goal)
+
+    # Read back for the response (the client caches it as today's state)
+    data = crud_nutrition.get_day(db, current_user.id, date_str)
+    return DailyNutritionStats(goal_calories=user_goal, **data)
+
+@router.post("/log/bulk", response_model=DailyNutritionStats)
+async def log_food_bulk(
+    bulk_in: NutritionBulkLogCreate,
+    db: firestore.Client = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Log a whole meal or a planned diet day at once.
+    Accepts explicit `logs` and/or `diet_day` (a day of the active diet), all saved in one write.
+    """
+    date_str = datetime.now().strftime("%Y-%m-%d")
     user_goal = current_user.daily_calorie_goal if hasattr(current_user, 'daily_calorie_goal') and current_user.daily_calorie_goal else 2000
-    
-    new_log = log.dict()
-    
-    if not doc.exists:
-        data = {
-            "date": date_str,
-            "total_calories": log.calories,
-            "total_protein": log.protein,
-            "total_carbs": log.carbs,
-            "total_fat": log.fat,
-            "logs": [new_log]
-        }
-        doc_ref.set(data)
-    else:
-        current_data = doc.to_dict()
-        data = {
-            "total_calories": current_data.get("total_calories", 0) + log.calories,
-            "total_protein": current_data.get("total_protein", 0) + log.protein,
-            "total_carbs": current_data.get("total_carbs", 0) + log.carbs,
-            "total_fat": current_data.get("total_fat", 0) + log.fat,
-            "logs": firestore.ArrayUnion([new_log])
-        }
-        doc_ref.update(data)
-        # Merge for return - BUT don't use the ArrayUnion object for the response list
-        # current_data has the OLD logs. We just want to append the new one for the response.
-        current_data.update({
-            "total_calories": data["total_calories"],
-            "total_protein": data["total_protein"],
-            "total_carbs": data["total_carbs"],
-            "total_fat": data["total_fat"]
-        })
-        # Safely construct logs list for response
-        existing_logs = current_data.get("logs", [])
-        if isinstance(existing_logs, list):
-             current_data["logs"] = existing_logs + [new_log]
-        else:
-             # Fallback if somehow it's verified as something else, though it should be list from to_dict
-             current_data["logs"] = [new_log]
-        
-        data = current_data
 
+    entries = [crud_nutrition.build_entry(log) for log in bulk_in.logs]
+
+    if bulk_in.diet_day:
+        if not current_user.current_diet_id:
+            raise HTTPException(status_code=400, detail="No active diet selected")
+        diet_doc = db.collection("diets").document(current_user.current_diet_id).get()
+        if not diet_doc.exists:
+            raise HTTPException(status_code=404, detail="Diet plan not found")
+        diet_entries = crud_nutrition.entries_from_diet_day(diet_doc.to_dict(), bulk_in.diet_day, meal=bulk_in.meal)
+        if diet_entries is None:
+            raise HTTPException(status_code=404, detail=f"Day '{bulk_in.diet_day}' not found in active diet")
+        entries.extend(diet_entries)
+
+    if not entries:
+        raise HTTPException(status_code=400, detail="Nothing to log")
+
+    crud_nutrition.log_entries(db, current_user.id, date_str, entries, goal=user_goal)
+
+    data = crud_nutrition.get_day(db, current_user.id, date_str)
     return DailyNutritionStats(goal_calories=user_goal, **data)
 
+@router.get("/history", response_model=NutritionHistory)
+async def get_nutrition_history(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    granularity: str = "day",
+    db: firestore.Client = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+) -> Any:
+    """
+    Nutrition history for a date range (default: last 90 days), grouped by day, week or month.
+    Served from weekly/monthly rollups, so a full year costs about a dozen reads.
+    """
+    if granularity not in ("day", "week", "month"):
+        raise HTTPException(status_code=400, detail="granularity must be 'day', 'week' or 'month'")
+    end = end or datetime.now().date()
+    start = start or end - timedelta(days=89)
+    if start > end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if (end - start).days >= MAX_HISTORY_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {MAX_HISTORY_DAYS} days")
+
+    user_goal = current_user.daily_calorie_goal if hasattr(current_user, 'daily_calorie_goal') and current_user.daily_calorie_goal else 2000
+    days = crud_nutrition.get_history(db, current_user.id, start, end, goal=user_goal)
+
+    # Group day points into the requested buckets
+    grouped = {}
+    for d in days:
+        day = date.fromisoformat(d["date"])
+        if granularity == "week":
+            period = week_key(day)
+        elif granularity == "month":
+            period = month_key(day)
+        else:
+            period = d["date"]
+        grouped.setdefault(period, []).append(d)
+
+    return {
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "granularity": granularity,
+        "summary": {"period": f"{start.isoformat()}/{end.isoformat()}", **summarize_days(days)},
+        "buckets": [{"period": period, **summarize_days(group)} for period, group in grouped.items()],
+    }
+
 @router.post("/goal")
 async def update_calorie_goal(
     goal: int = Body(..., embed=True),
+    db: firestore.Client = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
     """
     Update the user's daily calorie goal.
     """
-    firestore.client().collection('users').document(current_user.id).update({"daily_calorie_goal": goal})
+    db.collection('users').document(current_user.id).update({"daily_calorie_goal": goal})
     return {"status": "success", "goal": goal}
@@ -1,10 +1,12 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from google.api_core.exceptions import FailedPrecondition
 from google.cloud import firestore
 
 from app.db.session import get_db
 from app.schemas import routine as schemas
 from app.services.routine import routine as crud
+from app.services.routine_similarity import routine_similarity
 from app.api import deps
 
 # Use deps to get current user if needed for ownership check?
@@ -65,8 +67,9 @@ def create_routine(
     routine = crud.create(db=db, obj_in=routine_data)
     
     # Process weekly_plan and save to routine_exercises
+    rows = []
+    batch = db.batch()
     if weekly_plan:
-        batch = db.batch()
         day_map = {
             "Monday": 1, "Tuesday": 2, "Wednesday": 3, "Thursday": 4, 
             "Friday": 5, "Saturday": 6, "Sunday": 7
@@ -93,14 +96,16 @@ def create_routine(
                     "reps_display": ex.get("reps") # store original string for UI just in case
                 }
                 batch.set(new_doc, ex_data)
-                
-        batch.commit()
-    
-    # We should return the routine with exercises to match the response_model
-    # The crud.create returns a basic model. We can fetch it full or just return it as is.
-    # We'll fetch it full so it matches what GET /routines/{id} returns
-    routine_with_ex = crud.get_with_exercises(db, id=routine.id)
-    return routine_with_ex
+                rows.append(dict(ex_data, id=new_doc.id))
+
+    # The denormalized snapshot goes out in the same batch as the rows
+    snapshot_fields = crud.snapshot_fields(db, rows, version=1)
+    batch.update(db.collection(crud.collection_name).document(routine.id), snapshot_fields)
+    batch.commit()
+
+    routine_data = dict(routine.model_dump(), **snapshot_fields)
+    routine_similarity.update(routine.id, routine_data)
+    return crud.detail(routine.id, routine_data)
 
 @router.get("/{routine_id}", response_model=schemas.Routine)
 def read_routine(
@@ -115,6 +120,56 @@ def read_routine(
         raise HTTPException(status_code=404, detail="Routine not found")
     return routine
 
+@router.patch("/{routine_id}", response_model=schemas.Routine)
+def patch_routine(
+    routine_id: str,
+    patch_in: schemas.RoutinePatch,
+    db: firestore.Client = Depends(get_db),
+    current_user: Any = Depends(deps.get_current_active_user),
+):
+    """
+    Edit a routine in place: add, update, remove or move single exercises,
+    replace or clear one day, and change name / description / visibility.
+    Ops apply in order as one batch.
+    """
+    routine_doc = db.collection(crud.collection_name).document(routine_id).get()
+    if not routine_doc.exists:
+        raise HTTPException(status_code=404, detail="Routine not found")
+    if routine_doc.to_dict().get("creator_id") != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+
+    fields = patch_in.model_dump(include={"name", "description", "is_public"}, exclude_none=True)
+    # Fields sent as null are kept, so an update can clear them
+    ops = [op.model_dump(exclude_unset=True) for op in patch_in.ops]
+    try:
+        data = crud.patch(db, routine_id, ops, fields=fields, expected_version=patch_in.expected_version)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except FailedPrecondition as e:
+        raise HTTPException(status_code=409, detail=e.message)
+    if data is None:
+        raise HTTPException(status_code=404, detail="Routine not found")
+    routine_similarity.update(routine_id, data)
+    return crud.detail(routine_id, data)
+
+@router.get("/{routine_id}/similar", response_model=List[schemas.SimilarRoutine])
+def read_similar_routines(
+    routine_id: str,
+    limit: int = Query(10, ge=1, le=50),
+    db: firestore.Client = Depends(get_db),
+):
+    """
+    Public routines most similar to this one (shared exercises and muscle
+    groups, weighted by sets), flagging near-identical ones as duplicates.
+    """
+    routine_doc = db.collection(crud.collection_name).document(routine_id).get()
+    if not routine_doc.exists:
+        raise HTTPException(status_code=404, detail="Routine not found")
+    data = routine_doc.to_dict()
+    if data.get("snapshot") is None and not data.get("source_routine_id"):
+        data = crud.rebuild_snapshot(db, routine_id) or data
+    return routine_similarity.similar(db, routine_id, crud.resolve_snapshot(db, data), limit=limit)
+
 @router.delete("/{routine_id}", response_model=dict)
 def delete_routine(
     routine_id: str,
@@ -124,28 +179,24 @@ def delete_routine(
     """
     Delete a routine by ID and all its associated exercises.
     """
-    routine = crud.get_with_exercises(db, id=routine_id)
-    if not routine:
+    routine_doc = db.collection(crud.collection_name).document(routine_id).get()
+    if not routine_doc.exists:
         raise HTTPException(status_code=404, detail="Routine not found")
+    routine = routine_doc.to_dict()
         
     # Optional: check ownership here
     if routine.get("creator_id") != current_user.id:
         raise HTTPException(status_code=403, detail="Not enough permissions")
 
-    # 1. Delete associated exercises in a batch
+    # 1. Delete associated exercises and the routine in a batch; the last
+    # snapshot is archived for copy-on-write imports that still reference it
     batch = db.batch()
+    crud.archive_snapshot(db, batch, routine_id, routine.get("snapshot"))
     exercises_ref = db.collection("routine_exercises").where("routine_id", "==", routine_id).stream()
     for ex_doc in exercises_ref:
         batch.delete(ex_doc.reference)
-        
-    # Wait to commit batch, then delete the routine
+    batch.delete(routine_doc.reference)
     batch.commit()
-    
-    # 2. Delete the specific routine doc
-    try:
-        crud.remove(db=db, id=routine_id)
-    except Exception as e:
-        # Fallback if crud.remove doesn't handle str IDs smoothly
-        db.collection(crud.collection_name).document(routine_id).delete()
+    routine_similarity.remove(routine_id)
         
     return {"status": "success", "message": "Routine deleted"}
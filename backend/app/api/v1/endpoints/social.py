@@ -1,5 +1,5 @@
 from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from fastapi.encoders import jsonable_encoder
 from google.cloud import firestore
 import uuid
@@ -7,7 +7,13 @@ import uuid
 from app.db.session import get_db
 from app.services.diet import diet as diet_crud
 from app.services.routine import routine as routine_crud
+from app.services.notification import notification as crud_notification
+from app.services.user import user as crud_user
+from app.services.social import get_mutual_follow_ids
+from app.services.achievements import achievements
+from app.core.achievements import CONTENT_IMPORTED, POST_RATED, USER_FOLLOWED, USER_UNFOLLOWED
 from app.api import deps
+from app.api.cache import compute_etag, check_not_modified
 from app.schemas.diet_social import Post as PostSchema, PostCreate, Rating as RatingSchema, RatingCreate, Comment, CommentCreate
 from app.schemas.user import PublicUserProfile
 from datetime import datetime
@@ -31,15 +37,7 @@ def get_social_feed(
         posts_ref = db.collection("posts")
         target_creator_ids = None
         if filter == 'friends':
-            user_id = current_user.id
-            follows_a = db.collection("follows").where(filter=firestore.FieldFilter("follower_id", "==", user_id)).stream()
-            following_ids = {d.to_dict().get("following_id") for d in follows_a}
-            
-            follows_b = db.collection("follows").where(filter=firestore.FieldFilter("following_id", "==", user_id)).stream()
-            follower_ids = {d.to_dict().get("follower_id") for d in follows_b}
-            
-            mutuals = following_ids.intersection(follower_ids)
-            target_creator_ids = list(mutuals)
+            target_creator_ids = list(get_mutual_follow_ids(db, current_user.id))
             
             if not target_creator_ids:
                 return []
@@ -132,7 +130,7 @@ def toggle_like(
         # Notify
         creator_id = data.get("creator_id")
         if creator_id and creator_id != current_user.id:
-            db.collection("notifications").add({
+            crud_notification.notify(db, {
                 "user_id": creator_id,
                 "actor_id": current_user.id,
                 "actor_name": current_user.username,
@@ -205,6 +203,8 @@ def rate_post(
                 count_field: user_data.get(count_field, 0) + 1
             })
 
+    achievements.emit(db, POST_RATED, current_user.id, post_id=post_id)
+
     return {"success": True, "rating_sum": new_sum, "rating_count": new_count}
 
 
@@ -220,7 +220,7 @@ def import_content(
     db: firestore.Client = Depends(get_db),
     current_user: Any = Depends(deps.get_current_active_user),
 ):
-    """Clones a routine or diet to the current user's library.
+    """Clones a routine or diet to the current user's library (routines copy-on-write).
     Requires the user to have rated the post first.
     """
     # ── Rating gate ──
@@ -235,16 +235,19 @@ def import_content(
     try:
         if content_type == "routine":
             print(f"INFO: Starting routine import for content_id={content_id} by user={current_user.id}")
-            original = routine_crud.get(db=db, id=content_id)
-            if not original:
+            # Copy-on-write: the import only references the source's current
+            # version and is materialized when the importer edits it
+            found = routine_crud.import_reference(db, content_id)
+            if not found:
                 print(f"ERROR: Routine {content_id} not found in DB")
                 raise HTTPException(status_code=404, detail="Original routine not found")
+            original, reference, source_snapshot = found
 
             # Use jsonable_encoder to ensure proper serialization (avoids datetime/Pydantic issues)
-            clone_data = jsonable_encoder(original)
+            clone_data = jsonable_encoder({k: v for k, v in original.items() if k not in ("snapshot", "exercise_ids")})
             
             # Strip fields that should not be copied
-            for field in ["id", "exercises", "average_rating", "rating_count"]:
+            for field in ["id", "exercises", "average_rating", "rating_count", "version"]:
                 clone_data.pop(field, None)
             
             clone_data["name"] = f"{clone_data.get('name', 'Routine')} (Importada)"
@@ -254,45 +257,31 @@ def import_content(
             clone_data["average_rating"] = 0.0
             clone_data["rating_count"] = 0
 
-            print(f"INFO: Creating cloned routine with data keys: {list(clone_data.keys())}")
-            new_routine = routine_crud.create(db=db, obj_in=clone_data)
-            print(f"INFO: New routine created with id={new_routine.id}")
-
-            # Exercises are stored in the ROOT 'routine_exercises' collection
-            exercises_stream = db.collection("routine_exercises").where(
-                filter=firestore.FieldFilter("routine_id", "==", content_id)
-            ).stream()
+            clone_data.update(reference)
 
-            new_batch = db.batch()
-            new_r_exercises_ref = db.collection("routine_exercises")
+            print(f"INFO: Creating imported routine with data keys: {list(clone_data.keys())}")
+            new_routine_ref = db.collection(routine_crud.collection_name).document()
+            new_routine_ref.set(clone_data)
+            new_routine = {"id": new_routine_ref.id}
+            count = sum(len(day["exercises"]) for day in source_snapshot.get("days", []))
+            print(f"INFO: Imported routine '{new_routine['id']}' ({count} exercises) from {reference['source_routine_id']} v{reference['source_version']}")
 
-            count = 0
-            for ex in exercises_stream:
-                ex_data = ex.to_dict()
-                ex_data["routine_id"] = new_routine.id
-                new_ex_ref = new_r_exercises_ref.document()
-                new_batch.set(new_ex_ref, ex_data)
-                count += 1
-
-            if count > 0:
-                new_batch.commit()
-            print(f"INFO: Imported routine '{new_routine.id}' with {count} exercises")
-
-            creator_id = original.creator_id
+            creator_id = original.get("creator_id")
             if creator_id and creator_id != current_user.id:
-                db.collection("notifications").add({
+                crud_notification.notify(db, {
                     "user_id": creator_id,
                     "actor_id": current_user.id,
                     "actor_name": current_user.username,
                     "actor_avatar": getattr(current_user, 'profile_picture', None),
                     "type": "import",
-                    "content_id": new_routine.id,
+                    "content_id": new_routine["id"],
                     "message": f"{current_user.username} ha importado tu rutina.",
                     "read": False,
                     "created_at": datetime.now(pytz.utc)
                 })
+            achievements.emit(db, CONTENT_IMPORTED, current_user.id, content_type="routine")
 
-            return {"success": True, "new_id": new_routine.id, "type": "routine", "exercise_count": count}
+            return {"success": True, "new_id": new_routine["id"], "type": "routine", "exercise_count": count}
 
         elif content_type == "diet":
             original = diet_crud.get(db=db, id=content_id)
@@ -311,7 +300,7 @@ def import_content(
 
             creator_id = getattr(original, 'creator_id', getattr(original, 'user_id', None))
             if creator_id and creator_id != current_user.id:
-                db.collection("notifications").add({
+                crud_notification.notify(db, {
                     "user_id": creator_id,
                     "actor_id": current_user.id,
                     "actor_name": current_user.username,
@@ -322,6 +311,7 @@ def import_content(
                     "read": False,
                     "created_at": datetime.now(pytz.utc)
                 })
+            achievements.emit(db, CONTENT_IMPORTED, current_user.id, content_type="diet")
 
             return {"success": True, "new_id": new_diet.id, "type": "diet"}
 
@@ -350,29 +340,10 @@ def preview_content(
 ):
     """Returns detailed content (exercises/meals) so user can preview before importing."""
     if content_type == "routine":
-        routine_doc = db.collection("routines").document(content_id).get()
-        if not routine_doc.exists:
+        # One read: exercises come from the routine's denormalized snapshot
+        routine_data = routine_crud.get_with_exercises(db, id=content_id)
+        if not routine_data:
             raise HTTPException(status_code=404, detail="Routine not found")
-        routine_data = routine_doc.to_dict()
-        routine_data["id"] = content_id
-
-        # Fetch exercises from root collection
-        exs_stream = db.collection("routine_exercises").where(
-            filter=firestore.FieldFilter("routine_id", "==", content_id)
-        ).stream()
-
-        exercises = []
-        for doc in exs_stream:
-            ex_data = doc.to_dict()
-            ex_data["id"] = doc.id
-            # Enrich with exercise details
-            if "exercise_id" in ex_data:
-                ex_doc = db.collection("exercises").document(ex_data["exercise_id"]).get()
-                if ex_doc.exists:
-                    ex_data["exercise"] = {"id": ex_doc.id, **ex_doc.to_dict()}
-            exercises.append(ex_data)
-
-        routine_data["exercises"] = exercises
         return routine_data
 
     elif content_type == "diet":
@@ -438,7 +409,7 @@ def add_comment(
 
     creator_id = post_data.get("creator_id")
     if creator_id and creator_id != current_user.id:
-        db.collection("notifications").add({
+        crud_notification.notify(db, {
             "user_id": creator_id,
             "actor_id": current_user.id,
             "actor_name": current_user.username,
@@ -460,6 +431,8 @@ def add_comment(
 @router.get("/users/{user_id}/public", response_model=PublicUserProfile)
 def get_public_profile(
     user_id: str,
+    request: Request,
+    response: Response,
     db: firestore.Client = Depends(get_db),
     current_user: Any = Depends(deps.get_current_active_user),
 ):
@@ -467,6 +440,13 @@ def get_public_profile(
     if not user_doc.exists:
         raise HTTPException(status_code=404, detail="User not found")
 
+    # Follows and ratings touch the profile owner's document, so its update_time
+    # plus the viewer's own follow version identify this response
+    etag = compute_etag(user_id, user_doc.update_time, current_user.id, current_user.cache_versions.get("following", 0))
+    not_modified = check_not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
+
     user_data = user_doc.to_dict()
 
     # Calculate avg ratings from user fields
@@ -553,8 +533,11 @@ def follow_user(
         "following_id": user_id,
         "created_at": datetime.now(pytz.utc),
     })
+    crud_user.bump_cache_version(db, current_user.id, "following")
+    crud_user.bump_cache_version(db, user_id, "followers")
+    achievements.emit(db, USER_FOLLOWED, user_id)
 
-    db.collection("notifications").add({
+    crud_notification.notify(db, {
         "user_id": user_id,
         "actor_id": current_user.id,
         "actor_name": current_user.username,
@@ -584,6 +567,11 @@ def unfollow_user(
         doc.reference.delete()
         deleted += 1
 
+    if deleted:
+        crud_user.bump_cache_version(db, current_user.id, "following")
+        crud_user.bump_cache_version(db, user_id, "followers")
+        achievements.emit(db, USER_UNFOLLOWED, user_id)
+
     return {"success": True, "action": "unfollowed", "deleted": deleted}
 
 # ─────────────────────────────────────────
@@ -1,16 +1,36 @@
+import calendar
+import logging
 from typing import Any, List, Optional
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from pydantic import ValidationError
+from starlette.concurrency import run_in_threadpool
 from google.cloud import firestore
 
 from app.db.session import get_db
 from app.schemas import tracking as schemas
+from app.schemas.analytics import TrainingAnalytics
+from app.schemas.records import PersonalRecord, RecentPerformance
 from app.schemas.social import ContentRatingCreate, ContentRatingUpdate
 from app.services.tracking import scheduled_workout as crud_sw
-from app.services.social import content_rating as crud_rating
+from app.services.activity import activity
+from app.services.analytics import analytics
+from app.services.exercise_history import MAX_RECENT_PERFORMANCES, exercise_history
+from app.services.records import RecordConflict, personal_records
 from app.services.routine import routine as crud_routine
+from app.core.schedule import MAX_RULE_DAYS
+from app.services.schedule import schedule_rule
+from app.services.streaks import streaks
+from app.services.summary import daily_summary
+from app.services.live_session import live_sessions
+from app.services.session import log_workout_session
 from app.api import deps
 from datetime import date, datetime
-from app.core.gamification import calculate_level
+
+logger = logging.getLogger(__name__)
+
+# Longest scheduled_date range a list request may cover
+MAX_RANGE_DAYS = 366
 
 router = APIRouter()
 
@@ -21,12 +41,27 @@ def read_scheduled_workouts(
     db: firestore.Client = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
-    user_id: Optional[str] = None
+    user_id: Optional[str] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
 ):
     """
-    Retrieve scheduled workouts. Optional filter by user_id.
+    Retrieve scheduled workouts. Optional filter by user_id, and by a
+    scheduled_date range (inclusive, oldest first) when both dates are given;
+    ranges include the not-yet-started occurrences of recurring schedules.
     """
     if user_id:
+        if start_date and end_date:
+            if end_date < start_date:
+                raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+            if (end_date - start_date).days >= MAX_RANGE_DAYS:
+                raise HTTPException(status_code=400, detail=f"Range cannot exceed {MAX_RANGE_DAYS} days")
+            workouts = crud_sw.get_by_date_range(db, user_id, start_date, end_date, limit=limit)
+            stored = {w.id for w in workouts}
+            # Materialized occurrences are among `stored`, so this many virtual ones always suffice
+            occurrences = schedule_rule.occurrences(db, user_id, start_date, end_date, limit=limit + len(stored))
+            virtual = [w for w in occurrences if w.id not in stored]
+            return sorted(workouts + virtual, key=lambda w: w.scheduled_date)[:limit]
         return crud_sw.get_by_user(db, user_id=user_id, skip=skip, limit=limit)
     return crud_sw.get_multi(db, skip=skip, limit=limit)
 
@@ -68,7 +103,23 @@ def create_scheduled_workout(
     # `return self.model(id=..., **obj_in_data)`.
     # Yes, it should work.
     
-    return crud_sw.create(db=db, obj_in=workout_data)
+    workout = crud_sw.create(db=db, obj_in=workout_data)
+
+    # Keep the dashboard summary of that day in sync
+    routine = crud_routine.get(db, id=workout_in.routine_id) if workout_in.routine_id else None
+    daily_summary.record_workout(
+        db,
+        user_id=current_user.id,
+        date_str=workout.scheduled_date.isoformat(),
+        routine_id=workout_in.routine_id,
+        routine_name=routine.name if routine else None,
+        completed=workout.status == 'completed',
+        calories_burned=workout.calories_burned,
+        duration_seconds=workout.duration_seconds,
+    )
+    if workout.status == 'completed':
+        activity.record(db, current_user.id, workout.scheduled_date)
+    return workout
 
 @router.put("/{workout_id}", response_model=schemas.ScheduledWorkout)
 def update_scheduled_workout(
@@ -76,17 +127,127 @@ def update_scheduled_workout(
     db: firestore.Client = Depends(get_db),
     workout_id: str,
     workout_in: schemas.ScheduledWorkoutUpdate,
+    current_user: Any = Depends(deps.get_current_active_user),
 ):
     """
-    Update a scheduled workout (e.g. mark as completed).
+    Update one of the user's scheduled workouts (e.g. mark as completed).
+    Editing an occurrence of a recurring schedule stores it first.
     """
-    workout = crud_sw.get(db, id=workout_id)
-    if not workout:
+    before = schedule_rule.materialize(db, workout_id, user_id=current_user.id)
+    if not before:
         raise HTTPException(status_code=404, detail="Workout not found")
     workout = crud_sw.update(db, id=workout_id, obj_in=workout_in)
-    workout = crud_sw.update(db, id=workout_id, obj_in=workout_in)
+
+    # Moves the workout's counters when it is completed, un-completed or rescheduled
+    daily_summary.record_change(db, before, workout)
+    if before.status != 'completed' and workout.status == 'completed':
+        streaks.record(db, workout.user_id, workout.scheduled_date)
+        activity.record(db, workout.user_id, workout.scheduled_date)
     return workout
 
+@router.get("/analytics", response_model=TrainingAnalytics)
+def read_training_analytics(
+    db: firestore.Client = Depends(get_db),
+    weeks: int = Query(12, ge=1, le=104),
+    formula: str = Query("epley", pattern="^(epley|brzycki)$"),
+    current_user = Depends(deps.get_current_active_user),
+):
+    """
+    Volume and estimated 1RM per exercise, weekly tonnage per muscle group and
+    session density over the last `weeks` weeks (cached until the next session).
+    """
+    return analytics.get(db, current_user, weeks=weeks, formula=formula)
+
+@router.get("/calendar/{year}/{month}", response_model=schemas.CalendarMonth)
+def read_calendar_month(
+    year: int,
+    month: int,
+    db: firestore.Client = Depends(get_db),
+    current_user = Depends(deps.get_current_active_user),
+):
+    """
+    Per-day workout status of one month for the calendar view.
+    """
+    if not 1 <= month <= 12 or not 1970 <= year <= 9999:
+        raise HTTPException(status_code=400, detail="Invalid month")
+    first = date(year, month, 1)
+    last = date(year, month, calendar.monthrange(year, month)[1])
+    virtual = {w.id: w.scheduled_date for w in schedule_rule.occurrences(db, current_user.id, first, last)}
+    return crud_sw.get_month(db, current_user.id, year, month, date.today(), virtual=virtual)
+
+# --- Recurring schedules ---
+
+@router.post("/schedules", response_model=schemas.ScheduleRule)
+def create_schedule_rule(
+    *,
+    db: firestore.Client = Depends(get_db),
+    rule_in: schemas.ScheduleRuleCreate,
+    current_user = Depends(deps.get_current_active_user),
+):
+    """
+    Repeat a routine on some weekdays between two dates. Stored as one rule;
+    its workouts are only created when the user starts or edits them.
+    """
+    if rule_in.end_date < rule_in.start_date:
+        raise HTTPException(status_code=400, detail="end_date must not be before start_date")
+    if (rule_in.end_date - rule_in.start_date).days >= MAX_RULE_DAYS:
+        raise HTTPException(status_code=400, detail=f"A schedule cannot span more than {MAX_RULE_DAYS} days")
+    weekdays = rule_in.weekdays if rule_in.weekdays is not None else schedule_rule.routine_weekdays(db, rule_in.routine_id)
+    if not weekdays or any(not 1 <= d <= 7 for d in weekdays):
+        raise HTTPException(status_code=400, detail="weekdays must be 1 (Monday) to 7 (Sunday)")
+    rule_data = rule_in.model_dump()
+    rule_data["weekdays"] = sorted(set(weekdays))
+    rule_data["user_id"] = current_user.id
+    return schedule_rule.create(db, obj_in=rule_data)
+
+@router.get("/schedules", response_model=List[schemas.ScheduleRule])
+def read_schedule_rules(
+    db: firestore.Client = Depends(get_db),
+    current_user = Depends(deps.get_current_active_user),
+):
+    """
+    The current user's recurring schedules.
+    """
+    return schedule_rule.get_by_user(db, current_user.id)
+
+@router.delete("/schedules/{rule_id}", response_model=dict)
+def delete_schedule_rule(
+    rule_id: str,
+    db: firestore.Client = Depends(get_db),
+    current_user = Depends(deps.get_current_active_user),
+):
+    """
+    Stop a recurring schedule. Workouts already started or edited are kept.
+    """
+    rule = schedule_rule.get(db, id=rule_id)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Schedule not found")
+    if rule.user_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    return schedule_rule.remove(db, id=rule_id)
+
+@router.get("/records", response_model=List[PersonalRecord])
+def read_personal_records(
+    db: firestore.Client = Depends(get_db),
+    current_user = Depends(deps.get_current_active_user),
+):
+    """
+    The user's personal records, one entry per exercise trained.
+    """
+    return personal_records.get_by_user(db, current_user.id)
+
+@router.get("/exercises/{exercise_id}/recent", response_model=List[RecentPerformance])
+def read_recent_performances(
+    exercise_id: str,
+    db: firestore.Client = Depends(get_db),
+    limit: int = Query(5, ge=1, le=MAX_RECENT_PERFORMANCES),
+    current_user = Depends(deps.get_current_active_user),
+):
+    """
+    The user's sets of this exercise in their last `limit` workouts, newest first.
+    """
+    return exercise_history.recent(db, current_user.id, exercise_id, limit=limit)
+
 @router.get("/{workout_id}", response_model=schemas.ScheduledWorkout)
 def read_scheduled_workout(
     workout_id: str,
@@ -95,7 +256,7 @@ def read_scheduled_workout(
     """
     Get a scheduled workout by ID with full details (exercises populated in logs).
     """
-    workout = crud_sw.get(db, id=workout_id)
+    workout = schedule_rule.resolve(db, workout_id)
     if not workout:
         raise HTTPException(status_code=404, detail="Workout not found")
         
@@ -138,43 +299,141 @@ def read_scheduled_workout(
 
 # --- Logs (Nested) ---
 
-@router.post("/{workout_id}/logs", response_model=schemas.ScheduledWorkout) # Return entire workout or just log?
-# Returning WorkoutLog is tricky if no ID. But let's return the updated workout.
-# Or we just return generic success.
-# Original returned WorkoutLog. Firestore logs are embedded.
-# We will return the updated ScheduledWorkout.
-# But clients might expect WorkoutLog. 
-# We'll change response_model to ScheduledWorkout for correctness with embedding.
+@router.post("/{workout_id}/logs", response_model=schemas.WorkoutLog)
 def create_workout_log(
     *,
     db: firestore.Client = Depends(get_db),
     workout_id: str,
     log_in: schemas.WorkoutLogCreate,
+    current_user = Depends(deps.get_current_active_user),
 ):
     """
-    Add a log (set) to a workout.
+    Add a log (set) to a workout. Returns only the new log.
     """
-    workout = crud_sw.get(db, id=workout_id)
-    if not workout:
+    logs = crud_sw.append_logs(db, workout_id, [log_in], current_user.id)
+    if logs is None and schedule_rule.materialize(db, workout_id, user_id=current_user.id):
+        logs = crud_sw.append_logs(db, workout_id, [log_in], current_user.id)
+    if logs is None:
         raise HTTPException(status_code=404, detail="Workout not found")
-    
-    # Embed logic
-    # Retrieve current logs, append new one, update document.
-    current_logs = [log.model_dump() for log in workout.logs] if workout.logs else []
-    
-    new_log_data = log_in.model_dump()
-    # Generate a pseudo ID for the log if needed by frontend
-    import uuid
-    new_log_data['id'] = str(uuid.uuid4())
-    new_log_data['workout_id'] = workout_id
-    new_log_data['created_at'] = datetime.utcnow().isoformat()
-    
-    current_logs.append(new_log_data)
-    
-    crud_sw.update(db, id=workout_id, obj_in={"logs": current_logs})
-    
-    # Return updated workout
-    return crud_sw.get(db, id=workout_id)
+    today = date.today().isoformat()
+    exercise_history.record(db, current_user.id, workout_id, [log.model_dump() for log in logs], today)
+    personal_records.record(db, current_user.id, [log_in.model_dump()], today, workout_id)
+    return logs[0]
+
+@router.post("/{workout_id}/logs/bulk", response_model=List[schemas.WorkoutLog])
+def create_workout_logs_bulk(
+    *,
+    db: firestore.Client = Depends(get_db),
+    workout_id: str,
+    logs_in: List[schemas.WorkoutLogCreate],
+    current_user = Depends(deps.get_current_active_user),
+):
+    """
+    Add several logs (sets) to a workout in a single write.
+    """
+    if not logs_in:
+        return []
+    logs = crud_sw.append_logs(db, workout_id, logs_in, current_user.id)
+    if logs is None and schedule_rule.materialize(db, workout_id, user_id=current_user.id):
+        logs = crud_sw.append_logs(db, workout_id, logs_in, current_user.id)
+    if logs is None:
+        raise HTTPException(status_code=404, detail="Workout not found")
+    today = date.today().isoformat()
+    exercise_history.record(db, current_user.id, workout_id, [log.model_dump() for log in logs], today)
+    personal_records.record(db, current_user.id, [log_in.model_dump() for log_in in logs_in], today, workout_id)
+    return logs
+
+
+# --- Live session (WebSocket) ---
+
+@router.websocket("/{workout_id}/live")
+async def live_workout_session(
+    websocket: WebSocket,
+    workout_id: str,
+    token: str,
+    db: firestore.Client = Depends(get_db),
+):
+    """
+    Stream sets of an in-progress workout. Authenticate with `?token=<jwt>`.
+
+    Client -> server messages:
+      {"type": "set", "set": {WorkoutLogCreate}}
+      {"type": "checkpoint"}
+      {"type": "finish", "duration_seconds": int, "calories_burned": float}
+    Server -> client messages:
+      {"type": "resume", "sets": [...]}       on connect (sets recovered from the last checkpoint)
+      {"type": "ack", "log": {...}, "count": n, "checkpointed": n}
+      {"type": "finished", "workout": {...}, "xp_gained": n, ...}   same fields as /log-session
+      {"type": "error", "detail": "..."}
+    Sets are buffered in memory and only written as periodic checkpoints;
+    "finish" commits everything to the workout in one write.
+    """
+    user = await run_in_threadpool(deps.get_user_from_token, db, token)
+    if not user:
+        await websocket.close(code=1008)
+        return
+    try:
+        session = await run_in_threadpool(live_sessions.open, db, workout_id, user.id)
+    except ValueError:
+        await websocket.close(code=1008)
+        return
+
+    try:
+        await websocket.accept()
+        await websocket.send_json({"type": "resume", "sets": session.sets})
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except ValueError:
+                await websocket.send_json({"type": "error", "detail": "Messages must be JSON"})
+                continue
+            if not isinstance(message, dict):
+                await websocket.send_json({"type": "error", "detail": "Messages must be JSON objects"})
+                continue
+            msg_type = message.get("type")
+
+            if msg_type == "set":
+                try:
+                    log_in = schemas.WorkoutLogCreate(**(message.get("set") or {}))
+                except (TypeError, ValidationError) as e:
+                    detail = jsonable_encoder(e.errors()) if isinstance(e, ValidationError) else "Invalid set"
+                    await websocket.send_json({"type": "error", "detail": detail})
+                    continue
+                try:
+                    log = await run_in_threadpool(live_sessions.add_set, db, session, log_in)
+                except ValueError as e:
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+                    continue
+                await websocket.send_json({"type": "ack", "log": log, "count": len(session.sets), "checkpointed": session.checkpointed})
+
+            elif msg_type == "checkpoint":
+                await run_in_threadpool(live_sessions.checkpoint, db, session)
+                await websocket.send_json({"type": "ack", "count": len(session.sets), "checkpointed": session.checkpointed})
+
+            elif msg_type == "finish":
+                try:
+                    result = await run_in_threadpool(
+                        lambda: live_sessions.finish(
+                            db, session, user,
+                            duration_seconds=message.get("duration_seconds"),
+                            calories_burned=message.get("calories_burned"),
+                        )
+                    )
+                except ValueError as e:
+                    await websocket.send_json({"type": "error", "detail": str(e)})
+                    continue
+                await websocket.send_json({"type": "finished", **jsonable_encoder(result)})
+                await websocket.close()
+                return
+
+            else:
+                await websocket.send_json({"type": "error", "detail": f"Unknown message type: {msg_type}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Whatever ended the connection (including errors), checkpoint and
+        # release the buffer so it neither leaks nor loses pending sets
+        await run_in_threadpool(live_sessions.detach, db, session)
 
 
 @router.post("/log-session", response_model=schemas.WorkoutCompletionResponse)
@@ -189,81 +448,13 @@ def log_session(
     """
 
     try:
-        # Prepare logs with IDs
-        import uuid
-        logs_data = []
-        if session_in.logs:
-            for log_item in session_in.logs:
-                d = log_item.model_dump()
-                d['id'] = str(uuid.uuid4())
-                d['created_at'] = datetime.utcnow().isoformat()
-                logs_data.append(d)
-
-        workout_data = {
-            "user_id": current_user.id,
-            "routine_id": session_in.routine_id,
-            "scheduled_date": date.today().isoformat(),
-            "status": 'completed',
-            "notes": f"Difficulty: {session_in.difficulty}, Rating: {session_in.rating}/5. Notes: {session_in.notes or ''}",
-            "duration_seconds": session_in.duration_seconds,
-            "calories_burned": session_in.calories_burned,
-            "created_at": datetime.utcnow().isoformat(),
-            "logs": logs_data
-        }
-        
-        # 1. Create ScheduledWorkout
-        workout = crud_sw.create(db=db, obj_in=workout_data)
-        
-        # 2. Add or Update Rating
-        existing = crud_rating.get_by_rater_and_content(
-            db, 
-            rater_id=current_user.id, 
-            content_type='routine', 
-            content_id=session_in.routine_id
-        )
-        
-        if existing:
-            crud_rating.update(db, id=existing.id, obj_in={"score": session_in.rating})
-        else:
-            rating_data = {
-                "rater_id": current_user.id,
-                "content_type": 'routine',
-                "content_id": session_in.routine_id,
-                "score": session_in.rating
-            }
-            crud_rating.create(db=db, obj_in=rating_data)
-            
-        # 3. Gamification: Award XP
-        xp_gained = int(session_in.calories_burned / 2) if session_in.calories_burned else 50
-        
-        # Update user XP
-        from app.services.user import user as crud_user
-        
-        user_data = crud_user.get(db, id=current_user.id)
-        current_xp = user_data.xp or 0
-        new_total_xp = current_xp + xp_gained
-        
-        # Calculate Levels
-        old_level = calculate_level(current_xp)
-        new_level = calculate_level(new_total_xp)
-        level_up = new_level > old_level
-        
-        # Update DB
-        crud_user.update(db, id=current_user.id, obj_in={"xp": new_total_xp})
-        
-        prev_level_xp = (new_level - 1) ** 2 * 100
-        next_level_xp = new_level ** 2 * 100
-            
-        return {
-            "workout": workout.model_dump(),
-            "xp_gained": xp_gained,
-            "new_total_xp": new_total_xp,
-            "new_level": new_level,
-            "level_up": level_up,
-            "prev_level_xp": prev_level_xp,
-            "next_level_xp": next_level_xp
-        }
-
-    except Exception as e:
-        print(f"Error logging session: {e}") 
-        raise HTTPException(status_code=400, detail=f"Error saving workout: {str(e)}")
+        return log_workout_session(db, current_user, session_in)
+    except RecordConflict:
+        # Concurrent sessions kept moving the same records; nothing was written
+        logger.warning("Session of user %s conflicted on every attempt", current_user.id)
+        raise HTTPException(status_code=409, detail="Workout conflicted with concurrent sessions, try again")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception:
+        logger.exception("Error logging session of user %s", current_user.id)
+        raise HTTPException(status_code=500, detail="Error saving workout")
@@ -1,5 +1,5 @@
 from typing import Any, List
-from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Request, Response
 from fastapi.encoders import jsonable_encoder
 from google.cloud import firestore
 
@@ -8,10 +8,17 @@ from app.schemas import user as schemas
 from app.services.user import user as crud
 from app.services.tracking import scheduled_workout as crud_tracking
 from app.services.routine import routine as crud_routine
+from app.services.summary import daily_summary
+from app.services.xp import xp_ledger
+from app.services.achievements import achievements
+from app.services.activity import activity
+from app.schemas.achievement import AchievementProgress
+from app.schemas.activity import ActivityYear
 from app.api import deps
-from app.schemas.tracking import ScheduledWorkout
+from app.api.cache import compute_etag, check_not_modified
 from datetime import date, datetime
-from app.core.gamification import calculate_level, calculate_xp_for_next_level, get_rank
+from app.core.gamification import level_bounds, level_matches
+from app.core.streaks import current_streaks
 
 router = APIRouter()
 
@@ -53,6 +60,8 @@ def create_user(
 
 @router.get("/me/dashboard", response_model=Any) # Changed response_model to Any to allow extra fields or update DashboardStats schema
 def get_dashboard(
+    request: Request,
+    response: Response,
     db: firestore.Client = Depends(get_db),
     current_user: schemas.User = Depends(deps.get_current_active_user),
 ):
@@ -60,86 +69,62 @@ def get_dashboard(
     Get current user dashboard stats (Real Data).
     """
     today = date.today().isoformat()
+
+    # Everything shown comes from the user (already loaded) and today's summary,
+    # whose writes bump the "dashboard" version
+    etag = compute_etag(
+        current_user.id, today, current_user.cache_versions.get("dashboard", 0),
+        current_user.xp, current_user.current_weight, current_user.height,
+        current_user.current_routine_id, current_user.current_routine_name,
+    )
+    not_modified = check_not_modified(request, response, etag)
+    if not_modified:
+        return not_modified
     
     try:
-        # 1. Calculate Calories Burned & Time (from today's completed workouts)
-        docs = db.collection("scheduled_workouts")\
-                 .where(filter=firestore.FieldFilter("user_id", "==", current_user.id))\
-                 .where(filter=firestore.FieldFilter("scheduled_date", "==", today))\
-                 .stream()
-                 
-        completed_today = []
-        mission_workout = None
-        
-        for doc in docs:
-            data = doc.to_dict()
-            try:
-                sw = ScheduledWorkout(id=doc.id, **data)
-                if sw.status == 'completed':
-                    completed_today.append(sw)
-                
-                if not mission_workout:
-                    mission_workout = sw
-            except Exception:
-                continue
-
-        calories_burned = 0
-        time_minutes = 0
-        
-        for workout in completed_today:
-            cals = workout.calories_burned or 0
-            dur_sec = workout.duration_seconds or 0
-            
-            if cals == 0 and workout.routine_id:
-                routine = crud_routine.get(db, id=workout.routine_id)
-                if routine:
-                    cals = 300
-                    if dur_sec == 0:
-                        dur_sec = 45 * 60
-            
-            calories_burned += int(cals)
-            time_minutes += int(dur_sec / 60)
-                
+        # 1. Today's activity comes precomputed from the daily summary (single point read)
+        summary = daily_summary.get(db, current_user.id, today) or {}
+
+        calories_burned = summary.get("calories_burned", 0)
+        time_minutes = summary.get("time_minutes", 0)
+
         mission_name = "Descanso Activo"
         mission_duration = 0
         mission_img = "https://images.unsplash.com/photo-1517836357463-d25dfeac3438?q=80&w=1000&auto=format&fit=crop"
-        
-        if mission_workout:
-            if mission_workout.routine_id:
-                 routine = crud_routine.get(db, id=mission_workout.routine_id)
-                 if routine:
-                     mission_name = routine.name
-                     mission_duration = 45 # Default or from routine if available
-            else:
-                 mission_name = "Entrenamiento Personalizado"
+
+        if summary.get("mission_set"):
+            if summary.get("mission_name"):
+                mission_name = summary["mission_name"]
+                mission_duration = summary.get("mission_duration", 0)
         elif current_user.current_routine_id:
-            # Fallback to selected routine
-            routine = crud_routine.get(db, id=current_user.current_routine_id)
-            if routine:
-                mission_name = routine.name
+            # Fallback to selected routine (name is denormalized on the user when it is selected)
+            routine_name = current_user.current_routine_name
+            if not routine_name:
+                routine = crud_routine.get(db, id=current_user.current_routine_id)
+                routine_name = routine.name if routine else None
+            if routine_name:
+                mission_name = routine_name
                 mission_duration = 60 # Default duration for routine
                 # We could also fetch image if routine has it
 
-        # Gamification Stats
-        level = calculate_level(current_user.xp)
-        rank = get_rank(level)
-        xp_next_level = calculate_xp_for_next_level(level + 1) # Simplification using next level total req
-        # Actually we want XP req for current level cap.
-        # Formula in gamification.py was total XP.
-        # Level N starts at (N-1)^2 * 100.
-        # Level N+1 starts at N^2 * 100.
-        # Current Level Progress = XP - StartXP
-        # Target Progress = EndXP - StartXP
-        
-        start_xp = (level - 1) ** 2 * 100
-        end_xp = level ** 2 * 100
-        
-        xp_progress = current_user.xp - start_xp
+        # Gamification Stats: level/rank are stored on the user and only change on
+        # threshold crossings. Users that predate the XP ledger are synced once here.
+        xp = current_user.xp or 0
+        level = current_user.level
+        rank = current_user.rank
+        if not rank or not level_matches(level, xp):
+            synced = xp_ledger.sync_level(db, current_user.id)
+            level, rank = synced["level"], synced["rank"]
+
+        start_xp, end_xp = level_bounds(level)
+        xp_progress = xp - start_xp
         xp_needed = end_xp - start_xp
         if xp_needed <= 0: xp_needed = 100 # Fallback for lvl 1
         
-        progress_percentage = min(100, int((xp_progress / xp_needed) * 100))
-        if current_user.xp < 0: progress_percentage = 0
+        progress_percentage = min(100, xp_progress * 100 // xp_needed)
+        if xp < 0: progress_percentage = 0
+
+        streak = current_streaks(current_user.streak, date.fromisoformat(today))
 
         return {
             "calories_burned": calories_burned,
@@ -154,6 +139,10 @@ def get_dashboard(
             "rank": rank,
             "xp": current_user.xp,
             "xp_progress": progress_percentage,
+            "streak_days": streak["current_days"],
+            "longest_streak_days": streak["longest_days"],
+            "streak_weeks": streak["current_weeks"],
+            "longest_streak_weeks": streak["longest_weeks"],
             "current_weight": current_user.current_weight,
             "height": current_user.height
         }
@@ -172,10 +161,40 @@ def get_dashboard(
             "rank": "Novato",
             "xp": 0,
             "xp_progress": 0,
+            "streak_days": 0,
+            "longest_streak_days": 0,
+            "streak_weeks": 0,
+            "longest_streak_weeks": 0,
             "current_weight": 0,
             "height": 0
         }
     
+@router.get("/me/achievements", response_model=List[AchievementProgress])
+def read_my_achievements(
+    db: firestore.Client = Depends(get_db),
+    current_user: schemas.User = Depends(deps.get_current_active_user),
+):
+    """
+    All badges with the current user's progress and unlock date.
+    """
+    return achievements.get_progress(db, current_user.id)
+
+@router.get("/{user_id}/activity/{year}", response_model=ActivityYear)
+def read_activity_year(
+    user_id: str,
+    year: int,
+    db: firestore.Client = Depends(get_db),
+    current_user: schemas.User = Depends(deps.get_current_active_user),
+):
+    """
+    Yearly heatmap of a user ("me" for the current one) as base64 bitmaps:
+    `days` has bit i set (LSB first) if day i of the year had a workout,
+    `intensity` has one byte per day with the workouts completed.
+    """
+    if user_id == "me":
+        user_id = current_user.id
+    return activity.get(db, user_id, year)
+
 @router.put("/me/active_diet")
 async def set_active_diet(
     diet_id: str = Body(..., embed=True),
@@ -201,6 +220,10 @@ def update_user_me(
     """
     Update own user.
     """
+    if user_in.current_routine_id and user_in.current_routine_id != current_user.current_routine_id:
+        # Denormalize the routine name so the dashboard does not need to fetch the routine
+        routine = crud_routine.get(db, id=user_in.current_routine_id)
+        user_in.current_routine_name = routine.name if routine else None
     user = crud.update(db, id=current_user.id, obj_in=user_in)
     return user
 
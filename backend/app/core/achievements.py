@@ -0,0 +1,83 @@
+"""
+Achievement rules.
+
+Every rule watches one counter. Counters are small per-user integers bumped by
+domain events (see COUNTERS), so a badge is decided from the counter's value
+before and after an event, never from history.
+"""
+from typing import Any, Callable, Dict, List, Tuple
+
+from app.core.challenges import session_volume
+
+# Domain events
+WORKOUT_LOGGED = "workout_logged"
+USER_FOLLOWED = "user_followed"
+USER_UNFOLLOWED = "user_unfollowed"
+CONTENT_IMPORTED = "content_imported"
+POST_RATED = "post_rated"
+
+
+# counter -> {event: amount(payload)}
+COUNTERS: Dict[str, Dict[str, Callable[[Dict[str, Any]], int]]] = {
+    "workouts": {WORKOUT_LOGGED: lambda p: 1},
+    "volume_kg": {WORKOUT_LOGGED: lambda p: session_volume(p.get("logs", []))},
+    "followers": {USER_FOLLOWED: lambda p: 1, USER_UNFOLLOWED: lambda p: -1},
+    "imports": {CONTENT_IMPORTED: lambda p: 1},
+    "ratings_given": {POST_RATED: lambda p: 1},
+}
+
+
+class Rule:
+    def __init__(self, id: str, name: str, description: str, counter: str, threshold: int):
+        self.id = id
+        self.name = name
+        self.description = description
+        self.counter = counter
+        self.threshold = threshold
+
+    def crossed(self, before: int, after: int) -> bool:
+        return before < self.threshold <= after
+
+
+RULES: List[Rule] = [
+    Rule("first_workout", "Primer entrenamiento", "Completa tu primer entrenamiento.", "workouts", 1),
+    Rule("workouts_10", "10 entrenamientos", "Completa 10 entrenamientos.", "workouts", 10),
+    Rule("workouts_100", "100 entrenamientos", "Completa 100 entrenamientos.", "workouts", 100),
+    Rule("volume_10k", "10.000 kg", "Levanta 10.000 kg en total.", "volume_kg", 10_000),
+    Rule("volume_100k", "100.000 kg", "Levanta 100.000 kg en total.", "volume_kg", 100_000),
+    Rule("followers_50", "50 seguidores", "Consigue 50 seguidores.", "followers", 50),
+    Rule("first_import", "Primera importación", "Importa una rutina o dieta.", "imports", 1),
+    Rule("first_rating", "Primera valoración", "Valora una publicación.", "ratings_given", 1),
+]
+RULES_BY_ID: Dict[str, Rule] = {rule.id: rule for rule in RULES}
+RULES_BY_COUNTER: Dict[str, List[Rule]] = {}
+for _rule in RULES:
+    RULES_BY_COUNTER.setdefault(_rule.counter, []).append(_rule)
+
+
+def counter_deltas(event: str, payload: Dict[str, Any]) -> Dict[str, int]:
+    """
+    Non-zero counter increments caused by one event.
+    """
+    deltas = {}
+    for counter, handlers in COUNTERS.items():
+        handler = handlers.get(event)
+        if handler is not None:
+            amount = handler(payload)
+            if amount:
+                deltas[counter] = amount
+    return deltas
+
+
+def crossed_rules(deltas: Dict[str, int], totals: Dict[str, int]) -> List[Tuple[Rule, int]]:
+    """
+    Rules whose threshold was reached by applying `deltas`, given the counter
+    totals after the event. Returns (rule, total) pairs.
+    """
+    crossed = []
+    for counter, delta in deltas.items():
+        after = totals.get(counter, 0)
+        for rule in RULES_BY_COUNTER.get(counter, []):
+            if rule.crossed(after - delta, after):
+                crossed.append((rule, after))
+    return crossed
@@ -0,0 +1,38 @@
+"""
+Yearly activity bitmaps for the profile heatmap.
+
+A year is a 46-byte bitset (bit i set = day i of the year had a completed
+workout, little-endian within each byte) plus 366 intensity bytes holding
+the completed workouts of each day, saturating at 255. Day i is
+`day.timetuple().tm_yday - 1`, so index 365 is only used in leap years.
+"""
+from datetime import date
+from typing import Optional, Tuple
+
+DAYS_PER_YEAR = 366
+BITMAP_BYTES = (DAYS_PER_YEAR + 7) // 8
+
+
+def day_index(day: date) -> int:
+    return day.timetuple().tm_yday - 1
+
+
+def empty_year() -> Tuple[bytes, bytes]:
+    return bytes(BITMAP_BYTES), bytes(DAYS_PER_YEAR)
+
+
+def mark_day(bitmap: Optional[bytes], intensity: Optional[bytes], day: date) -> Tuple[bytes, bytes]:
+    """
+    Bitmap and intensity with one more completed workout on `day`.
+    """
+    empty_bits, empty_counts = empty_year()
+    bits = bytearray(bitmap or empty_bits)
+    counts = bytearray(intensity or empty_counts)
+    i = day_index(day)
+    bits[i >> 3] |= 1 << (i & 7)
+    counts[i] = min(counts[i] + 1, 255)
+    return bytes(bits), bytes(counts)
+
+
+def active_days(bitmap: Optional[bytes]) -> int:
+    return sum(bin(b).count("1") for b in bitmap or b"")
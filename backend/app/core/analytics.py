@@ -0,0 +1,224 @@
+"""
+Vectorized training analytics over a user's workout history.
+
+The history is flattened into parallel NumPy arrays (one entry per set, plus
+one per workout), and every metric is a bincount / ufunc.at over them:
+
+    per-exercise weekly volume and best estimated 1RM
+    weekly tonnage per muscle group
+    per-session density (kg per minute, sets per minute)
+
+Weeks are Monday-based and numbered from the Unix epoch.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+EPOCH = date(1970, 1, 1)
+# 1970-01-01 was a Thursday; shifting by 3 days makes weeks start on Monday
+_WEEK_SHIFT = 3
+UNKNOWN_MUSCLE_GROUP = "other"
+# Brzycki is undefined from 37 reps on
+_BRZYCKI_MAX_REPS = 37
+
+
+def day_number(day: date) -> int:
+    return (day - EPOCH).days
+
+
+def week_number(days: np.ndarray) -> np.ndarray:
+    return (days + _WEEK_SHIFT) // 7
+
+
+def week_label(week: int) -> str:
+    return (EPOCH + timedelta(days=int(week) * 7 - _WEEK_SHIFT)).isoformat()
+
+
+def estimate_1rm(weight: np.ndarray, reps: np.ndarray, formula: str = "epley") -> np.ndarray:
+    """
+    Estimated one-rep max per set. A single rep is its own 1RM; sets without
+    reps estimate 0; Brzycki gives NaN where it is undefined (37+ reps).
+    """
+    weight = np.asarray(weight, dtype=np.float64)
+    reps = np.asarray(reps, dtype=np.float64)
+    if formula == "brzycki":
+        with np.errstate(divide="ignore", invalid="ignore"):
+            est = np.where(reps < _BRZYCKI_MAX_REPS, weight * 36.0 / (37.0 - reps), np.nan)
+    elif formula == "epley":
+        est = weight * (1.0 + reps / 30.0)
+    else:
+        raise ValueError(f"Unknown 1RM formula: {formula}")
+    est = np.where(reps == 1, weight, est)
+    return np.where(reps <= 0, 0.0, est)
+
+
+class HistoryBuilder:
+    """
+    Accumulates workouts into the columnar arrays `compute_analytics` expects.
+    Columnar-encoded logs (app/core/workout_codec.py) are read straight from
+    their packed buffers without building per-set dicts.
+    """
+    def __init__(self):
+        self.exercise_ids: List[str] = []
+        self._exercise_index: Dict[str, int] = {}
+        self._days: List[int] = []
+        self._durations: List[float] = []
+        self._set_workout: List[np.ndarray] = []
+        self._set_exercise: List[np.ndarray] = []
+        self._set_reps: List[np.ndarray] = []
+        self._set_weight: List[np.ndarray] = []
+
+    def _exercise_codes(self, exercise_ids: List[str]) -> np.ndarray:
+        codes = []
+        for ex_id in exercise_ids:
+            code = self._exercise_index.get(ex_id)
+            if code is None:
+                code = self._exercise_index[ex_id] = len(self.exercise_ids)
+                self.exercise_ids.append(ex_id)
+            codes.append(code)
+        return np.asarray(codes, dtype=np.int32)
+
+    def add_workout(
+        self,
+        day: date,
+        duration_seconds: Optional[int],
+        logs: Optional[List[Dict[str, Any]]] = None,
+        packed: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        workout = len(self._days)
+        self._days.append(day_number(day))
+        self._durations.append((duration_seconds or 0) / 60.0)
+
+        if packed and packed.get("count"):
+            table = self._exercise_codes(packed.get("exercises", []))
+            idx = np.frombuffer(packed["exercise_idx"], dtype="<u2")
+            self._set_exercise.append(table[idx])
+            self._set_reps.append(np.frombuffer(packed["reps"], dtype="<u2").astype(np.float64))
+            self._set_weight.append(np.frombuffer(packed["weight_cg"], dtype="<i4") / 100.0)
+            self._set_workout.append(np.full(len(idx), workout, dtype=np.int32))
+        if logs:
+            self._set_exercise.append(self._exercise_codes([log["exercise_id"] for log in logs]))
+            self._set_reps.append(np.fromiter((log.get("reps") or 0 for log in logs), dtype=np.float64, count=len(logs)))
+            self._set_weight.append(np.fromiter((log.get("weight_kg") or 0 for log in logs), dtype=np.float64, count=len(logs)))
+            self._set_workout.append(np.full(len(logs), workout, dtype=np.int32))
+
+    def build(self) -> Dict[str, np.ndarray]:
+        def cat(parts: List[np.ndarray], dtype) -> np.ndarray:
+            return np.concatenate(parts).astype(dtype, copy=False) if parts else np.zeros(0, dtype=dtype)
+        return {
+            "workout_day": np.asarray(self._days, dtype=np.int32),
+            "workout_minutes": np.asarray(self._durations, dtype=np.float64),
+            "set_workout": cat(self._set_workout, np.int32),
+            "set_exercise": cat(self._set_exercise, np.int32),
+            "set_reps": cat(self._set_reps, np.float64),
+            "set_weight": cat(self._set_weight, np.float64),
+        }
+
+
+def _round_list(values: np.ndarray, digits: int = 1) -> List[float]:
+    return np.round(np.nan_to_num(values), digits).tolist()
+
+
+def compute_analytics(
+    arrays: Dict[str, np.ndarray],
+    exercise_ids: List[str],
+    exercise_info: Dict[str, Dict[str, Any]],
+    today: date,
+    weeks: int = 12,
+    formula: str = "epley",
+) -> Dict[str, Any]:
+    """
+    All metrics for the `weeks` weeks ending with the current one.
+    `exercise_info` maps exercise ids to catalog fields (name, muscle_group).
+    """
+    last_week = int(week_number(np.int32(day_number(today))))
+    first_week = last_week - weeks + 1
+    labels = [week_label(w) for w in range(first_week, last_week + 1)]
+
+    workout_week = week_number(arrays["workout_day"])
+    set_workout = arrays["set_workout"]
+    set_exercise = arrays["set_exercise"]
+    reps = arrays["set_reps"]
+    weight = arrays["set_weight"]
+    volume = reps * weight
+    e1rm = estimate_1rm(weight, reps, formula)
+    n_exercises = len(exercise_ids)
+    n_workouts = len(arrays["workout_day"])
+
+    # All-time bests
+    best = np.zeros(n_exercises)
+    if len(e1rm):
+        np.fmax.at(best, set_exercise, np.nan_to_num(e1rm))
+
+    # Weekly series inside the window
+    set_week = workout_week[set_workout] - first_week if n_workouts else np.zeros(0, dtype=np.int32)
+    in_window = (set_week >= 0) & (set_week < weeks)
+    w_week, w_ex = set_week[in_window], set_exercise[in_window]
+    ex_volume = np.zeros((n_exercises, weeks))
+    np.add.at(ex_volume, (w_ex, w_week), volume[in_window])
+    ex_e1rm = np.zeros((n_exercises, weeks))
+    np.fmax.at(ex_e1rm, (w_ex, w_week), np.nan_to_num(e1rm[in_window]))
+
+    # Tonnage by muscle group: join through a per-exercise group code
+    groups: List[str] = []
+    group_index: Dict[str, int] = {}
+    exercise_group = np.zeros(n_exercises, dtype=np.int32)
+    for code, ex_id in enumerate(exercise_ids):
+        group = (exercise_info.get(ex_id) or {}).get("muscle_group") or UNKNOWN_MUSCLE_GROUP
+        if group not in group_index:
+            group_index[group] = len(groups)
+            groups.append(group)
+        exercise_group[code] = group_index[group]
+    tonnage = np.zeros((len(groups), weeks))
+    np.add.at(tonnage, (exercise_group[w_ex], w_week), volume[in_window])
+
+    # Session density
+    session_tonnage = np.bincount(set_workout, weights=volume, minlength=n_workouts)
+    session_sets = np.bincount(set_workout, minlength=n_workouts)
+    minutes = arrays["workout_minutes"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kg_per_min = np.where(minutes > 0, session_tonnage / minutes, np.nan)
+        sets_per_min = np.where(minutes > 0, session_sets / minutes, np.nan)
+    recent = np.nonzero((workout_week >= first_week) & (workout_week <= last_week))[0]
+    recent = recent[np.argsort(arrays["workout_day"][recent], kind="stable")]
+
+    active = np.nonzero(ex_volume.sum(axis=1) > 0)[0]
+    exercises = []
+    for code in active[np.argsort(-ex_volume[active].sum(axis=1), kind="stable")]:
+        ex_id = exercise_ids[code]
+        info = exercise_info.get(ex_id) or {}
+        exercises.append({
+            "exercise_id": ex_id,
+            "name": info.get("name"),
+            "muscle_group": info.get("muscle_group"),
+            "volume": _round_list(ex_volume[code]),
+            "estimated_1rm": _round_list(ex_e1rm[code]),
+            "best_estimated_1rm": round(float(best[code]), 1),
+        })
+
+    return {
+        "weeks": labels,
+        "formula": formula,
+        "exercises": exercises,
+        "muscle_groups": [
+            {"muscle_group": group, "tonnage": _round_list(tonnage[i])}
+            for i, group in enumerate(groups) if tonnage[i].any()
+        ],
+        "sessions": [
+            {
+                "date": (EPOCH + timedelta(days=int(arrays["workout_day"][i]))).isoformat(),
+                "duration_minutes": round(float(minutes[i]), 1),
+                "sets": int(session_sets[i]),
+                "tonnage": round(float(session_tonnage[i]), 1),
+                "kg_per_minute": None if np.isnan(kg_per_min[i]) else round(float(kg_per_min[i]), 2),
+                "sets_per_minute": None if np.isnan(sets_per_min[i]) else round(float(sets_per_min[i]), 3),
+            }
+            for i in recent
+        ],
+        "totals": {
+            "workouts": n_workouts,
+            "sets": int(len(reps)),
+            "tonnage": round(float(volume.sum()), 1),
+        },
+    }
@@ -0,0 +1,37 @@
+"""
+Weekly and monthly challenge windows and metrics.
+
+A window is identified by its period key: ISO week ("2024-W07") or month
+("2024-02"). Each user has one counter document per window.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List, Tuple
+
+from app.core.periods import month_key, week_key
+
+PERIODS = ("week", "month")
+
+# metric -> (counter field, rank index bucket width)
+METRICS: Dict[str, Tuple[str, int]] = {
+    "volume": ("volume_kg", 100),
+    "sessions": ("sessions", 1),
+    "calories": ("calories", 10),
+}
+
+def window_key(period: str, day: date) -> str:
+    return week_key(day) if period == "week" else month_key(day)
+
+def window_end(period: str, day: date) -> date:
+    """Last day of the window containing `day`."""
+    if period == "week":
+        return day + timedelta(days=6 - day.weekday())
+    next_month = date(day.year + (day.month == 12), day.month % 12 + 1, 1)
+    return next_month - timedelta(days=1)
+
+def active_windows(day: date) -> List[Tuple[str, str]]:
+    """(period, window key) of every window containing `day`."""
+    return [(period, window_key(period, day)) for period in PERIODS]
+
+def session_volume(logs: List[Dict[str, Any]]) -> int:
+    """Total kg lifted (reps x weight) in a list of sets."""
+    return int(sum((log.get("reps") or 0) * (log.get("weight_kg") or 0) for log in logs))
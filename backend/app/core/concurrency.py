@@ -0,0 +1,14 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List
+
+# Shared pool for issuing independent Firestore reads at the same time.
+# The Firestore client is thread-safe; each call still blocks its worker thread.
+_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="parallel-io")
+
+def run_parallel(*calls: Callable[[], Any]) -> List[Any]:
+    """
+    Run zero-argument callables concurrently and return their results in order.
+    The first exception raised by any call is re-raised.
+    """
+    futures = [_executor.submit(call) for call in calls]
+    return [future.result() for future in futures]
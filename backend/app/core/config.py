@@ -12,6 +12,10 @@ class Settings(BaseSettings):
     SECRET_KEY: str = "YOUR_SUPER_SECRET_KEY_HERE_CHANGE_IN_PRODUCTION"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8 # 8 days
 
+    # Storage layout for sets embedded in scheduled_workouts:
+    # "rows" (one map per set) or "columnar" (packed parallel arrays, see app/core/workout_codec.py)
+    WORKOUT_LOG_ENCODING: str = "rows"
+
     class Config:
         case_sensitive = True
         env_file = ".env"
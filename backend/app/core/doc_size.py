@@ -0,0 +1,28 @@
+"""
+Firestore document size accounting.
+"""
+from datetime import datetime
+from typing import Any
+
+# Firestore rejects documents bigger than 1 MiB
+MAX_DOCUMENT_BYTES = 1_048_576
+
+
+def estimate_size(value: Any) -> int:
+    """
+    Approximate Firestore storage size of a value
+    (strings are UTF-8 bytes + 1, numbers and timestamps 8 bytes, maps add their keys).
+    """
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 1
+    if isinstance(value, bytes):
+        return len(value) + 1
+    if isinstance(value, dict):
+        return sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(estimate_size(v) for v in value)
+    return 8
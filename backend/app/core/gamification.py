@@ -1,4 +1,5 @@
-from math import floor
+from math import isqrt
+from typing import Tuple
 
 def calculate_level(xp: int) -> int:
     """
@@ -20,7 +21,28 @@ def calculate_level(xp: int) -> int:
     Lvl 100 would be 99^2 * 100 = 980,100 XP. Achievable over long term.
     """
     if xp < 0: return 1
-    return floor((xp / 100) ** 0.5) + 1
+    # Integer square root: exact for any XP, no float rounding at the thresholds
+    return isqrt(xp // 100) + 1
+
+def level_bounds(level: int) -> Tuple[int, int]:
+    """
+    Total XP at which `level` starts and at which the next level starts.
+    """
+    return (level - 1) ** 2 * 100, level ** 2 * 100
+
+def level_matches(level: int, xp: int) -> bool:
+    """
+    Whether a stored level is still right for `xp` (two multiplications, no sqrt).
+    """
+    if xp < 0: return level == 1
+    start_xp, end_xp = level_bounds(level)
+    return start_xp <= xp < end_xp
+
+def crosses_threshold(old_xp: int, new_xp: int) -> bool:
+    """
+    True if going from old_xp to new_xp changes the level.
+    """
+    return calculate_level(old_xp) != calculate_level(new_xp)
 
 def calculate_xp_for_next_level(level: int) -> int:
     """
@@ -0,0 +1,13 @@
+"""
+Calendar period keys shared by rollups and challenge windows.
+"""
+from datetime import date
+
+
+def week_key(day: date) -> str:
+    iso_year, iso_week, _ = day.isocalendar()
+    return f"{iso_year}-W{iso_week:02d}"
+
+
+def month_key(day: date) -> str:
+    return f"{day.year}-{day.month:02d}"
@@ -0,0 +1,143 @@
+"""
+Order-statistic index over user XP.
+
+A Fenwick tree counts users per XP bucket; each bucket keeps its users
+sorted by (-xp, user_id), so ties are ordered and ranks stay exact even when
+many users share a bucket. Buckets are indexed from the top (bucket 0 holds
+the most XP), which makes "how many users are ahead of me" a prefix sum.
+
+    update / remove     O(log B + b)
+    rank / percentile   O(log B + log b)
+    top(offset, limit)  O(log B) to find the first bucket, then O(log B) per bucket crossed
+
+B is the number of buckets, b the users in one bucket. Bucket width is small
+enough that b stays tiny in practice; XP beyond the last bucket shares it.
+"""
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_BUCKET_WIDTH = 10
+DEFAULT_NUM_BUCKETS = 1 << 20  # 10 XP buckets up to ~10.5M XP (level ~324)
+
+
+class XPRankIndex:
+    def __init__(self, num_buckets: int = DEFAULT_NUM_BUCKETS, bucket_width: int = DEFAULT_BUCKET_WIDTH):
+        self.num_buckets = num_buckets
+        self.bucket_width = bucket_width
+        self._tree = [0] * (num_buckets + 1)
+        self._buckets: Dict[int, List[Tuple[int, str]]] = {}
+        self._xp: Dict[str, int] = {}
+        # Highest power of two <= num_buckets, for the k-th search
+        self._top_bit = 1 << (num_buckets.bit_length() - 1)
+
+    def __len__(self) -> int:
+        return len(self._xp)
+
+    def __contains__(self, user_id: str) -> bool:
+        return user_id in self._xp
+
+    def get(self, user_id: str) -> Optional[int]:
+        return self._xp.get(user_id)
+
+    def _bucket(self, xp: int) -> int:
+        # 0 is the highest bucket
+        b = max(0, xp) // self.bucket_width
+        return max(0, self.num_buckets - 1 - b)
+
+    def _add(self, bucket: int, delta: int) -> None:
+        i = bucket + 1
+        while i <= self.num_buckets:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _prefix(self, bucket: int) -> int:
+        """Users in buckets [0, bucket)."""
+        total, i = 0, bucket
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _find(self, k: int) -> int:
+        """Bucket holding the k-th user from the top (0-based k)."""
+        pos, remaining = 0, k
+        step = self._top_bit
+        while step:
+            nxt = pos + step
+            if nxt <= self.num_buckets and self._tree[nxt] <= remaining:
+                pos = nxt
+                remaining -= self._tree[nxt]
+            step >>= 1
+        return pos
+
+    def load(self, items: Iterable[Tuple[str, int]]) -> None:
+        """
+        Replace the contents with (user_id, xp) pairs in one pass (one sort and
+        a linear Fenwick build instead of n inserts), used for warm starts.
+        """
+        self._xp = dict(items)
+        self._buckets = {}
+        counts = [0] * (self.num_buckets + 1)
+        for neg_xp, user_id in sorted((-xp, user_id) for user_id, xp in self._xp.items()):
+            bucket = self._bucket(-neg_xp)
+            self._buckets.setdefault(bucket, []).append((neg_xp, user_id))
+            counts[bucket + 1] += 1
+        for i in range(1, self.num_buckets + 1):
+            parent = i + (i & -i)
+            if parent <= self.num_buckets:
+                counts[parent] += counts[i]
+        self._tree = counts
+
+    def update(self, user_id: str, xp: int) -> None:
+        old = self._xp.get(user_id)
+        if old == xp:
+            return
+        if old is not None:
+            self.remove(user_id)
+        bucket = self._bucket(xp)
+        insort(self._buckets.setdefault(bucket, []), (-xp, user_id))
+        self._add(bucket, 1)
+        self._xp[user_id] = xp
+
+    def remove(self, user_id: str) -> None:
+        xp = self._xp.pop(user_id, None)
+        if xp is None:
+            return
+        bucket = self._bucket(xp)
+        entries = self._buckets[bucket]
+        del entries[bisect_left(entries, (-xp, user_id))]
+        if not entries:
+            del self._buckets[bucket]
+        self._add(bucket, -1)
+
+    def rank(self, user_id: str) -> Optional[int]:
+        """1-based position, or None if the user is not indexed."""
+        xp = self._xp.get(user_id)
+        if xp is None:
+            return None
+        bucket = self._bucket(xp)
+        return self._prefix(bucket) + bisect_left(self._buckets[bucket], (-xp, user_id)) + 1
+
+    def percentile(self, user_id: str) -> Optional[float]:
+        """Share of users strictly behind this one, 0-100."""
+        rank = self.rank(user_id)
+        if rank is None:
+            return None
+        return round((len(self._xp) - rank) * 100 / len(self._xp), 2)
+
+    def top(self, offset: int = 0, limit: int = 10) -> List[Tuple[int, str, int]]:
+        """(rank, user_id, xp) for positions offset+1 .. offset+limit."""
+        result: List[Tuple[int, str, int]] = []
+        position = offset
+        while len(result) < limit and position < len(self._xp):
+            # Jumps straight to the next non-empty bucket
+            bucket = self._find(position)
+            entries = self._buckets[bucket]
+            start = position - self._prefix(bucket)
+            for neg_xp, user_id in entries[start:start + limit - len(result)]:
+                position += 1
+                result.append((position, user_id, -neg_xp))
+        return result
+
+    def items(self) -> Iterator[Tuple[str, int]]:
+        return iter(self._xp.items())
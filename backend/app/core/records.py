@@ -0,0 +1,99 @@
+"""
+Personal records per exercise.
+
+A record document holds the user's best set for each record type plus the
+most reps done at every weight used so far:
+
+    max_weight      heaviest set (ties go to more reps)
+    estimated_1rm   best Epley estimated one-rep max
+    volume_set      best single-set volume (reps x weight)
+    reps_at_weight  {weight in centigrams: most reps}
+
+`merge_records` folds new sets into a record and reports which records they
+broke. Setting a record for the first time (no previous value) is not a break.
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from app.core.analytics import estimate_1rm
+
+RECORD_TYPES = ("max_weight", "estimated_1rm", "volume_set")
+
+
+def weight_key(weight_kg: float) -> str:
+    # Map keys as integers so 102.5 and 102.50 are the same weight and no '.' ends up in a field path
+    return str(int(round(weight_kg * 100)))
+
+
+def set_scores(reps: int, weight_kg: float) -> Dict[str, Tuple[float, ...]]:
+    """
+    Comparable score of one set per record type (higher is better).
+    """
+    e1rm = float(estimate_1rm(weight_kg, reps))
+    return {
+        "max_weight": (weight_kg, reps),
+        "estimated_1rm": (round(e1rm, 1),),
+        "volume_set": (reps * weight_kg,),
+    }
+
+
+def _entry(record_type: str, reps: int, weight_kg: float, day: str, workout_id: Optional[str]) -> Dict[str, Any]:
+    value = set_scores(reps, weight_kg)[record_type][0]
+    return {"value": value, "reps": reps, "weight_kg": weight_kg, "date": day, "workout_id": workout_id}
+
+
+def _score(record_type: str, entry: Optional[Dict[str, Any]]) -> Optional[Tuple[float, ...]]:
+    if not entry:
+        return None
+    return set_scores(entry.get("reps") or 0, entry.get("weight_kg") or 0)[record_type]
+
+
+def merge_records(
+    record: Optional[Dict[str, Any]],
+    sets: Iterable[Dict[str, Any]],
+    day: str,
+    workout_id: Optional[str] = None,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Fold `sets` (dicts with reps and weight_kg, all of one exercise) into `record`.
+    Returns (changed fields, broken records). Both are empty when nothing improved.
+    """
+    record = record or {}
+    best = {t: record.get(t) for t in RECORD_TYPES}
+    best_scores = {t: _score(t, best[t]) for t in RECORD_TYPES}
+    reps_at_weight = dict(record.get("reps_at_weight") or {})
+    changes: Dict[str, Any] = {}
+    # stored value per break, so a record beaten twice in one session is reported once
+    broken: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    for s in sets:
+        reps, weight = int(s.get("reps") or 0), float(s.get("weight_kg") or 0)
+        if reps <= 0 or weight < 0:
+            continue
+        scores = set_scores(reps, weight)
+        for record_type in RECORD_TYPES:
+            if weight == 0 or (best_scores[record_type] is not None and scores[record_type] <= best_scores[record_type]):
+                continue
+            # Only a stored record can be broken, not one set earlier in `sets`
+            if record.get(record_type) is not None:
+                broken.setdefault((record_type, ""), {"previous": record[record_type]["value"]})
+            best[record_type] = changes[record_type] = _entry(record_type, reps, weight, day, workout_id)
+            best_scores[record_type] = scores[record_type]
+
+        key = weight_key(weight)
+        previous_reps = reps_at_weight.get(key)
+        if previous_reps is None or reps > previous_reps:
+            stored_reps = (record.get("reps_at_weight") or {}).get(key)
+            if stored_reps is not None:
+                broken.setdefault(("reps_at_weight", key), {"previous": stored_reps})
+            reps_at_weight[key] = reps
+            changes["reps_at_weight"] = reps_at_weight
+
+    breaks = []
+    for (record_type, key), info in broken.items():
+        if record_type == "reps_at_weight":
+            weight = int(key) / 100
+            breaks.append({"type": record_type, "value": reps_at_weight[key], "previous": info["previous"], "reps": reps_at_weight[key], "weight_kg": weight})
+        else:
+            entry = best[record_type]
+            breaks.append({"type": record_type, "value": entry["value"], "previous": info["previous"], "reps": entry["reps"], "weight_kg": entry["weight_kg"]})
+    return changes, breaks
@@ -0,0 +1,178 @@
+"""
+Denormalized routine snapshots.
+
+A routine document carries its whole plan so detail, preview and import
+read one document:
+
+    snapshot: {
+        version: int,      # bumped on every change
+        days: [{day_of_week, exercises: [routine exercise row + "exercise": {id, name, muscle_group, video_url}]}],
+    }
+    exercise_ids: [...]    # top level, so routines using an exercise can be found with array_contains
+
+Rows are the routine_exercises documents (with their id), which stay the
+source of truth; the snapshot is rebuilt or patched whenever they or a
+referenced exercise change.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+# Catalog fields copied into the snapshot
+EMBEDDED_EXERCISE_FIELDS = ("name", "muscle_group", "video_url")
+
+
+def embed_exercise(exercise_id: str, exercise: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if exercise is None:
+        return None
+    embedded = {field: exercise.get(field) for field in EMBEDDED_EXERCISE_FIELDS}
+    embedded["id"] = exercise_id
+    return embedded
+
+
+def _row_key(row: Dict[str, Any]):
+    return (row.get("day_of_week") or 0, row.get("order_index") or 0, row.get("id") or "")
+
+
+def build_snapshot(rows: Iterable[Dict[str, Any]], exercises: Dict[str, Dict[str, Any]], version: int) -> Dict[str, Any]:
+    """
+    Snapshot from routine_exercises rows (dicts with "id") and the catalog
+    entries they reference, keyed by exercise id.
+    """
+    days: Dict[int, List[Dict[str, Any]]] = {}
+    for row in sorted(rows, key=_row_key):
+        entry = {k: v for k, v in row.items() if k not in ("routine_id", "exercise")}
+        entry["exercise"] = embed_exercise(row.get("exercise_id"), exercises.get(row.get("exercise_id")))
+        days.setdefault(row.get("day_of_week") or 0, []).append(entry)
+    return {
+        "version": version,
+        "days": [{"day_of_week": day, "exercises": entries} for day, entries in sorted(days.items())],
+    }
+
+
+def snapshot_exercise_ids(snapshot: Dict[str, Any]) -> List[str]:
+    return sorted({entry["exercise_id"] for day in snapshot.get("days", []) for entry in day["exercises"] if entry.get("exercise_id")})
+
+
+def flatten(snapshot: Dict[str, Any], routine_id: str) -> List[Dict[str, Any]]:
+    """
+    The snapshot as the flat `exercises` list routine responses carry.
+    """
+    return [
+        dict(entry, routine_id=routine_id)
+        for day in snapshot.get("days", [])
+        for entry in day["exercises"]
+    ]
+
+
+def patch_exercise(snapshot: Dict[str, Any], exercise_id: str, exercise: Optional[Dict[str, Any]]) -> bool:
+    """
+    Update the embedded copies of one catalog exercise in place and bump the
+    version. Returns False if the snapshot does not reference it.
+    """
+    changed = False
+    for day in snapshot.get("days", []):
+        for entry in day["exercises"]:
+            if entry.get("exercise_id") == exercise_id:
+                entry["exercise"] = embed_exercise(exercise_id, exercise)
+                changed = True
+    if changed:
+        snapshot["version"] = snapshot.get("version", 0) + 1
+    return changed
+
+
+# --- Partial edits ---
+
+# Row fields a patch may set
+ROW_FIELDS = ("exercise_id", "target_sets", "target_reps_min", "target_reps_max", "reps_display")
+OPS = ("add_exercise", "update_exercise", "remove_exercise", "move_exercise", "replace_day", "remove_day")
+
+
+def _row_fields(fields: Optional[Dict[str, Any]], clear: bool = False) -> Dict[str, Any]:
+    """
+    The row fields of `fields`. None values are dropped, or kept with
+    `clear` so an update can unset a field (except exercise_id).
+    """
+    return {
+        k: v for k, v in (fields or {}).items()
+        if k in ROW_FIELDS and (v is not None or (clear and k != "exercise_id"))
+    }
+
+
+def apply_ops(
+    snapshot: Dict[str, Any],
+    ops: List[Dict[str, Any]],
+    new_row_id: Callable[[], str],
+) -> Tuple[Dict[str, Dict[str, Any]], Set[str], Set[str]]:
+    """
+    Apply edit operations to the rows of a snapshot.
+
+    Each op is a dict with "op" (one of OPS) and, depending on it, "row_id",
+    "day_of_week", "index" (position within the day, default last), "exercise"
+    (row fields; a None value clears the field on update_exercise) or
+    "exercises" (list of row fields, for replace_day).
+    Order indexes are renumbered per day afterwards.
+
+    Returns (rows by id after the edit, ids of new or changed rows, ids of
+    removed rows). Raises ValueError on an invalid op.
+    """
+    rows: Dict[str, Dict[str, Any]] = {}
+    days: Dict[int, List[str]] = {}
+    for day in snapshot.get("days", []):
+        for entry in day["exercises"]:
+            rows[entry["id"]] = {k: v for k, v in entry.items() if k != "exercise"}
+            days.setdefault(day["day_of_week"], []).append(entry["id"])
+    original = {row_id: dict(row) for row_id, row in rows.items()}
+
+    def locate(row_id: Optional[str]) -> int:
+        if row_id not in rows:
+            raise ValueError(f"Unknown routine exercise: {row_id}")
+        return rows[row_id]["day_of_week"]
+
+    def insert(day: int, row_id: str, index: Optional[int]) -> None:
+        order = days.setdefault(day, [])
+        order.insert(len(order) if index is None else max(0, min(index, len(order))), row_id)
+
+    def add(day: int, fields: Dict[str, Any], index: Optional[int]) -> None:
+        if not fields.get("exercise_id"):
+            raise ValueError("exercise_id is required")
+        row_id = new_row_id()
+        rows[row_id] = dict(fields, id=row_id, day_of_week=day)
+        insert(day, row_id, index)
+
+    for op in ops:
+        kind = op.get("op")
+        if kind == "add_exercise":
+            if not op.get("day_of_week"):
+                raise ValueError("day_of_week is required")
+            add(op["day_of_week"], _row_fields(op.get("exercise")), op.get("index"))
+        elif kind == "update_exercise":
+            locate(op.get("row_id"))
+            rows[op["row_id"]].update(_row_fields(op.get("exercise"), clear=True))
+        elif kind == "remove_exercise":
+            days[locate(op.get("row_id"))].remove(op["row_id"])
+            del rows[op["row_id"]]
+        elif kind == "move_exercise":
+            day = locate(op.get("row_id"))
+            days[day].remove(op["row_id"])
+            target = op.get("day_of_week") or day
+            rows[op["row_id"]]["day_of_week"] = target
+            insert(target, op["row_id"], op.get("index"))
+        elif kind in ("replace_day", "remove_day"):
+            day = op.get("day_of_week")
+            if not day:
+                raise ValueError("day_of_week is required")
+            for row_id in days.pop(day, []):
+                del rows[row_id]
+            if kind == "replace_day":
+                for fields in op.get("exercises") or []:
+                    add(day, _row_fields(fields), None)
+        else:
+            raise ValueError(f"Unknown operation: {kind}")
+
+    for day, order in days.items():
+        for index, row_id in enumerate(order):
+            rows[row_id]["order_index"] = index
+            rows[row_id]["day_of_week"] = day
+
+    changed = {row_id for row_id, row in rows.items() if original.get(row_id) != row}
+    removed = set(original) - set(rows)
+    return rows, changed, removed
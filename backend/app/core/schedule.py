@@ -0,0 +1,46 @@
+"""
+Recurring schedule rules.
+
+A rule repeats a routine on some weekdays (1 = Monday ... 7 = Sunday, the
+numbering of routine_exercises.day_of_week) between two dates. Its
+occurrences are never stored up front: they are expanded on read and
+identified by "{rule_id}_{YYYY-MM-DD}", which is also the id of the
+scheduled_workouts document an occurrence becomes once materialized.
+"""
+from datetime import date, timedelta
+from typing import Iterable, Iterator, Optional, Tuple
+
+# Longest span a rule may cover (a year, leap day included)
+MAX_RULE_DAYS = 366
+
+
+def occurrence_id(rule_id: str, day: date) -> str:
+    return f"{rule_id}_{day.isoformat()}"
+
+
+def parse_occurrence_id(workout_id: str) -> Optional[Tuple[str, date]]:
+    """(rule_id, day) of an occurrence id, or None for any other workout id."""
+    rule_id, _, day = workout_id.rpartition("_")
+    if not rule_id:
+        return None
+    try:
+        return rule_id, date.fromisoformat(day)
+    except ValueError:
+        return None
+
+
+def expand(weekdays: Iterable[int], rule_start: date, rule_end: date, start: date, end: date) -> Iterator[date]:
+    """
+    Days of the rule that fall within [start, end], in order.
+    """
+    days = set(weekdays)
+    first, last = max(rule_start, start), min(rule_end, end)
+    day = first
+    while day <= last:
+        if day.isoweekday() in days:
+            yield day
+        day += timedelta(days=1)
+
+
+def occurs_on(weekdays: Iterable[int], rule_start: date, rule_end: date, day: date) -> bool:
+    return rule_start <= day <= rule_end and day.isoweekday() in set(weekdays)
@@ -0,0 +1,216 @@
+"""
+Cosine similarity between routines.
+
+A routine is a sparse vector over its exercises and their muscle groups,
+weighted by planned sets:
+
+    "ex:{exercise_id}"    total target sets of that exercise
+    "mg:{muscle_group}"   total target sets on that group x MUSCLE_GROUP_WEIGHT
+
+so routines sharing exercises score highest and routines training the same
+groups with different exercises still score above unrelated ones.
+
+`SimilarityIndex` keeps the L2-normalized vectors as a column-major sparse
+matrix (one posting list of (row, value) per feature), which makes a query
+touch only the features the query routine has. Features present in most
+rows (muscle groups, by their "mg:" prefix) are kept in a small dense block
+instead and scored with one matrix-vector product:
+
+    add / update   O(nnz), amortized
+    remove         O(1) (tombstone; rows are compacted once a quarter are dead)
+    top_k          O(sum of the query features' posting lengths + rows x dense features)
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+# Muscle groups count less than the exercises themselves
+MUSCLE_GROUP_WEIGHT = 0.5
+# Sets assumed for a row without target_sets
+DEFAULT_SETS = 3
+# Compact once this fraction of the rows are removed
+COMPACT_DEAD_FRACTION = 0.25
+# Features stored densely
+DENSE_PREFIXES = ("mg:",)
+_INITIAL_CAPACITY = 16
+
+
+def routine_vector(snapshot: Optional[Dict[str, Any]]) -> Dict[str, float]:
+    """
+    Feature weights of a routine from its snapshot (app/core/routine_snapshot.py).
+    """
+    vector: Dict[str, float] = {}
+    for day in (snapshot or {}).get("days", []):
+        for entry in day["exercises"]:
+            if not entry.get("exercise_id"):
+                continue
+            sets = float(entry.get("target_sets") or DEFAULT_SETS)
+            key = f"ex:{entry['exercise_id']}"
+            vector[key] = vector.get(key, 0.0) + sets
+            group = (entry.get("exercise") or {}).get("muscle_group")
+            if group:
+                key = f"mg:{group}"
+                vector[key] = vector.get(key, 0.0) + sets * MUSCLE_GROUP_WEIGHT
+    return vector
+
+
+class _Postings:
+    """
+    Growable (row, value) arrays of one feature column.
+    """
+    __slots__ = ("rows", "values", "size")
+
+    def __init__(self):
+        self.rows = np.empty(_INITIAL_CAPACITY, dtype=np.int32)
+        self.values = np.empty(_INITIAL_CAPACITY, dtype=np.float32)
+        self.size = 0
+
+    def append(self, row: int, value: float) -> None:
+        if self.size == len(self.rows):
+            self.rows = np.resize(self.rows, 2 * self.size)
+            self.values = np.resize(self.values, 2 * self.size)
+        self.rows[self.size] = row
+        self.values[self.size] = value
+        self.size += 1
+
+
+class SimilarityIndex:
+    def __init__(self, dense_prefixes: Tuple[str, ...] = DENSE_PREFIXES):
+        self.dense_prefixes = dense_prefixes
+        self._features: Dict[str, int] = {}
+        self._postings: List[_Postings] = []
+        self._dense_features: Dict[str, int] = {}
+        self._dense = np.zeros((_INITIAL_CAPACITY, 0), dtype=np.float32)
+        self._slot: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        # Normalized vector of each row as _encode returns it, kept for compaction
+        self._vectors: List[Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]] = []
+        self._alive = np.zeros(_INITIAL_CAPACITY, dtype=bool)
+        self._dead = 0
+
+    def __len__(self) -> int:
+        return len(self._slot)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._slot
+
+    def _dense_code(self, feature: str, create: bool) -> Optional[int]:
+        code = self._dense_features.get(feature)
+        if code is None and create:
+            code = self._dense_features[feature] = self._dense.shape[1]
+            self._dense = np.pad(self._dense, ((0, 0), (0, 1)))
+        return code
+
+    def _encode(self, vector: Dict[str, float], create: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Normalized (sparse feature codes, their values, dense part). Unknown
+        features are dropped unless `create`, as they cannot match anything in
+        the index.
+        """
+        codes, values, dense = [], [], {}
+        for feature, weight in vector.items():
+            if weight <= 0:
+                continue
+            if feature.startswith(self.dense_prefixes):
+                code = self._dense_code(feature, create)
+                if code is not None:
+                    dense[code] = weight
+                continue
+            code = self._features.get(feature)
+            if code is None:
+                if not create:
+                    continue
+                code = self._features[feature] = len(self._postings)
+                self._postings.append(_Postings())
+            codes.append(code)
+            values.append(weight)
+        values_arr = np.asarray(values, dtype=np.float32)
+        dense_arr = np.zeros(self._dense.shape[1], dtype=np.float32)
+        dense_arr[list(dense)] = list(dense.values())
+        # Norm over the full vector, so dropped features still lower the score
+        norm = np.sqrt(sum(w * w for w in vector.values() if w > 0))
+        if norm > 0:
+            values_arr /= norm
+            dense_arr /= norm
+        return np.asarray(codes, dtype=np.int32), values_arr, dense_arr
+
+    def add(self, item_id: str, vector: Dict[str, float]) -> None:
+        """
+        Insert or replace an item. Items with an empty vector are not indexed.
+        """
+        self.remove(item_id)
+        if not any(w > 0 for w in vector.values()):
+            return
+        self._insert(item_id, *self._encode(vector, create=True))
+
+    def _insert(self, item_id: str, codes: np.ndarray, values: np.ndarray, dense: np.ndarray) -> None:
+        row = len(self._ids)
+        if row == len(self._alive):
+            self._alive = np.resize(self._alive, 2 * row)
+            self._dense = np.pad(self._dense, ((0, row), (0, 0)))
+        self._alive[row] = True
+        self._dense[row, :len(dense)] = dense
+        self._ids.append(item_id)
+        self._vectors.append((codes, values, dense))
+        self._slot[item_id] = row
+        for code, value in zip(codes.tolist(), values.tolist()):
+            self._postings[code].append(row, value)
+
+    def remove(self, item_id: str) -> bool:
+        row = self._slot.pop(item_id, None)
+        if row is None:
+            return False
+        self._alive[row] = False
+        self._ids[row] = None
+        self._vectors[row] = None
+        self._dead += 1
+        if self._dead > COMPACT_DEAD_FRACTION * len(self._ids):
+            self._compact()
+        return True
+
+    def _compact(self) -> None:
+        live = [(item_id, vec) for item_id, vec in zip(self._ids, self._vectors) if item_id is not None]
+        self._postings = [_Postings() for _ in self._postings]
+        self._slot, self._ids, self._vectors = {}, [], []
+        capacity = max(_INITIAL_CAPACITY, 2 * len(live))
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._dense = np.zeros((capacity, self._dense.shape[1]), dtype=np.float32)
+        self._dead = 0
+        for item_id, vector in live:
+            self._insert(item_id, *vector)
+
+    def load(self, items: Iterable[Tuple[str, Dict[str, float]]]) -> None:
+        for item_id, vector in items:
+            self.add(item_id, vector)
+
+    def scores(self, vector: Dict[str, float]) -> np.ndarray:
+        """
+        Cosine similarity of `vector` to every row (0 for removed rows).
+        """
+        codes, values, dense = self._encode(vector, create=False)
+        n = len(self._ids)
+        scores = self._dense[:n] @ dense if dense.any() else np.zeros(n, dtype=np.float32)
+        for code, value in zip(codes.tolist(), values.tolist()):
+            postings = self._postings[code]
+            # Rows are unique within a posting list, so fancy-index += is exact
+            scores[postings.rows[:postings.size]] += value * postings.values[:postings.size]
+        scores[~self._alive[:len(self._ids)]] = 0.0
+        return scores
+
+    def top_k(self, vector: Dict[str, float], k: int = 10, exclude: Iterable[str] = ()) -> List[Tuple[str, float]]:
+        """
+        The `k` most similar items as (id, score), best first. Items with no
+        feature in common are never returned.
+        """
+        if k <= 0:
+            return []
+        scores = self.scores(vector)
+        for item_id in exclude:
+            row = self._slot.get(item_id)
+            if row is not None:
+                scores[row] = 0.0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        order = candidates[np.lexsort((candidates, -scores[candidates]))]
+        return [(self._ids[row], round(float(scores[row]), 4)) for row in order]
@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+from typing import Any, Dict, Optional
+
+def week_start(day: date) -> date:
+    """Monday of the ISO week containing `day`."""
+    return day - timedelta(days=day.weekday())
+
+def empty_streak() -> Dict[str, Any]:
+    return {
+        "last_day": None,
+        "current_days": 0,
+        "longest_days": 0,
+        "last_week": None,
+        "current_weeks": 0,
+        "longest_weeks": 0,
+    }
+
+def advance_streak(streak: Optional[Dict[str, Any]], day: date) -> Optional[Dict[str, Any]]:
+    """
+    Streak state after a workout completed on `day`, or None if nothing changes.
+
+    Only the last active day/week is kept, so this is O(1). A completion older
+    than the last active day cannot be placed without the history and is
+    ignored (the backfill job recomputes those from scratch).
+    """
+    state = dict(empty_streak(), **(streak or {}))
+    last_day = date.fromisoformat(state["last_day"]) if state["last_day"] else None
+    if last_day is not None and day <= last_day:
+        return None
+
+    if last_day is not None and day - last_day == timedelta(days=1):
+        state["current_days"] += 1
+    else:
+        state["current_days"] = 1
+    state["longest_days"] = max(state["longest_days"], state["current_days"])
+    state["last_day"] = day.isoformat()
+
+    week = week_start(day)
+    last_week = date.fromisoformat(state["last_week"]) if state["last_week"] else None
+    if last_week != week:
+        if last_week is not None and week - last_week == timedelta(weeks=1):
+            state["current_weeks"] += 1
+        else:
+            state["current_weeks"] = 1
+        state["longest_weeks"] = max(state["longest_weeks"], state["current_weeks"])
+        state["last_week"] = week.isoformat()
+    return state
+
+def current_streaks(streak: Optional[Dict[str, Any]], today: date) -> Dict[str, int]:
+    """
+    Streaks as of `today`: a day streak is still alive if the last workout was
+    today or yesterday, a week streak if it was this week or the previous one.
+    """
+    state = dict(empty_streak(), **(streak or {}))
+    days = weeks = 0
+    if state["last_day"] and today - date.fromisoformat(state["last_day"]) <= timedelta(days=1):
+        days = state["current_days"]
+    if state["last_week"] and week_start(today) - date.fromisoformat(state["last_week"]) <= timedelta(weeks=1):
+        weeks = state["current_weeks"]
+    return {
+        "current_days": days,
+        "longest_days": state["longest_days"],
+        "current_weeks": weeks,
+        "longest_weeks": state["longest_weeks"],
+    }
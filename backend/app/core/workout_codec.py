@@ -0,0 +1,130 @@
+"""
+Columnar encoding for the sets embedded in a scheduled workout.
+
+Instead of one map per set (repeating workout_id, exercise_id, id, created_at
+and every field name), a session is stored as parallel packed arrays:
+
+    {
+        "v": 1,
+        "count": 42,
+        "exercises": ["<exercise_id>", ...],   # index table
+        "exercise_idx": <uint16 bytes>,         # per set, index into `exercises`
+        "set_number": <uint16 bytes>,
+        "reps": <uint16 bytes>,
+        "weight_cg": <int32 bytes>,             # weight in centi-kilos (exact to 0.01 kg)
+        "base_ts": "2024-01-01T10:00:00",
+        "ts_delta_ms": <uint32 bytes>,          # milliseconds since base_ts
+        "notes": {"<index>": "..."},            # sparse, only sets with notes
+    }
+
+Log ids are not stored; decoded sets get `<workout_id>-<index>`.
+Sessions with a value outside its column's range (negative reps, sets more
+than ~49 days apart...) are not packed and stay as rows.
+"""
+
+import sys
+from array import array
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+CODEC_VERSION = 1
+
+# Values each packed typecode can hold
+TYPE_RANGES = {"H": (0, 0xFFFF), "i": (-2**31, 2**31 - 1), "I": (0, 0xFFFFFFFF)}
+
+def _fits(typecode: str, values: List[int]) -> bool:
+    low, high = TYPE_RANGES[typecode]
+    return all(low <= value <= high for value in values)
+
+def _pack(typecode: str, values: List[int]) -> bytes:
+    arr = array(typecode, values)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tobytes()
+
+def _unpack(typecode: str, data: bytes) -> List[int]:
+    arr = array(typecode)
+    arr.frombytes(data)
+    if sys.byteorder == "big":
+        arr.byteswap()
+    return arr.tolist()
+
+def _parse_ts(value: Any) -> datetime:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None)
+    if isinstance(value, str) and value:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).replace(tzinfo=None)
+    return datetime.utcnow()
+
+def encode_logs(logs: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Pack a list of log dicts (WorkoutLog layout) into the columnar format.
+    Returns None if a value does not fit its column; store those logs as rows.
+    """
+    exercises: List[str] = []
+    exercise_index: Dict[str, int] = {}
+    exercise_idx, set_numbers, reps, weights, deltas = [], [], [], [], []
+    notes: Dict[str, str] = {}
+
+    timestamps = [_parse_ts(log.get("created_at")) for log in logs]
+    base_ts = min(timestamps) if timestamps else datetime.utcnow()
+
+    for i, log in enumerate(logs):
+        ex_id = log["exercise_id"]
+        if ex_id not in exercise_index:
+            exercise_index[ex_id] = len(exercises)
+            exercises.append(ex_id)
+        exercise_idx.append(exercise_index[ex_id])
+        set_numbers.append(int(log.get("set_number") or 0))
+        reps.append(int(log.get("reps") or 0))
+        weights.append(int(round(float(log.get("weight_kg") or 0) * 100)))
+        deltas.append(int((timestamps[i] - base_ts).total_seconds() * 1000))
+        if log.get("notes"):
+            notes[str(i)] = log["notes"]
+
+    columns = [("H", exercise_idx), ("H", set_numbers), ("H", reps), ("i", weights), ("I", deltas)]
+    if not all(_fits(typecode, values) for typecode, values in columns):
+        return None
+
+    return {
+        "v": CODEC_VERSION,
+        "count": len(logs),
+        "exercises": exercises,
+        "exercise_idx": _pack("H", exercise_idx),
+        "set_number": _pack("H", set_numbers),
+        "reps": _pack("H", reps),
+        "weight_cg": _pack("i", weights),
+        "base_ts": base_ts.isoformat(),
+        "ts_delta_ms": _pack("I", deltas),
+        "notes": notes,
+    }
+
+def decode_logs(packed: Dict[str, Any], workout_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Expand the columnar format back into log dicts matching the WorkoutLog schema.
+    """
+    if packed.get("v") != CODEC_VERSION:
+        raise ValueError(f"Unsupported workout log encoding version: {packed.get('v')}")
+
+    exercises = packed.get("exercises", [])
+    exercise_idx = _unpack("H", packed["exercise_idx"])
+    set_numbers = _unpack("H", packed["set_number"])
+    reps = _unpack("H", packed["reps"])
+    weights = _unpack("i", packed["weight_cg"])
+    deltas = _unpack("I", packed["ts_delta_ms"])
+    notes = packed.get("notes", {})
+    base_ts = _parse_ts(packed.get("base_ts"))
+
+    logs = []
+    for i in range(packed.get("count", len(exercise_idx))):
+        logs.append({
+            "id": f"{workout_id}-{i}" if workout_id else str(i),
+            "workout_id": workout_id,
+            "exercise_id": exercises[exercise_idx[i]],
+            "set_number": set_numbers[i],
+            "reps": reps[i],
+            "weight_kg": weights[i] / 100,
+            "notes": notes.get(str(i)),
+            "created_at": (base_ts + timedelta(milliseconds=deltas[i])).isoformat(),
+        })
+    return logs
@@ -0,0 +1,18 @@
+from typing import Iterator, List
+from google.cloud import firestore
+
+from app.services.user import user as crud_user
+
+def user_id_pages(db: firestore.Client, page_size: int = 200) -> Iterator[List[str]]:
+    """
+    Yield pages of user ids, paginated by document name and reading no fields.
+    """
+    query = db.collection(crud_user.collection_name).order_by("__name__").limit(page_size)
+    last_doc = None
+    while True:
+        page = query.start_after(last_doc) if last_doc else query
+        docs = list(page.select([]).stream())
+        if not docs:
+            return
+        yield [doc.id for doc in docs]
+        last_doc = docs[-1]
@@ -0,0 +1,84 @@
+"""
+Archive finished challenge windows.
+
+For every window whose last day is before today, writes the final top
+standings of each metric to challenge_archives/{window} and then deletes the
+window's counter documents. Windows are processed one at a time, and the
+archive is written before any counter is deleted, so an interrupted run is
+simply repeated.
+
+Usage (from backend/):
+    python -m app.jobs.archive_challenges [--top 100] [--dry-run]
+"""
+import argparse
+from datetime import date, datetime
+from typing import Dict, List
+from google.cloud import firestore
+from google.cloud.firestore import FieldFilter
+
+from app.core.challenges import METRICS
+from app.services.challenges import challenges
+
+# Firestore allows 500 writes per batch
+BATCH_DELETES = 500
+
+def archive_window(db: firestore.Client, window: str, top: int = 100, dry_run: bool = False) -> dict:
+    docs = list(db.collection(challenges.collection_name).where(filter=FieldFilter("window", "==", window)).stream())
+    if not docs:
+        return {"window": window, "participants": 0}
+    rows = [doc.to_dict() for doc in docs]
+    standings: Dict[str, List[dict]] = {}
+    for metric, (field, _) in METRICS.items():
+        ranked = sorted(rows, key=lambda r: (-(r.get(field) or 0), r["user_id"]))[:top]
+        standings[metric] = [{"user_id": r["user_id"], "value": int(r.get(field) or 0)} for r in ranked]
+    archive = {
+        "window": window,
+        "period": rows[0].get("period"),
+        "ended_on": rows[0].get("ends_on"),
+        "participants": len(rows),
+        "archived_at": datetime.utcnow(),
+        "top": standings,
+    }
+    if dry_run:
+        return {"window": window, "participants": len(rows)}
+
+    db.collection(challenges.archive_collection).document(window).set(archive)
+    for start in range(0, len(docs), BATCH_DELETES):
+        batch = db.batch()
+        for doc in docs[start:start + BATCH_DELETES]:
+            batch.delete(doc.reference)
+        batch.commit()
+    return {"window": window, "participants": len(rows)}
+
+def archive_challenges(db: firestore.Client, today: date = None, top: int = 100, dry_run: bool = False) -> dict:
+    today = today or date.today()
+    finished = db.collection(challenges.collection_name)\
+                 .where(filter=FieldFilter("ends_on", "<", today.isoformat()))\
+                 .order_by("ends_on")\
+                 .order_by("window")\
+                 .select(["ends_on", "window"])\
+                 .limit(1)
+    stats = {"windows": [], "participants": 0}
+    cursor = None
+    while True:
+        # First counter of the next finished window; the cursor skips the rest of the previous one
+        page = finished.start_after(cursor) if cursor else finished
+        docs = list(page.stream())
+        if not docs:
+            break
+        window = docs[0].get("window")
+        result = archive_window(db, window, top=top, dry_run=dry_run)
+        cursor = {"ends_on": docs[0].get("ends_on"), "window": window}
+        stats["windows"].append(window)
+        stats["participants"] += result["participants"]
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top", type=int, default=100)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    from app.db.session import db
+    result = archive_challenges(db, top=args.top, dry_run=args.dry_run)
+    print(result)
@@ -0,0 +1,92 @@
+"""
+Recompute the counters of every user's daily_summary documents from their workouts.
+
+The summaries are normally kept current as workouts are scheduled, completed
+and edited; this job rebuilds workout_count, completed_count, calories_burned
+and time_minutes from history (for existing data, or after edits made before
+the summaries followed them). The day's mission is left as it is. Each user's
+workouts are streamed in chunks ordered by scheduled_date; days that have a
+summary but no workouts left are zeroed.
+Needs the composite index scheduled_workouts (user_id, scheduled_date).
+
+Usage (from backend/):
+    python -m app.jobs.backfill_daily_summary [--user USER_ID] [--dry-run]
+"""
+import argparse
+from typing import Dict, Optional
+from google.cloud import firestore
+from google.cloud.firestore import FieldFilter
+
+from app.jobs import user_id_pages
+from app.services.summary import daily_summary
+from app.services.tracking import scheduled_workout as crud_sw
+from app.services.user import user as crud_user
+
+COUNTER_FIELDS = ["workout_count", "completed_count", "calories_burned", "time_minutes"]
+SUMMARY_FIELDS = ["scheduled_date", "status", "routine_id", "duration_seconds", "calories_burned"]
+
+def compute_user_summaries(db: firestore.Client, user_id: str, chunk_size: int = 500) -> Dict[str, Dict[str, int]]:
+    query = db.collection(crud_sw.collection_name)\
+              .where(filter=FieldFilter("user_id", "==", user_id))\
+              .order_by("scheduled_date")\
+              .select(SUMMARY_FIELDS)\
+              .limit(chunk_size)
+    days: Dict[str, Dict[str, int]] = {}
+    last_doc = None
+    while True:
+        page = query.start_after(last_doc) if last_doc else query
+        docs = list(page.stream())
+        if not docs:
+            break
+        for doc in docs:
+            data = doc.to_dict()
+            value = data.get("scheduled_date")
+            if not value:
+                continue
+            day = days.setdefault(str(value)[:10], dict.fromkeys(COUNTER_FIELDS, 0))
+            amounts = daily_summary.contribution(
+                data.get("status"), data.get("calories_burned"), data.get("duration_seconds"), bool(data.get("routine_id")),
+            )
+            for field, amount in amounts.items():
+                day[field] += amount
+        last_doc = docs[-1]
+    return days
+
+def backfill_daily_summary(db: firestore.Client, user_id: Optional[str] = None, dry_run: bool = False, page_size: int = 200) -> dict:
+    stats = {"users": 0, "days": 0, "zeroed": 0}
+    pages = iter([[user_id]]) if user_id else user_id_pages(db, page_size)
+    for page in pages:
+        for uid in page:
+            stats["users"] += 1
+            days = compute_user_summaries(db, uid)
+            stored = db.collection(daily_summary.collection_name)\
+                       .where(filter=FieldFilter("user_id", "==", uid))\
+                       .select(["date"])\
+                       .stream()
+            for doc in stored:
+                date_str = doc.get("date")
+                if date_str and date_str not in days:
+                    days[date_str] = dict.fromkeys(COUNTER_FIELDS, 0)
+                    stats["zeroed"] += 1
+            stats["days"] += len(days)
+            if dry_run or not days:
+                continue
+            # Firestore batches hold at most 500 writes; one more for the cache version
+            items = sorted(days.items())
+            for start in range(0, len(items), 499):
+                batch = db.batch()
+                for date_str, counters in items[start:start + 499]:
+                    batch.set(daily_summary.doc_ref(db, uid, date_str), {"user_id": uid, "date": date_str, **counters}, merge=True)
+                crud_user.bump_cache_version(db, uid, "dashboard", "analytics", batch=batch)
+                batch.commit()
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", dest="user_id", default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    from app.db.session import db
+    result = backfill_daily_summary(db, user_id=args.user_id, dry_run=args.dry_run)
+    print(result)
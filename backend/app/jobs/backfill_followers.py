@@ -0,0 +1,54 @@
+"""
+Recompute every user's `followers` achievement counter from the follows collection.
+
+The counter is normally moved by follow/unfollow events, so users who had
+followers before the achievements engine started at zero (and went negative
+when unfollowed). This job counts each user's follows, stores the total and
+awards the follower badges it already reaches (badges held are skipped).
+Run it once after deploying the achievements engine, while follow traffic is
+low: a follow landing between the count and the write is lost until the next run.
+
+Usage (from backend/):
+    python -m app.jobs.backfill_followers [--user USER_ID] [--dry-run]
+"""
+import argparse
+from typing import Optional
+from google.cloud import firestore
+from google.cloud.firestore import FieldFilter
+
+from app.core.achievements import RULES
+from app.jobs import user_id_pages
+from app.services.achievements import achievements
+
+def count_followers(db: firestore.Client, user_id: str) -> int:
+    query = db.collection("follows").where(filter=FieldFilter("following_id", "==", user_id)).select([])
+    return sum(1 for _ in query.stream())
+
+def backfill_followers(db: firestore.Client, user_id: Optional[str] = None, dry_run: bool = False, page_size: int = 200) -> dict:
+    stats = {"users": 0, "updated": 0, "badges": 0}
+    pages = iter([[user_id]]) if user_id else user_id_pages(db, page_size)
+    for page in pages:
+        for uid in page:
+            stats["users"] += 1
+            followers = count_followers(db, uid)
+            ref = achievements.progress_ref(db, uid)
+            doc = ref.get()
+            stored = (doc.to_dict() or {}).get("followers", 0) if doc.exists else 0
+            if followers == stored or dry_run:
+                continue
+            ref.set({"followers": followers}, merge=True)
+            stats["updated"] += 1
+            reached = [rule for rule in RULES if rule.counter == "followers" and rule.threshold <= followers]
+            if reached:
+                stats["badges"] += len(achievements.award(db, uid, reached))
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", dest="user_id", default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    from app.db.session import db
+    result = backfill_followers(db, user_id=args.user_id, dry_run=args.dry_run)
+    print(result)
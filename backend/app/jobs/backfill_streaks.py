@@ -0,0 +1,71 @@
+"""
+Recompute every user's workout streaks from their completed workouts.
+
+Streaks are normally advanced in O(1) as workouts are completed; this job
+rebuilds them from history (for existing data, or after completions were
+backdated). Each user's completed workouts are streamed in chunks ordered by
+scheduled_date, so memory stays flat regardless of history size.
+Needs the composite index scheduled_workouts (user_id, status, scheduled_date).
+
+Usage (from backend/):
+    python -m app.jobs.backfill_streaks [--user USER_ID] [--dry-run]
+"""
+import argparse
+from datetime import date
+from typing import Any, Dict, Optional
+from google.cloud import firestore
+from google.cloud.firestore import FieldFilter
+
+from app.core.streaks import advance_streak, empty_streak
+from app.jobs import user_id_pages
+from app.services.tracking import scheduled_workout as crud_sw
+from app.services.user import user as crud_user
+
+def compute_user_streak(db: firestore.Client, user_id: str, chunk_size: int = 500) -> Dict[str, Any]:
+    query = db.collection(crud_sw.collection_name)\
+              .where(filter=FieldFilter("user_id", "==", user_id))\
+              .where(filter=FieldFilter("status", "==", "completed"))\
+              .order_by("scheduled_date")\
+              .select(["scheduled_date"])\
+              .limit(chunk_size)
+    streak = empty_streak()
+    last_doc = None
+    while True:
+        page = query.start_after(last_doc) if last_doc else query
+        docs = list(page.stream())
+        if not docs:
+            break
+        for doc in docs:
+            value = doc.get("scheduled_date")
+            if not value:
+                continue
+            day = value if isinstance(value, date) else date.fromisoformat(str(value)[:10])
+            streak = advance_streak(streak, day) or streak
+        last_doc = docs[-1]
+    return streak
+
+def backfill_streaks(db: firestore.Client, user_id: Optional[str] = None, dry_run: bool = False, page_size: int = 200) -> dict:
+    stats = {"users": 0, "updated": 0}
+    pages = iter([[user_id]]) if user_id else user_id_pages(db, page_size)
+    for page in pages:
+        for uid in page:
+            stats["users"] += 1
+            streak = compute_user_streak(db, uid)
+            if dry_run or streak["last_day"] is None:
+                continue
+            batch = db.batch()
+            batch.update(db.collection(crud_user.collection_name).document(uid), {"streak": streak})
+            crud_user.bump_cache_version(db, uid, "dashboard", batch=batch)
+            batch.commit()
+            stats["updated"] += 1
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", dest="user_id", default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    from app.db.session import db
+    result = backfill_streaks(db, user_id=args.user_id, dry_run=args.dry_run)
+    print(result)
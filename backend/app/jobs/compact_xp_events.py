@@ -0,0 +1,77 @@
+"""
+Fold old XP ledger entries into one summary event per user.
+
+Events older than the retention window are deleted and their amounts added to
+users/{user_id}/xp_events/_compacted (amount, events, compacted_before). The
+user's `xp` already includes them, so totals do not change. Every delete and
+the matching Increment on the summary go in the same batch, so a run that
+stops halfway leaves the ledger consistent and the next run continues.
+
+Usage (from backend/):
+    python -m app.jobs.compact_xp_events [--user USER_ID] [--days 90] [--dry-run]
+"""
+import argparse
+from datetime import datetime, timedelta
+from typing import Optional
+from google.cloud import firestore
+from google.cloud.firestore import FieldFilter
+
+from app.jobs import user_id_pages
+from app.services.xp import xp_ledger
+
+COMPACTED_DOC_ID = "_compacted"
+# Firestore allows 500 writes per batch; one slot is the summary increment
+BATCH_DELETES = 499
+
+def compact_user(db: firestore.Client, user_id: str, cutoff: datetime, dry_run: bool = False) -> dict:
+    stats = {"folded": 0, "amount": 0}
+    events = xp_ledger.events_ref(db, user_id)
+    query = events.where(filter=FieldFilter("created_at", "<", cutoff)).order_by("created_at").limit(BATCH_DELETES)
+
+    while True:
+        docs = [doc for doc in query.stream() if doc.id != COMPACTED_DOC_ID]
+        if not docs:
+            break
+        amount = sum(doc.to_dict().get("amount", 0) for doc in docs)
+        stats["folded"] += len(docs)
+        stats["amount"] += amount
+        if dry_run:
+            break
+        batch = db.batch()
+        for doc in docs:
+            batch.delete(doc.reference)
+        batch.set(events.document(COMPACTED_DOC_ID), {
+            "source": "compacted",
+            "amount": firestore.Increment(amount),
+            "events": firestore.Increment(len(docs)),
+            "compacted_before": cutoff,
+        }, merge=True)
+        batch.commit()
+    return stats
+
+def compact_xp_events(db: firestore.Client, user_id: Optional[str] = None, days: int = 90, dry_run: bool = False, page_size: int = 200) -> dict:
+    cutoff = datetime.utcnow() - timedelta(days=days)
+    stats = {"users": 0, "folded": 0, "amount": 0}
+    if user_id:
+        user_ids = iter([[user_id]])
+    else:
+        user_ids = user_id_pages(db, page_size)
+
+    for page in user_ids:
+        for uid in page:
+            result = compact_user(db, uid, cutoff, dry_run=dry_run)
+            stats["users"] += 1
+            stats["folded"] += result["folded"]
+            stats["amount"] += result["amount"]
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", dest="user_id", default=None)
+    parser.add_argument("--days", type=int, default=90, help="keep events newer than this many days")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    from app.db.session import db
+    result = compact_xp_events(db, user_id=args.user_id, days=args.days, dry_run=args.dry_run)
+    print(result)
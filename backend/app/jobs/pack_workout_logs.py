@@ -0,0 +1,76 @@
+"""
+Migrate scheduled_workouts to the columnar log encoding.
+
+Packs every workout's plain `logs` array (plus any existing `logs_packed`)
+into `logs_packed`. Each document is written with a last_update_time
+precondition, so a set appended while the job runs makes that write fail
+and the workout is simply picked up again on the next run. Workouts with a
+value the columnar format cannot hold are left as rows.
+Packed sets are read back with ids `<workout_id>-<index>`, so the
+original per-set uuids do not survive the migration.
+
+Usage (from backend/):
+    python -m app.jobs.pack_workout_logs [--user USER_ID] [--dry-run]
+"""
+import argparse
+from typing import Optional
+from google.api_core.exceptions import FailedPrecondition
+from google.cloud import firestore
+from google.cloud.firestore import FieldFilter
+
+from app.core.workout_codec import encode_logs, decode_logs
+from app.core.doc_size import estimate_size
+from app.services.tracking import scheduled_workout as crud_sw
+
+def pack_workout_logs(db: firestore.Client, user_id: Optional[str] = None, dry_run: bool = False, page_size: int = 200) -> dict:
+    stats = {"scanned": 0, "packed": 0, "skipped": 0, "unpackable": 0, "bytes_before": 0, "bytes_after": 0}
+    query = db.collection(crud_sw.collection_name)
+    if user_id:
+        query = query.where(filter=FieldFilter("user_id", "==", user_id))
+    query = query.order_by("__name__").limit(page_size)
+
+    last_doc = None
+    while True:
+        page = query.start_after(last_doc) if last_doc else query
+        docs = list(page.stream())
+        if not docs:
+            break
+        for doc in docs:
+            stats["scanned"] += 1
+            data = doc.to_dict()
+            rows = data.get("logs") or []
+            if not rows:
+                continue
+
+            packed = data.get("logs_packed")
+            logs = (decode_logs(packed, doc.id) if packed else []) + rows
+            new_packed = encode_logs(logs)
+            if new_packed is None:
+                stats["unpackable"] += 1
+                continue
+            stats["bytes_before"] += estimate_size(rows) + (estimate_size(packed) if packed else 0)
+            stats["bytes_after"] += estimate_size(new_packed)
+            if dry_run:
+                stats["packed"] += 1
+                continue
+            try:
+                doc.reference.update(
+                    {"logs_packed": new_packed, "logs": []},
+                    option=db.write_option(last_update_time=doc.update_time),
+                )
+                stats["packed"] += 1
+            except FailedPrecondition:
+                # Modified concurrently; retried on the next run
+                stats["skipped"] += 1
+        last_doc = docs[-1]
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", dest="user_id", default=None)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    from app.db.session import db
+    result = pack_workout_logs(db, user_id=args.user_id, dry_run=args.dry_run)
+    print(result)
@@ -0,0 +1,27 @@
+"""
+Snapshot the global XP leaderboard to Firestore.
+
+Loads the leaderboard (from the previous snapshot plus the XP ledger, or a
+full scan of users the first time) and writes it back to
+leaderboards/global. Workers starting up read the snapshot instead of
+scanning every user. Run it periodically, e.g. every 15 minutes from cron.
+
+Usage (from backend/):
+    python -m app.jobs.snapshot_leaderboard
+"""
+import argparse
+
+from google.cloud import firestore
+
+from app.services.leaderboard import leaderboard
+
+def snapshot_leaderboard(db: firestore.Client) -> dict:
+    return leaderboard.save_snapshot(db)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    from app.db.session import db
+    result = snapshot_leaderboard(db)
+    print(result)
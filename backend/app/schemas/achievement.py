@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+
+class Badge(BaseModel):
+    id: str
+    name: str
+    description: str
+
+class AchievementProgress(Badge):
+    threshold: int
+    progress: int
+    awarded_at: Optional[datetime] = None
@@ -0,0 +1,9 @@
+from pydantic import BaseModel
+from typing import Optional
+
+class ActivityYear(BaseModel):
+    user_id: str
+    year: int
+    active_days: int
+    days: Optional[str] = None # base64, 46 bytes, bit i (LSB first) = day i of the year
+    intensity: Optional[str] = None # base64, 366 bytes, workouts completed per day
@@ -0,0 +1,35 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+class ExerciseAnalytics(BaseModel):
+    exercise_id: str
+    name: Optional[str] = None
+    muscle_group: Optional[str] = None
+    volume: List[float] # kg per week, aligned with TrainingAnalytics.weeks
+    estimated_1rm: List[float] # best estimate per week
+    best_estimated_1rm: float # all-time
+
+class MuscleGroupTonnage(BaseModel):
+    muscle_group: str
+    tonnage: List[float] # kg per week
+
+class SessionDensity(BaseModel):
+    date: str
+    duration_minutes: float
+    sets: int
+    tonnage: float
+    kg_per_minute: Optional[float] = None
+    sets_per_minute: Optional[float] = None
+
+class AnalyticsTotals(BaseModel):
+    workouts: int
+    sets: int
+    tonnage: float
+
+class TrainingAnalytics(BaseModel):
+    weeks: List[str] # Monday of each week
+    formula: str
+    exercises: List[ExerciseAnalytics]
+    muscle_groups: List[MuscleGroupTonnage]
+    sessions: List[SessionDensity]
+    totals: AnalyticsTotals
@@ -0,0 +1,55 @@
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+from datetime import datetime
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: str
+    username: Optional[str] = None
+    profile_picture: Optional[str] = None
+    xp: int
+    level: int
+
+class LeaderboardPage(BaseModel):
+    total: int
+    offset: int
+    entries: List[LeaderboardEntry]
+
+class LeaderboardPosition(BaseModel):
+    user_id: str
+    xp: int
+    rank: int
+    total: int
+    percentile: float
+
+class ChallengeEntry(BaseModel):
+    rank: int
+    user_id: str
+    username: Optional[str] = None
+    profile_picture: Optional[str] = None
+    value: int
+    level: int
+
+class ChallengePage(BaseModel):
+    window: str
+    metric: str
+    total: int
+    offset: int
+    entries: List[ChallengeEntry]
+
+class ChallengePosition(BaseModel):
+    window: str
+    metric: str
+    value: int
+    rank: Optional[int] = None # None until the user logs a session in this window
+    total: int
+    percentile: Optional[float] = None
+
+class ChallengeArchive(BaseModel):
+    window: str
+    period: str
+    ended_on: str
+    participants: int
+    archived_at: datetime
+    # metric -> final top standings ({"user_id", "value"})
+    top: Dict[str, List[dict]]
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional
 from datetime import datetime
 
@@ -7,12 +7,24 @@ class NutritionLogBase(BaseModel):
     protein: float = 0
     carbs: float = 0
     fat: float = 0
-    food_name: str
-    meal_type: str = "snack" # breakfast, lunch, dinner, snack
+    food_name: str = Field(..., max_length=200)
+    meal_type: str = Field("snack", max_length=32) # breakfast, lunch, dinner, snack
 
 class NutritionLogCreate(NutritionLogBase):
     pass
 
+# Explicit entries accepted per bulk request (a meal or a day, not an import)
+MAX_BULK_LOGS = 100
+
+class NutritionBulkLogCreate(BaseModel):
+    logs: List[NutritionLogCreate] = Field([], max_length=MAX_BULK_LOGS)
+    diet_day: Optional[str] = None # e.g. "Monday": log that day of the user's active diet
+    meal: Optional[str] = None # Restrict diet_day to a single meal
+
+class NutritionLog(NutritionLogBase):
+    id: Optional[str] = None # Missing on entries logged before ids were added
+    logged_at: Optional[str] = None
+
 class DailyNutritionStats(BaseModel):
     date: str # YYYY-MM-DD
     total_calories: int = 0
@@ -20,4 +32,30 @@ class DailyNutritionStats(BaseModel):
     total_carbs: float = 0
     total_fat: float = 0
     goal_calories: int = 2000
-    logs: List[NutritionLogBase] = []
+    logs: List[NutritionLog] = []
+
+class NutritionHistoryDay(BaseModel):
+    date: str # YYYY-MM-DD
+    calories: int = 0
+    protein: float = 0
+    carbs: float = 0
+    fat: float = 0
+    goal: int = 2000
+    on_target: bool = False
+
+class NutritionHistoryBucket(BaseModel):
+    period: str # YYYY-MM-DD (day), YYYY-Www (week) or YYYY-MM (month)
+    total_calories: int = 0
+    total_protein: float = 0
+    total_carbs: float = 0
+    total_fat: float = 0
+    average_calories: float = 0
+    days_logged: int = 0
+    days_on_target: int = 0
+
+class NutritionHistory(BaseModel):
+    start: str
+    end: str
+    granularity: str = "day"
+    summary: NutritionHistoryBucket
+    buckets: List[NutritionHistoryBucket] = []
@@ -0,0 +1,41 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class RecordSet(BaseModel):
+    value: float
+    reps: int
+    weight_kg: float
+    date: str
+    workout_id: Optional[str] = None
+
+class RepsAtWeight(BaseModel):
+    weight_kg: float
+    reps: int
+
+class PersonalRecord(BaseModel):
+    exercise_id: str
+    max_weight: Optional[RecordSet] = None
+    estimated_1rm: Optional[RecordSet] = None # Epley
+    volume_set: Optional[RecordSet] = None # reps x weight
+    reps_at_weight: List[RepsAtWeight] = []
+    updated_at: Optional[datetime] = None
+
+class PersonalRecordBreak(BaseModel):
+    exercise_id: str
+    type: str # max_weight, estimated_1rm, volume_set or reps_at_weight
+    value: float
+    previous: float
+    reps: int
+    weight_kg: float
+
+class RecentSet(BaseModel):
+    set_number: Optional[int] = None
+    reps: int
+    weight_kg: float
+
+class RecentPerformance(BaseModel):
+    workout_id: str
+    date: str
+    performed_at: Optional[datetime] = None
+    sets: List[RecentSet] = []
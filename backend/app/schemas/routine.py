@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional, List
+from typing import Literal, Optional, List
 from datetime import datetime
 from app.schemas.exercise import Exercise
 
@@ -17,6 +17,7 @@ class RoutineUpdate(RoutineBase):
 
 # Nested object for Routine details
 class RoutineExerciseDetail(BaseModel):
+    id: Optional[str] = None # Routine exercise id, the row_id of PATCH ops
     exercise_id: str
     day_of_week: Optional[int] = None
     order_index: Optional[int] = None
@@ -42,3 +43,40 @@ class RoutineInDBBase(RoutineBase):
 
 class Routine(RoutineInDBBase):
     exercises: List[RoutineExerciseDetail] = []
+    version: Optional[int] = None # Snapshot version, bumped whenever the exercises change
+    source_routine_id: Optional[str] = None # Set on imports not yet edited (copy-on-write)
+    source_version: Optional[int] = None
+
+
+# Partial edits (PATCH)
+class RoutineExerciseFields(BaseModel):
+    exercise_id: Optional[str] = None
+    target_sets: Optional[int] = None
+    target_reps_min: Optional[int] = None
+    target_reps_max: Optional[int] = None
+    reps_display: Optional[str] = None
+
+class RoutineOperation(BaseModel):
+    op: Literal["add_exercise", "update_exercise", "remove_exercise", "move_exercise", "replace_day", "remove_day"]
+    row_id: Optional[str] = None # Routine exercise id (update / remove / move)
+    day_of_week: Optional[int] = Field(None, ge=1, le=7) # add / replace_day / remove_day, or the target day of a move
+    index: Optional[int] = Field(None, ge=0) # Position within the day; defaults to last
+    exercise: Optional[RoutineExerciseFields] = None # add / update
+    exercises: Optional[List[RoutineExerciseFields]] = None # replace_day
+
+class RoutinePatch(BaseModel):
+    ops: List[RoutineOperation] = []
+    name: Optional[str] = None
+    description: Optional[str] = None
+    is_public: Optional[bool] = None
+    expected_version: Optional[int] = None # Reject the edit if the routine moved past this version
+
+class SimilarRoutine(BaseModel):
+    id: str
+    name: str
+    description: Optional[str] = None
+    creator_id: Optional[str] = None
+    average_rating: float = 0.0
+    rating_count: int = 0
+    score: float # Cosine similarity of the exercise / muscle group vectors, 0..1
+    duplicate: bool = False # Same plan as the queried routine for practical purposes
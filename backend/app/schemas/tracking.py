@@ -2,6 +2,9 @@ from pydantic import BaseModel
 from typing import Optional, List
 from datetime import date, datetime
 
+from app.schemas.achievement import Badge
+from app.schemas.records import PersonalRecordBreak
+
 class ScheduledWorkoutBase(BaseModel):
     scheduled_date: date
     note: Optional[str] = None
@@ -42,6 +45,7 @@ class ScheduledWorkout(ScheduledWorkoutBase):
     logs: List[WorkoutLog] = []
     duration_seconds: Optional[int] = 0
     calories_burned: Optional[float] = 0
+    schedule_rule_id: Optional[str] = None # Set on occurrences of a recurring schedule
     
     class Config:
         from_attributes = True
@@ -49,6 +53,22 @@ class ScheduledWorkout(ScheduledWorkoutBase):
 class ScheduledWorkoutUpdate(ScheduledWorkoutBase):
     pass
 
+# Recurring schedules
+class ScheduleRuleCreate(BaseModel):
+    routine_id: str
+    weekdays: Optional[List[int]] = None # 1 = Monday ... 7 = Sunday; defaults to the routine's training days
+    start_date: date
+    end_date: date
+
+class ScheduleRule(BaseModel):
+    id: str
+    user_id: str
+    routine_id: str
+    weekdays: List[int]
+    start_date: date
+    end_date: date
+    created_at: datetime
+
 # For the Quick Log Session
 class WorkoutSessionLog(BaseModel):
     routine_id: str
@@ -59,6 +79,16 @@ class WorkoutSessionLog(BaseModel):
     notes: Optional[str] = None
     logs: List[WorkoutLogCreate] = []
 
+class CalendarDay(BaseModel):
+    date: str
+    status: str # completed, partial, missed or scheduled
+    total: int
+    completed: int
+
+class CalendarMonth(BaseModel):
+    month: str # YYYY-MM
+    days: List[CalendarDay] = [] # Only days with workouts
+
 class WorkoutCompletionResponse(BaseModel):
     workout: ScheduledWorkout
     xp_gained: int
@@ -67,3 +97,5 @@ class WorkoutCompletionResponse(BaseModel):
     level_up: bool
     prev_level_xp: int
     next_level_xp: int
+    achievements: List[Badge] = [] # Badges unlocked by this session
+    personal_records: List[PersonalRecordBreak] = [] # Records broken by this session
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from typing import Any, Optional, List, Dict
 from datetime import datetime
 
 # Shared properties
@@ -13,6 +13,7 @@ class UserBase(BaseModel):
     daily_calorie_goal: Optional[int] = 2000
     current_diet_id: Optional[str] = None
     current_routine_id: Optional[str] = None # Added field
+    current_routine_name: Optional[str] = None # Denormalized from the routine for the dashboard
     height: Optional[int] = None # in cm
     is_admin: bool = False
     # is_active: Optional[bool] = True # Removed to match DB model
@@ -38,6 +39,12 @@ class UserInDBBase(UserBase):
     id: Optional[str] = None
     created_at: Optional[datetime] = None
     reputation_score: float = 0.0
+    # Kept in sync with `level` by the XP ledger (app/services/xp.py)
+    rank: Optional[str] = None
+    # Raw streak state (app/core/streaks.py); use current_streaks() to read it
+    streak: Optional[Dict[str, Any]] = None
+    # Per-scope version counters used for ETags; internal, never serialized
+    cache_versions: Dict[str, int] = Field(default_factory=dict, exclude=True)
 
     class Config:
         from_attributes = True
@@ -0,0 +1,126 @@
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+import pytz
+from google.cloud import firestore
+
+from app.core.achievements import RULES, Rule, counter_deltas, crossed_rules
+from app.services.notification import notification as crud_notification
+
+# (user_id, counter deltas, position of the counters write in the batch)
+PendingEvent = Tuple[str, Dict[str, int], int]
+
+
+class AchievementService:
+    """
+    Badge engine. Each user has one progress document (achievements/{user_id})
+    holding the rule counters as top-level integers and an `awarded` map.
+
+    An event is a single Increment write (usually inside the caller's batch);
+    the post-increment counters come back in the commit's transform results,
+    so rules are evaluated without reading anything. Only an event that
+    crosses a threshold costs an extra transaction to record the badge and
+    notify the user.
+    """
+    def __init__(self, collection_name: str = "achievements"):
+        self.collection_name = collection_name
+
+    def progress_ref(self, db: firestore.Client, user_id: str):
+        return db.collection(self.collection_name).document(user_id)
+
+    def add_to_batch(self, db: firestore.Client, batch: firestore.WriteBatch, event: str, user_id: str, **payload: Any) -> Optional[PendingEvent]:
+        """
+        Queue the counter increments for `event`. Pass the return value and the
+        batch's commit results to `apply_result`.
+        """
+        deltas = counter_deltas(event, payload)
+        if not deltas:
+            return None
+        index = len(batch)
+        batch.set(self.progress_ref(db, user_id), {counter: firestore.Increment(amount) for counter, amount in deltas.items()}, merge=True)
+        return user_id, deltas, index
+
+    def apply_result(self, db: firestore.Client, pending: Optional[PendingEvent], write_results: Optional[List[Any]]) -> List[Dict[str, Any]]:
+        """
+        Evaluate the rules against the post-event counters and award what was crossed.
+        Returns the badges awarded by this event.
+        """
+        if pending is None:
+            return []
+        user_id, deltas, index = pending
+        totals: Dict[str, int] = {}
+        try:
+            # Transform results come back ordered by field path
+            for counter, value in zip(sorted(deltas), write_results[index].transform_results):
+                totals[counter] = int(value.integer_value)
+        except (TypeError, IndexError, AttributeError):
+            totals = {}
+        if len(totals) != len(deltas):
+            doc = self.progress_ref(db, user_id).get()
+            totals = doc.to_dict() if doc.exists else {}
+
+        crossed = crossed_rules(deltas, totals)
+        if not crossed:
+            return []
+        return self.award(db, user_id, [rule for rule, _ in crossed])
+
+    def emit(self, db: firestore.Client, event: str, user_id: str, **payload: Any) -> List[Dict[str, Any]]:
+        """
+        Record an event on its own. Returns the badges it awarded.
+        """
+        batch = db.batch()
+        pending = self.add_to_batch(db, batch, event, user_id, **payload)
+        if pending is None:
+            return []
+        return self.apply_result(db, pending, batch.commit())
+
+    def award(self, db: firestore.Client, user_id: str, rules: List[Rule]) -> List[Dict[str, Any]]:
+        """
+        Mark badges as awarded and notify the user, skipping badges already held
+        (a counter can cross a threshold again after going down, e.g. followers).
+        """
+        ref = self.progress_ref(db, user_id)
+
+        @firestore.transactional
+        def _award(transaction) -> List[Dict[str, Any]]:
+            snapshot = ref.get(transaction=transaction)
+            awarded = (snapshot.to_dict() or {}).get("awarded", {}) if snapshot.exists else {}
+            new_badges = [rule for rule in rules if rule.id not in awarded]
+            if not new_badges:
+                return []
+            now = datetime.now(pytz.utc)
+            transaction.set(ref, {"awarded": {rule.id: now for rule in new_badges}}, merge=True)
+            for rule in new_badges:
+                crud_notification.notify(db, {
+                    "user_id": user_id,
+                    "actor_id": "system",
+                    "actor_name": "GymTrack",
+                    "type": "achievement",
+                    "content_id": rule.id,
+                    "message": f"¡Has desbloqueado el logro «{rule.name}»!",
+                    "read": False,
+                    "created_at": now,
+                }, batch=transaction)
+            return [{"id": rule.id, "name": rule.name, "description": rule.description} for rule in new_badges]
+
+        return _award(db.transaction())
+
+    def get_progress(self, db: firestore.Client, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Every badge with the user's progress towards it (one point read).
+        """
+        doc = self.progress_ref(db, user_id).get()
+        data = doc.to_dict() if doc.exists else {}
+        awarded = data.get("awarded", {})
+        return [
+            {
+                "id": rule.id,
+                "name": rule.name,
+                "description": rule.description,
+                "threshold": rule.threshold,
+                "progress": min(data.get(rule.counter, 0), rule.threshold),
+                "awarded_at": awarded.get(rule.id),
+            }
+            for rule in RULES
+        ]
+
+achievements = AchievementService()
@@ -0,0 +1,74 @@
+import base64
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+from google.cloud import firestore
+
+from app.core.activity import active_days, mark_day
+
+
+class ActivityService:
+    """
+    Per-user yearly activity bitmaps (activity/{user_id}_{year}, app/core/activity.py),
+    so a profile heatmap is one small document read instead of a year of workouts.
+
+    Completing a workout rewrites that year's bitmap. Inside the session batch
+    this is a compare-and-set against the snapshot read beforehand (like the
+    personal records); elsewhere it is a transaction.
+    """
+    def __init__(self, collection_name: str = "activity"):
+        self.collection_name = collection_name
+
+    def doc_ref(self, db: firestore.Client, user_id: str, year: int):
+        return db.collection(self.collection_name).document(f"{user_id}_{year}")
+
+    def lookup(self, db: firestore.Client, user_id: str, day: date):
+        return self.doc_ref(db, user_id, day.year).get()
+
+    def _fields(self, snapshot, user_id: str, day: date) -> Dict[str, Any]:
+        data = snapshot.to_dict() if snapshot is not None and snapshot.exists else {}
+        bitmap, intensity = mark_day(data.get("days"), data.get("intensity"), day)
+        return {
+            "user_id": user_id,
+            "year": day.year,
+            "days": bitmap,
+            "intensity": intensity,
+            "updated_at": datetime.utcnow(),
+        }
+
+    def add_to_batch(self, db: firestore.Client, batch: firestore.WriteBatch, snapshot, user_id: str, day: date) -> None:
+        """
+        Queue one completed workout on `day`, conditional on `snapshot` (from
+        `lookup`) still being current. A stale snapshot fails the commit with
+        FailedPrecondition / AlreadyExists.
+        """
+        ref = self.doc_ref(db, user_id, day.year)
+        data = self._fields(snapshot, user_id, day)
+        if snapshot is not None and snapshot.exists:
+            batch.update(ref, data, option=db.write_option(last_update_time=snapshot.update_time))
+        else:
+            batch.create(ref, data)
+
+    def record(self, db: firestore.Client, user_id: str, day: date) -> None:
+        ref = self.doc_ref(db, user_id, day.year)
+
+        @firestore.transactional
+        def _record(transaction):
+            snapshot = ref.get(transaction=transaction)
+            transaction.set(ref, self._fields(snapshot, user_id, day))
+
+        _record(db.transaction())
+
+    def get(self, db: firestore.Client, user_id: str, year: int) -> Dict[str, Any]:
+        doc = self.doc_ref(db, user_id, year).get()
+        data = doc.to_dict() if doc.exists else {}
+        bitmap: Optional[bytes] = data.get("days")
+        intensity: Optional[bytes] = data.get("intensity")
+        return {
+            "user_id": user_id,
+            "year": year,
+            "active_days": active_days(bitmap),
+            "days": base64.b64encode(bitmap).decode() if bitmap else None,
+            "intensity": base64.b64encode(intensity).decode() if intensity else None,
+        }
+
+activity = ActivityService()
@@ -0,0 +1,86 @@
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Dict, List, Tuple
+from google.cloud import firestore
+from google.cloud.firestore import FieldFilter
+
+from app.core.analytics import HistoryBuilder, compute_analytics
+from app.core.concurrency import run_parallel
+from app.schemas.user import User
+from app.services.exercise import exercise as crud_exercise
+from app.services.tracking import scheduled_workout as crud_sw
+
+# Users whose analytics are kept in memory per worker
+ANALYTICS_CACHE_SIZE = 256
+# Exercise documents per get_all call when joining the catalog
+GET_ALL_CHUNK_SIZE = 100
+# Workout fields needed to build the history
+HISTORY_FIELDS = ["scheduled_date", "duration_seconds", "logs", "logs_packed"]
+
+
+class AnalyticsService:
+    """
+    Training analytics (app/core/analytics.py) over a user's completed workouts.
+
+    Results are cached per user and keyed by the user's "analytics" cache
+    version, which is bumped whenever a workout is completed or sets are
+    appended to one (logs endpoints, live finish), so a cached result is
+    dropped on the next request after a session.
+    """
+    def __init__(self, max_users: int = ANALYTICS_CACHE_SIZE):
+        self.max_users = max_users
+        self._cache: "OrderedDict[str, Tuple[Tuple, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load_history(self, db: firestore.Client, user_id: str) -> HistoryBuilder:
+        builder = HistoryBuilder()
+        docs = db.collection(crud_sw.collection_name)\
+                 .where(filter=FieldFilter("user_id", "==", user_id))\
+                 .where(filter=FieldFilter("status", "==", "completed"))\
+                 .select(HISTORY_FIELDS)\
+                 .stream()
+        for doc in docs:
+            data = doc.to_dict()
+            scheduled = data.get("scheduled_date")
+            if not scheduled:
+                continue
+            day = scheduled if isinstance(scheduled, date) else date.fromisoformat(str(scheduled)[:10])
+            builder.add_workout(day, data.get("duration_seconds"), logs=data.get("logs"), packed=data.get("logs_packed"))
+        return builder
+
+    def exercise_info(self, db: firestore.Client, exercise_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        name and muscle_group of the given catalog exercises, read in parallel get_all chunks.
+        """
+        def load(chunk: List[str]) -> Dict[str, Dict[str, Any]]:
+            refs = [db.collection(crud_exercise.collection_name).document(ex_id) for ex_id in chunk]
+            return {doc.id: doc.to_dict() for doc in db.get_all(refs, field_paths=["name", "muscle_group"]) if doc.exists}
+
+        chunks = [exercise_ids[i:i + GET_ALL_CHUNK_SIZE] for i in range(0, len(exercise_ids), GET_ALL_CHUNK_SIZE)]
+        info: Dict[str, Dict[str, Any]] = {}
+        for part in run_parallel(*[lambda chunk=chunk: load(chunk) for chunk in chunks]):
+            info.update(part)
+        return info
+
+    def get(self, db: firestore.Client, user: User, weeks: int = 12, formula: str = "epley") -> Dict[str, Any]:
+        today = date.today()
+        key = (user.cache_versions.get("analytics", 0), today, weeks, formula)
+        with self._lock:
+            cached = self._cache.get(user.id)
+            if cached and cached[0] == key:
+                self._cache.move_to_end(user.id)
+                return cached[1]
+
+        builder = self.load_history(db, user.id)
+        info = self.exercise_info(db, builder.exercise_ids)
+        result = compute_analytics(builder.build(), builder.exercise_ids, info, today, weeks=weeks, formula=formula)
+
+        with self._lock:
+            self._cache[user.id] = (key, result)
+            self._cache.move_to_end(user.id)
+            while len(self._cache) > self.max_users:
+                self._cache.popitem(last=False)
+        return result
+
+analytics = AnalyticsService()
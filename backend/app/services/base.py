@@ -18,14 +18,20 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         self.collection_name = collection_name
         self.model = model
 
+    def _from_doc(self, doc_id: str, data: Dict[str, Any]) -> ModelType:
+        """
+        Build the schema object from raw document data.
+        Subclasses override this when the stored layout differs from the schema.
+        """
+        if "id" in data:
+            del data["id"]
+        return self.model(id=doc_id, **data)
+
     def get(self, db: firestore.Client, id: str) -> Optional[ModelType]:
         doc_ref = db.collection(self.collection_name).document(id)
         doc = doc_ref.get()
         if doc.exists:
-            data = doc.to_dict()
-            if "id" in data:
-                del data["id"]
-            return self.model(id=doc.id, **data)
+            return self._from_doc(doc.id, doc.to_dict())
         return None
 
     def get_multi(self, db: firestore.Client, skip: int = 0, limit: int = 100) -> List[ModelType]:
@@ -33,14 +39,8 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         # Ideally use cursors, but here we just list.
         docs = db.collection(self.collection_name).limit(limit).stream() # Skip is hard without sorting
         # For true skip, we need verification. For now, let's just return first N.
-        
-        def _map_doc(doc):
-            data = doc.to_dict()
-            if "id" in data:
-                del data["id"]
-            return self.model(id=doc.id, **data)
-            
-        return [_map_doc(doc) for doc in docs]
+
+        return [self._from_doc(doc.id, doc.to_dict()) for doc in docs]
 
     def create(self, db: firestore.Client, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
@@ -67,7 +67,7 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         
         # Return updated
         doc = doc_ref.get()
-        return self.model(id=doc.id, **doc.to_dict())
+        return self._from_doc(doc.id, doc.to_dict())
 
     def remove(self, db: firestore.Client, *, id: str) -> Any:
         db.collection(self.collection_name).document(id).delete()
@@ -0,0 +1,218 @@
+import threading
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+from google.cloud import firestore
+from google.cloud.firestore import FieldFilter
+
+from app.core.challenges import METRICS, active_windows, window_end
+from app.core.gamification import calculate_level
+from app.core.ranking import XPRankIndex
+from app.services.user import user as crud_user
+
+# Rank indexes are per window and metric, so they can be much smaller than the XP one
+CHALLENGE_RANK_BUCKETS = 1 << 16
+# How often a worker pulls counters updated through other workers
+CATCH_UP_INTERVAL_SECONDS = 30
+# Each catch-up re-reads counters updated from this far before the previous
+# one started, so a write committed while that query ran is not skipped
+# (updated_at is the commit's server time). Re-recording a counter is idempotent.
+CATCH_UP_OVERLAP = timedelta(seconds=60)
+COUNTER_FIELDS = sorted(field for field, _ in METRICS.values())
+# Transformed fields of a counter write, in the order Firestore returns their results (sorted by path)
+TRANSFORM_FIELDS = sorted(COUNTER_FIELDS + ["updated_at"])
+
+# (window key, user_id, position of the counters write in the batch)
+PendingCounter = Tuple[str, str, int]
+
+
+def empty_indexes() -> Dict[str, XPRankIndex]:
+    return {
+        metric: XPRankIndex(num_buckets=CHALLENGE_RANK_BUCKETS, bucket_width=width)
+        for metric, (_, width) in METRICS.items()
+    }
+
+
+class ChallengeWindow:
+    def __init__(self, window: str):
+        self.window = window
+        self.indexes = empty_indexes()
+        self.loaded = False
+        self.synced_at: Optional[datetime] = None
+        self.last_catch_up = 0.0
+        # Serializes this window's load and catch-ups, whose Firestore reads
+        # run without holding the service lock
+        self.refresh_lock = threading.Lock()
+
+    def record(self, user_id: str, counters: Dict[str, Any]) -> None:
+        for metric, (field, _) in METRICS.items():
+            if field in counters:
+                self.indexes[metric].update(user_id, int(counters[field] or 0))
+
+
+class ChallengeService:
+    """
+    Weekly and monthly challenges (volume, sessions, calories).
+
+    Every completed session increments one counter document per active window
+    (challenge_counters/{window}_{user_id}) inside the session's batch, so a
+    standing is never recomputed from scheduled_workouts. Each worker ranks
+    the active windows with in-memory XPRankIndex instances, loaded from the
+    window's counters on first use and kept current from the commit results
+    (own writes) and a periodic catch-up (other workers).
+    """
+    def __init__(self, collection_name: str = "challenge_counters", archive_collection: str = "challenge_archives"):
+        self.collection_name = collection_name
+        self.archive_collection = archive_collection
+        self._windows: Dict[str, ChallengeWindow] = {}
+        self._lock = threading.Lock()
+
+    def counter_ref(self, db: firestore.Client, window: str, user_id: str):
+        return db.collection(self.collection_name).document(f"{window}_{user_id}")
+
+    def add_to_batch(
+        self,
+        db: firestore.Client,
+        batch: firestore.WriteBatch,
+        user_id: str,
+        day: date,
+        volume_kg: int,
+        calories: float,
+    ) -> List[PendingCounter]:
+        """
+        Queue the counter increments of one session for every window containing `day`.
+        Pass the return value and the commit results to `apply_result`.
+        """
+        pending = []
+        for period, window in active_windows(day):
+            pending.append((window, user_id, len(batch)))
+            batch.set(self.counter_ref(db, window, user_id), {
+                "window": window,
+                "period": period,
+                "ends_on": window_end(period, day).isoformat(),
+                "user_id": user_id,
+                "volume_kg": firestore.Increment(int(volume_kg)),
+                "sessions": firestore.Increment(1),
+                "calories": firestore.Increment(int(calories or 0)),
+                "updated_at": firestore.SERVER_TIMESTAMP,
+            }, merge=True)
+        return pending
+
+    def apply_result(self, pending: List[PendingCounter], write_results: Optional[List[Any]]) -> None:
+        """
+        Feed the post-increment counters into the loaded rank indexes.
+        Windows not loaded on this worker yet are skipped (they load from Firestore).
+        """
+        with self._lock:
+            for window, user_id, index in pending:
+                state = self._windows.get(window)
+                if state is None or not state.loaded:
+                    continue
+                try:
+                    values = dict(zip(TRANSFORM_FIELDS, write_results[index].transform_results))
+                    counters = {field: values[field].integer_value for field in COUNTER_FIELDS}
+                except (TypeError, IndexError, KeyError, AttributeError):
+                    continue
+                state.record(user_id, counters)
+
+    def window(self, db: firestore.Client, window: str, day: date) -> ChallengeWindow:
+        with self._lock:
+            # Finished windows are served from the archive; free their indexes
+            active = {key for _, key in active_windows(day)}
+            for key in [key for key in self._windows if key not in active]:
+                del self._windows[key]
+            state = self._windows.setdefault(window, ChallengeWindow(window))
+            due = time.monotonic() - state.last_catch_up >= CATCH_UP_INTERVAL_SECONDS
+        if not state.loaded:
+            # First use: callers of this window wait for the one load in progress
+            with state.refresh_lock:
+                if not state.loaded:
+                    self._load(db, state)
+        elif due and state.refresh_lock.acquire(blocking=False):
+            # Others keep using the current standings while one caller catches up
+            try:
+                self._catch_up(db, state)
+            finally:
+                state.refresh_lock.release()
+        return state
+
+    def _query(self, db: firestore.Client, window: str):
+        return db.collection(self.collection_name).where(filter=FieldFilter("window", "==", window))
+
+    def _load(self, db: firestore.Client, state: ChallengeWindow, page_size: int = 1000) -> None:
+        synced_at = datetime.now(timezone.utc) - CATCH_UP_OVERLAP
+        fields = ["user_id"] + COUNTER_FIELDS
+        query = self._query(db, state.window).select(fields).order_by("__name__").limit(page_size)
+        rows: Dict[str, Dict[str, int]] = {metric: {} for metric in METRICS}
+        last_doc = None
+        while True:
+            page = query.start_after(last_doc) if last_doc else query
+            docs = list(page.stream())
+            if not docs:
+                break
+            for doc in docs:
+                data = doc.to_dict()
+                for metric, (field, _) in METRICS.items():
+                    rows[metric][data["user_id"]] = int(data.get(field) or 0)
+            last_doc = docs[-1]
+        indexes = empty_indexes()
+        for metric, items in rows.items():
+            indexes[metric].load(items.items())
+        with self._lock:
+            state.indexes = indexes
+            state.synced_at = synced_at
+            state.last_catch_up = time.monotonic()
+            state.loaded = True
+
+    def _catch_up(self, db: firestore.Client, state: ChallengeWindow) -> None:
+        started = datetime.now(timezone.utc)
+        with self._lock:
+            state.last_catch_up = time.monotonic()
+        docs = self._query(db, state.window).where(filter=FieldFilter("updated_at", ">", state.synced_at)).stream()
+        updates = [doc.to_dict() for doc in docs]
+        with self._lock:
+            for data in updates:
+                state.record(data["user_id"], data)
+            state.synced_at = started - CATCH_UP_OVERLAP
+
+    def standings(self, db: firestore.Client, period: str, metric: str, day: date, offset: int = 0, limit: int = 20) -> Dict[str, Any]:
+        window = dict(active_windows(day))[period]
+        state = self.window(db, window, day)
+        with self._lock:
+            index = state.indexes[metric]
+            rows = index.top(offset, limit)
+            total = len(index)
+        refs = [db.collection(crud_user.collection_name).document(user_id) for _, user_id, _ in rows]
+        profiles = {doc.id: doc.to_dict() for doc in db.get_all(refs, field_paths=["username", "profile_picture", "xp"]) if doc.exists} if refs else {}
+        entries = []
+        for rank, user_id, value in rows:
+            profile = profiles.get(user_id, {})
+            entries.append({
+                "rank": rank,
+                "user_id": user_id,
+                "username": profile.get("username"),
+                "profile_picture": profile.get("profile_picture"),
+                "value": value,
+                "level": calculate_level(profile.get("xp") or 0),
+            })
+        return {"window": window, "metric": metric, "total": total, "offset": offset, "entries": entries}
+
+    def position(self, db: firestore.Client, period: str, metric: str, day: date, user_id: str) -> Dict[str, Any]:
+        window = dict(active_windows(day))[period]
+        state = self.window(db, window, day)
+        with self._lock:
+            index = state.indexes[metric]
+            return {
+                "window": window,
+                "metric": metric,
+                "value": index.get(user_id) or 0,
+                "rank": index.rank(user_id),
+                "total": len(index),
+                "percentile": index.percentile(user_id),
+            }
+
+    def get_archive(self, db: firestore.Client, window: str) -> Optional[Dict[str, Any]]:
+        doc = db.collection(self.archive_collection).document(window).get()
+        return doc.to_dict() if doc.exists else None
+
+challenges = ChallengeService()
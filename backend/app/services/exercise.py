@@ -1,8 +1,32 @@
+from typing import Any, Dict, Union
 from app.services.base import CRUDBase
+from app.services.routine import routine as crud_routine
 from app.schemas.exercise import Exercise, ExerciseCreate, ExerciseUpdate
 from google.cloud import firestore
 
 class CRUDExercise(CRUDBase[Exercise, ExerciseCreate, ExerciseUpdate]):
-    pass
+    # The catalog version lives in its own tiny document so clients can
+    # revalidate the exercise list without streaming the whole collection
+    version_collection = "catalog_versions"
+
+    def get_catalog_version(self, db: firestore.Client) -> int:
+        doc = db.collection(self.version_collection).document(self.collection_name).get()
+        return doc.to_dict().get("version", 0) if doc.exists else 0
+
+    def bump_catalog_version(self, db: firestore.Client) -> None:
+        db.collection(self.version_collection).document(self.collection_name)\
+          .set({"version": firestore.Increment(1)}, merge=True)
+
+    def create(self, db: firestore.Client, *, obj_in: ExerciseCreate) -> Exercise:
+        exercise = super().create(db, obj_in=obj_in)
+        self.bump_catalog_version(db)
+        return exercise
+
+    def update(self, db: firestore.Client, *, id: str, obj_in: Union[ExerciseUpdate, Dict[str, Any]]) -> Exercise:
+        exercise = super().update(db, id=id, obj_in=obj_in)
+        self.bump_catalog_version(db)
+        # Routines embed name, muscle group and video in their snapshots
+        crud_routine.refresh_exercise(db, id, exercise.model_dump())
+        return exercise
 
 exercise = CRUDExercise("exercises", Exercise)
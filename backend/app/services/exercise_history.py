@@ -0,0 +1,76 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, List
+from google.cloud import firestore
+
+# Upper bound for the recent performances endpoint
+MAX_RECENT_PERFORMANCES = 20
+
+
+class ExerciseHistoryService:
+    """
+    Per-exercise training history, so "last time you did this" is one bounded
+    query instead of a scan of every workout's embedded logs.
+
+    Each workout that includes an exercise gets one entry under
+    exercise_history/{user_id}_{exercise_id}/sessions/{workout_id} holding its
+    sets of that exercise. Entries are blind writes (sets are merged with
+    ArrayUnion), so logging never reads the history.
+    """
+    def __init__(self, collection_name: str = "exercise_history"):
+        self.collection_name = collection_name
+
+    def sessions_ref(self, db: firestore.Client, user_id: str, exercise_id: str):
+        return db.collection(self.collection_name).document(f"{user_id}_{exercise_id}").collection("sessions")
+
+    def add_to_batch(
+        self,
+        db: firestore.Client,
+        batch: firestore.WriteBatch,
+        user_id: str,
+        workout_id: str,
+        logs: List[Dict[str, Any]],
+        day: str,
+    ) -> None:
+        """
+        Queue one entry per exercise in `logs` (stored log dicts, with their ids).
+        """
+        by_exercise: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for log in logs:
+            # The log id keeps identical sets apart in the ArrayUnion
+            by_exercise[log["exercise_id"]].append({
+                "id": log.get("id"),
+                "set_number": log.get("set_number"),
+                "reps": log.get("reps"),
+                "weight_kg": log.get("weight_kg"),
+            })
+        now = datetime.utcnow()
+        for ex_id, sets in by_exercise.items():
+            batch.set(self.sessions_ref(db, user_id, ex_id).document(workout_id), {
+                "workout_id": workout_id,
+                "date": day,
+                "sets": firestore.ArrayUnion(sets),
+                "performed_at": now,
+            }, merge=True)
+
+    def record(self, db: firestore.Client, user_id: str, workout_id: str, logs: List[Dict[str, Any]], day: str) -> None:
+        batch = db.batch()
+        self.add_to_batch(db, batch, user_id, workout_id, logs, day)
+        batch.commit()
+
+    def recent(self, db: firestore.Client, user_id: str, exercise_id: str, limit: int = 5) -> List[Dict[str, Any]]:
+        """
+        The user's latest `limit` workouts with this exercise, newest first.
+        """
+        docs = self.sessions_ref(db, user_id, exercise_id)\
+                   .order_by("performed_at", direction=firestore.Query.DESCENDING)\
+                   .limit(min(limit, MAX_RECENT_PERFORMANCES))\
+                   .stream()
+        results = []
+        for doc in docs:
+            data = doc.to_dict()
+            data["sets"] = sorted(data.get("sets") or [], key=lambda s: s.get("set_number") or 0)
+            results.append(data)
+        return results
+
+exercise_history = ExerciseHistoryService()
@@ -0,0 +1,324 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Set, Tuple
+from google.cloud import firestore
+from google.cloud.firestore import FieldFilter
+
+from app.core.concurrency import run_parallel
+from app.core.gamification import calculate_level
+from app.core.ranking import XPRankIndex
+from app.schemas.user import User
+from app.services.social import get_mutual_follow_ids
+from app.services.user import user as crud_user
+
+# Users per snapshot chunk document (two parallel arrays, well under 1 MiB)
+SNAPSHOT_CHUNK_SIZE = 20_000
+# How often a worker pulls XP awarded through other workers from the ledger
+CATCH_UP_INTERVAL_SECONDS = 30
+# Each catch-up re-reads events from this far before the previous one started:
+# ledger events carry their commit's server time, so one committed while the
+# previous query ran (or stamped by a server clock ahead of ours) is not
+# skipped. Re-reading a user's xp is idempotent.
+CATCH_UP_OVERLAP = timedelta(seconds=60)
+# Fields read when showing a page of the leaderboard
+PROFILE_FIELDS = ["username", "profile_picture", "xp", "level"]
+# Documents per get_all call when loading friends' profiles
+GET_ALL_CHUNK_SIZE = 100
+# Friends boards are dropped locally on follow/XP changes; this bounds how
+# long XP awarded through another worker can go unnoticed
+FRIENDS_CACHE_SECONDS = 120
+# Friends boards kept in memory per worker
+FRIENDS_CACHE_SIZE = 1024
+
+
+class LeaderboardService:
+    """
+    Global XP leaderboard served from an in-memory XPRankIndex
+    (app/core/ranking.py), so top-N pages and "my rank" never scan users.
+
+    The index is warmed from the latest snapshot (leaderboards/global plus
+    chunks/{0000..}), then caught up with the xp_events written since. Awards
+    made by this worker are applied directly from the XP ledger; awards made
+    elsewhere arrive through the periodic catch-up.
+    """
+    def __init__(self, collection_name: str = "leaderboards", board_id: str = "global"):
+        self.collection_name = collection_name
+        self.board_id = board_id
+        self._index: Optional[XPRankIndex] = None
+        self._synced_at: Optional[datetime] = None
+        self._last_catch_up = 0.0
+        self._lock = threading.Lock()
+        # Serializes loads and catch-ups, whose Firestore reads run without
+        # holding _lock so reads and records keep being served meanwhile
+        self._refresh_lock = threading.Lock()
+
+    def board_ref(self, db: firestore.Client):
+        return db.collection(self.collection_name).document(self.board_id)
+
+    def record(self, user_id: str, xp: int) -> None:
+        """
+        Apply a new XP total. A no-op until the index has been loaded; the
+        catch-up picks the change up from the ledger instead.
+        """
+        with self._lock:
+            if self._index is not None:
+                self._index.update(user_id, xp)
+
+    def index(self, db: firestore.Client) -> XPRankIndex:
+        with self._lock:
+            index = self._index
+            due = time.monotonic() - self._last_catch_up >= CATCH_UP_INTERVAL_SECONDS
+        if index is None:
+            # Cold start: callers wait for the one load in progress
+            with self._refresh_lock:
+                with self._lock:
+                    index = self._index
+                if index is None:
+                    index, synced_at = self._load(db)
+                    with self._lock:
+                        self._index, self._synced_at = index, synced_at
+                    self._catch_up(db)
+            return index
+        if due and self._refresh_lock.acquire(blocking=False):
+            # Others keep using the current index while one caller catches up
+            try:
+                self._catch_up(db)
+            finally:
+                self._refresh_lock.release()
+        return index
+
+    def _load(self, db: firestore.Client) -> Tuple[XPRankIndex, Optional[datetime]]:
+        """
+        A new index from the latest snapshot (or a scan of users without one)
+        and the time the catch-up has to start from.
+        """
+        index = XPRankIndex()
+        header = self.board_ref(db).get()
+        if not header.exists:
+            synced_at = datetime.now(timezone.utc) - CATCH_UP_OVERLAP
+            self._scan_users(db, index)
+            return index, synced_at
+        meta = header.to_dict()
+        refs = [self.board_ref(db).collection("chunks").document(f"{i:04d}") for i in range(meta.get("chunks", 0))]
+        items: Dict[str, int] = {}
+        for chunk in db.get_all(refs):
+            if not chunk.exists:
+                continue
+            data = chunk.to_dict()
+            items.update(zip(data.get("user_ids", []), data.get("xp", [])))
+        index.load(items.items())
+        return index, meta.get("taken_at") - CATCH_UP_OVERLAP if meta.get("taken_at") else None
+
+    def _scan_users(self, db: firestore.Client, index: XPRankIndex, page_size: int = 1000) -> None:
+        """
+        Cold start without a snapshot: one paginated pass over users reading only `xp`.
+        """
+        query = db.collection(crud_user.collection_name).select(["xp"]).order_by("__name__").limit(page_size)
+        items: Dict[str, int] = {}
+        last_doc = None
+        while True:
+            page = query.start_after(last_doc) if last_doc else query
+            docs = list(page.stream())
+            if not docs:
+                break
+            for doc in docs:
+                items[doc.id] = doc.get("xp") or 0
+            last_doc = docs[-1]
+        index.load(items.items())
+
+    def _catch_up(self, db: firestore.Client) -> None:
+        """
+        Re-read the XP of users with ledger events newer than the last sync.
+        Called with _refresh_lock held; _lock is only taken to apply the result.
+        """
+        started = datetime.now(timezone.utc)
+        with self._lock:
+            self._last_catch_up = time.monotonic()
+            synced_at = self._synced_at
+        if synced_at is None:
+            return
+        events = db.collection_group("xp_events").where(filter=FieldFilter("created_at", ">", synced_at)).stream()
+        user_ids = {event.reference.parent.parent.id for event in events}
+        totals = {}
+        if user_ids:
+            refs = [db.collection(crud_user.collection_name).document(uid) for uid in user_ids]
+            totals = {doc.id: doc.get("xp") or 0 for doc in db.get_all(refs, field_paths=["xp"]) if doc.exists}
+        with self._lock:
+            # A total recorded here while the reads ran may be overwritten by
+            # an older one; its event is newer than the next sync point, so the
+            # next catch-up corrects it
+            for user_id, xp in totals.items():
+                self._index.update(user_id, xp)
+            self._synced_at = started - CATCH_UP_OVERLAP
+
+    def top(self, db: firestore.Client, offset: int = 0, limit: int = 20) -> Dict[str, Any]:
+        index = self.index(db)
+        with self._lock:
+            rows = index.top(offset, limit)
+            total = len(index)
+        refs = [db.collection(crud_user.collection_name).document(user_id) for _, user_id, _ in rows]
+        profiles = {doc.id: doc.to_dict() for doc in db.get_all(refs, field_paths=PROFILE_FIELDS) if doc.exists} if refs else {}
+        entries = []
+        for rank, user_id, xp in rows:
+            profile = profiles.get(user_id, {})
+            entries.append({
+                "rank": rank,
+                "user_id": user_id,
+                "username": profile.get("username"),
+                "profile_picture": profile.get("profile_picture"),
+                "xp": xp,
+                "level": calculate_level(xp),
+            })
+        return {"total": total, "offset": offset, "entries": entries}
+
+    def position(self, db: firestore.Client, user_id: str, xp: int) -> Dict[str, Any]:
+        index = self.index(db)
+        with self._lock:
+            if user_id not in index:
+                # Users that never earned XP are not in snapshots; add them on first look
+                index.update(user_id, xp)
+            return {
+                "user_id": user_id,
+                "xp": index.get(user_id),
+                "rank": index.rank(user_id),
+                "total": len(index),
+                "percentile": index.percentile(user_id),
+            }
+
+    def save_snapshot(self, db: firestore.Client) -> Dict[str, Any]:
+        """
+        Write the current index as chunk documents and then the header pointing
+        at them. A worker loading mid-write may mix old and new chunks; any user
+        whose XP changed since the previous `taken_at` is re-read by the catch-up.
+        """
+        index = self.index(db)
+        with self._lock:
+            items = list(index.items())
+            taken_at = self._synced_at or datetime.now(timezone.utc)
+
+        chunks = 0
+        batch = db.batch()
+        for start in range(0, len(items), SNAPSHOT_CHUNK_SIZE):
+            part = items[start:start + SNAPSHOT_CHUNK_SIZE]
+            batch.set(self.board_ref(db).collection("chunks").document(f"{chunks:04d}"), {
+                "user_ids": [user_id for user_id, _ in part],
+                "xp": [xp for _, xp in part],
+            })
+            chunks += 1
+            if len(batch) >= 10:
+                # Keep each commit well under the 10 MiB request limit
+                batch.commit()
+                batch = db.batch()
+        batch.set(self.board_ref(db), {"chunks": chunks, "count": len(items), "taken_at": taken_at})
+        batch.commit()
+        return {"chunks": chunks, "count": len(items), "taken_at": taken_at}
+
+class FriendsLeaderboardService:
+    """
+    Leaderboard of a user and their mutual follows, cached per user.
+
+    A cached board is keyed by the user's XP and "following"/"followers"
+    cache versions (all loaded with the user on every request), so follow
+    changes invalidate it on any worker. XP changes of the people on it are
+    invalidated locally through `invalidate_member` and elsewhere by the TTL.
+    Boards are kept in LRU order, at most `max_users` of them, and expired
+    ones are evicted as new ones come in.
+    """
+    def __init__(self, ttl_seconds: int = FRIENDS_CACHE_SECONDS, max_users: int = FRIENDS_CACHE_SIZE):
+        self.ttl_seconds = ttl_seconds
+        self.max_users = max_users
+        # owner -> (key, expires at, board, member ids)
+        self._cache: "OrderedDict[str, Tuple[Tuple, float, Dict[str, Any], List[str]]]" = OrderedDict()
+        # member user_id -> owners whose cached board lists them
+        self._members: Dict[str, Set[str]] = {}
+        self._lock = threading.Lock()
+
+    def _cache_key(self, user: User) -> Tuple:
+        versions = user.cache_versions
+        return (user.xp, versions.get("following", 0), versions.get("followers", 0))
+
+    def _drop(self, owner: str) -> None:
+        # Caller holds the lock
+        entry = self._cache.pop(owner, None)
+        if entry is None:
+            return
+        for member in entry[3]:
+            owners = self._members.get(member)
+            if owners is not None:
+                owners.discard(owner)
+                if not owners:
+                    del self._members[member]
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._drop(user_id)
+
+    def invalidate_member(self, user_id: str) -> None:
+        """
+        Drop every cached board that shows `user_id` (their XP changed).
+        """
+        with self._lock:
+            for owner in list(self._members.get(user_id, ())):
+                self._drop(owner)
+
+    def fetch_profiles(self, db: firestore.Client, user_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Leaderboard fields of `user_ids`, read as projections in parallel get_all chunks.
+        """
+        def load(chunk: List[str]) -> List[Dict[str, Any]]:
+            refs = [db.collection(crud_user.collection_name).document(uid) for uid in chunk]
+            return [dict(doc.to_dict(), id=doc.id) for doc in db.get_all(refs, field_paths=PROFILE_FIELDS) if doc.exists]
+
+        chunks = [user_ids[i:i + GET_ALL_CHUNK_SIZE] for i in range(0, len(user_ids), GET_ALL_CHUNK_SIZE)]
+        results = run_parallel(*[lambda chunk=chunk: load(chunk) for chunk in chunks])
+        return [profile for chunk in results for profile in chunk]
+
+    def get(self, db: firestore.Client, user: User) -> Dict[str, Any]:
+        key = self._cache_key(user)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._cache.get(user.id)
+            if cached and cached[0] == key and cached[1] > now:
+                self._cache.move_to_end(user.id)
+                return cached[2]
+
+        friend_ids = sorted(get_mutual_follow_ids(db, user.id))
+        profiles = self.fetch_profiles(db, friend_ids)
+        profiles.append({
+            "id": user.id,
+            "username": user.username,
+            "profile_picture": user.profile_picture,
+            "xp": user.xp,
+        })
+        profiles.sort(key=lambda p: (-(p.get("xp") or 0), p["id"]))
+
+        entries = []
+        for rank, profile in enumerate(profiles, start=1):
+            xp = profile.get("xp") or 0
+            entries.append({
+                "rank": rank,
+                "user_id": profile["id"],
+                "username": profile.get("username"),
+                "profile_picture": profile.get("profile_picture"),
+                "xp": xp,
+                "level": calculate_level(xp),
+            })
+        result = {"total": len(entries), "offset": 0, "entries": entries}
+
+        member_ids = [profile["id"] for profile in profiles]
+        with self._lock:
+            self._drop(user.id)
+            self._cache[user.id] = (key, now + self.ttl_seconds, result, member_ids)
+            for member in member_ids:
+                self._members.setdefault(member, set()).add(user.id)
+            while self._cache:
+                owner, oldest = next(iter(self._cache.items()))
+                if len(self._cache) <= self.max_users and oldest[1] > now:
+                    break
+                self._drop(owner)
+        return result
+
+leaderboard = LeaderboardService()
+friends_leaderboard = FriendsLeaderboardService()
@@ -0,0 +1,227 @@
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+from google.cloud import firestore
+
+from app.schemas.tracking import ScheduledWorkout, WorkoutLogCreate
+from app.schemas.user import User
+from app.services.activity import activity
+from app.services.exercise_history import exercise_history
+from app.services.records import personal_records
+from app.services.schedule import schedule_rule
+from app.services.session import add_awards_to_batch, apply_awards
+from app.services.streaks import streaks
+from app.services.summary import daily_summary
+from app.services.tracking import scheduled_workout as crud_sw
+from app.services.user import user as crud_user
+
+# A checkpoint is written when this many sets are pending or when this much
+# time passed since the last one, whichever comes first
+CHECKPOINT_MAX_SETS = 25
+CHECKPOINT_INTERVAL_SECONDS = 600
+
+
+class LiveSession:
+    def __init__(self, workout: ScheduledWorkout, sets: Optional[List[Dict[str, Any]]] = None):
+        self.workout = workout
+        self.sets: List[Dict[str, Any]] = sets or []
+        # Sets already persisted in the checkpoint document
+        self.checkpointed = len(self.sets)
+        self.last_checkpoint = time.monotonic()
+        # Connections attached (a reconnect can overlap the old socket) and
+        # the lock they take around every change to the buffer
+        self.connections = 0
+        self.finished = False
+        self.lock = threading.Lock()
+
+    @property
+    def pending(self) -> List[Dict[str, Any]]:
+        return self.sets[self.checkpointed:]
+
+
+class LiveSessionManager:
+    """
+    Buffers the sets of an in-progress workout in memory.
+    Sets are only written to Firestore as periodic checkpoints
+    (live_sessions/{workout_id}) and, when the session finishes, in a single
+    write to the workout itself. Reconnecting after a crash or on another
+    worker resumes from the last checkpoint.
+    """
+    def __init__(self, collection_name: str = "live_sessions"):
+        self.collection_name = collection_name
+        self._sessions: Dict[str, LiveSession] = {}
+        self._lock = threading.Lock()
+
+    def checkpoint_ref(self, db: firestore.Client, workout_id: str):
+        return db.collection(self.collection_name).document(workout_id)
+
+    def open(self, db: firestore.Client, workout_id: str, user_id: str) -> LiveSession:
+        """
+        Attach to a session, restoring it from memory or from the last checkpoint
+        (materializing a recurring schedule occurrence on first start).
+        Raises ValueError if the workout does not exist or belongs to someone else.
+        """
+        with self._lock:
+            session = self._sessions.get(workout_id)
+        if session is None or session.workout.user_id != user_id:
+            # Starting an occurrence of a recurring schedule stores it
+            workout = schedule_rule.materialize(db, workout_id, user_id=user_id)
+            if not workout:
+                raise ValueError("Workout not found")
+
+            checkpoint = self.checkpoint_ref(db, workout_id).get()
+            sets = checkpoint.to_dict().get("sets", []) if checkpoint.exists else []
+            with self._lock:
+                # A concurrent connection may have restored it meanwhile
+                session = self._sessions.setdefault(workout_id, LiveSession(workout, sets))
+        with session.lock:
+            session.connections += 1
+        return session
+
+    def add_set(self, db: firestore.Client, session: LiveSession, log_in: WorkoutLogCreate) -> Dict[str, Any]:
+        """
+        Buffer one set. Raises ValueError if the session was already finished.
+        """
+        log_data = crud_sw.build_log(log_in, session.workout.id)
+        with session.lock:
+            if session.finished:
+                raise ValueError("Session already finished")
+            session.sets.append(log_data)
+            if (len(session.pending) >= CHECKPOINT_MAX_SETS
+                    or time.monotonic() - session.last_checkpoint >= CHECKPOINT_INTERVAL_SECONDS):
+                self._checkpoint(db, session)
+        return log_data
+
+    def checkpoint(self, db: firestore.Client, session: LiveSession) -> bool:
+        """
+        Persist pending sets. Returns False if there was nothing to write.
+        """
+        with session.lock:
+            if session.finished:
+                return False
+            return self._checkpoint(db, session)
+
+    def _checkpoint(self, db: firestore.Client, session: LiveSession) -> bool:
+        # Caller holds session.lock
+        pending = session.pending
+        session.last_checkpoint = time.monotonic()
+        if not pending:
+            return False
+        self.checkpoint_ref(db, session.workout.id).set({
+            "user_id": session.workout.user_id,
+            "workout_id": session.workout.id,
+            "sets": firestore.ArrayUnion(pending),
+            "updated_at": datetime.utcnow(),
+        }, merge=True)
+        session.checkpointed += len(pending)
+        return True
+
+    def detach(self, db: firestore.Client, session: LiveSession) -> None:
+        """
+        A connection went away (or failed): checkpoint what is pending and
+        free the buffer once no connection is left. The buffer is freed even
+        if the checkpoint write fails; the last checkpoint is what survives.
+        """
+        with session.lock:
+            session.connections -= 1
+            try:
+                if not session.finished:
+                    self._checkpoint(db, session)
+            finally:
+                if session.connections <= 0:
+                    with self._lock:
+                        if self._sessions.get(session.workout.id) is session:
+                            del self._sessions[session.workout.id]
+
+    def finish(
+        self,
+        db: firestore.Client,
+        session: LiveSession,
+        user: User,
+        *,
+        duration_seconds: Optional[int] = None,
+        calories_burned: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Commit every set to the workout and mark it completed in one batch.
+        The first completion also awards XP, achievements and challenge
+        progress in that batch, like a logged session.
+        Returns the fields of a WorkoutCompletionResponse.
+        Raises ValueError if the session was already finished.
+        """
+        with session.lock:
+            if session.finished:
+                raise ValueError("Session already finished")
+            workout, awards, write_results = self._commit(db, session, duration_seconds, calories_burned)
+            session.finished = True
+
+        with self._lock:
+            if self._sessions.get(workout.id) is session:
+                del self._sessions[workout.id]
+
+        broken_records = []
+        if session.sets:
+            broken_records = personal_records.record(db, workout.user_id, session.sets, date.today().isoformat(), workout.id)
+        if workout.status != "completed":
+            daily_summary.record_completion(
+                db,
+                user_id=workout.user_id,
+                date_str=workout.scheduled_date.isoformat(),
+                routine_id=workout.routine_id,
+                calories_burned=calories_burned if calories_burned is not None else workout.calories_burned,
+                duration_seconds=duration_seconds if duration_seconds is not None else workout.duration_seconds,
+            )
+            streaks.record(db, workout.user_id, workout.scheduled_date)
+            activity.record(db, workout.user_id, workout.scheduled_date)
+
+        data = workout.model_dump()
+        data["status"] = "completed"
+        data["logs"] = data["logs"] + session.sets
+        if duration_seconds is not None:
+            data["duration_seconds"] = duration_seconds
+        if calories_burned is not None:
+            data["calories_burned"] = calories_burned
+
+        return {
+            "workout": ScheduledWorkout(**data),
+            **apply_awards(db, awards, write_results, user.xp or 0),
+            "personal_records": broken_records,
+        }
+
+    def _commit(
+        self,
+        db: firestore.Client,
+        session: LiveSession,
+        duration_seconds: Optional[int],
+        calories_burned: Optional[float],
+    ) -> Tuple[ScheduledWorkout, Optional[Dict[str, Any]], Any]:
+        # Caller holds session.lock
+        workout = session.workout
+        update_data: Dict[str, Any] = {"status": "completed"}
+        if session.sets:
+            update_data["logs"] = firestore.ArrayUnion(session.sets)
+        if duration_seconds is not None:
+            update_data["duration_seconds"] = duration_seconds
+        if calories_burned is not None:
+            update_data["calories_burned"] = calories_burned
+
+        batch = db.batch()
+        batch.update(db.collection(crud_sw.collection_name).document(workout.id), update_data)
+        batch.delete(self.checkpoint_ref(db, workout.id))
+        if session.sets:
+            exercise_history.add_to_batch(db, batch, workout.user_id, workout.id, session.sets, date.today().isoformat())
+            if workout.status == "completed":
+                # Otherwise record_completion bumps it along with the dashboard
+                crud_user.bump_cache_version(db, workout.user_id, "analytics", batch=batch)
+        awards = None
+        if workout.status != "completed":
+            # Awarded once, on the first completion
+            awards = add_awards_to_batch(
+                db, batch, workout.user_id, date.today(), session.sets,
+                calories_burned if calories_burned is not None else workout.calories_burned,
+                workout.id,
+            )
+        return workout, awards, batch.commit()
+
+live_sessions = LiveSessionManager()
@@ -0,0 +1,21 @@
+from typing import Any, Dict, Optional
+from google.cloud import firestore
+from app.services.base import CRUDBase
+from app.services.user import user as crud_user
+from app.schemas.notification import Notification, NotificationCreate
+
+class CRUDNotification(CRUDBase[Notification, NotificationCreate, NotificationCreate]):
+    def notify(self, db: firestore.Client, data: Dict[str, Any], batch: Optional[firestore.WriteBatch] = None) -> None:
+        """
+        Store a notification and bump the recipient's notifications version in one batch.
+        Added to `batch` when given (e.g. a transaction), otherwise committed immediately.
+        """
+        own_batch = batch is None
+        if own_batch:
+            batch = db.batch()
+        batch.set(db.collection(self.collection_name).document(), data)
+        crud_user.bump_cache_version(db, data["user_id"], "notifications", batch=batch)
+        if own_batch:
+            batch.commit()
+
+notification = CRUDNotification("notifications", Notification)
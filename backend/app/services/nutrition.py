@@ -0,0 +1,280 @@
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from google.cloud import firestore
+
+from app.core.doc_size import MAX_DOCUMENT_BYTES, estimate_size
+from app.core.periods import month_key, week_key
+from app.schemas.nutrition import NutritionLogCreate
+
+# Inline logs are moved into chunk documents once the day document passes
+# ROLLOVER_BYTES, which leaves plenty of headroom below MAX_DOCUMENT_BYTES
+# for totals and concurrent appends.
+ROLLOVER_BYTES = 512 * 1024
+
+# A day counts as "on target" when its calories are within 10% of the goal
+ON_TARGET_TOLERANCE = 0.1
+
+
+def plan_rollup_reads(start: date, end: date) -> List[Tuple[str, date, date]]:
+    """
+    Pick the rollup documents needed to cover [start, end].
+    Each month touched by the range is one read, unless the part of the
+    range inside that month falls within a single ISO week, in which case
+    the (smaller) week document is read instead.
+    Returns (rollup_key, from, to) tuples; from/to clip the days used.
+    """
+    reads = []
+    cursor = start
+    while cursor <= end:
+        if cursor.month == 12:
+            next_month = date(cursor.year + 1, 1, 1)
+        else:
+            next_month = date(cursor.year, cursor.month + 1, 1)
+        segment_end = min(end, next_month - timedelta(days=1))
+        if week_key(cursor) == week_key(segment_end):
+            key = week_key(cursor)
+        else:
+            key = month_key(cursor)
+        # Consecutive short segments can share a week document across a month boundary
+        if reads and reads[-1][0] == key:
+            reads[-1] = (key, reads[-1][1], segment_end)
+        else:
+            reads.append((key, cursor, segment_end))
+        cursor = segment_end + timedelta(days=1)
+    return reads
+
+
+def summarize_days(days: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Totals, average calories per logged day and days on target for a list of day points.
+    """
+    summary = {
+        "total_calories": 0,
+        "total_protein": 0.0,
+        "total_carbs": 0.0,
+        "total_fat": 0.0,
+        "days_logged": len(days),
+        "days_on_target": 0,
+    }
+    for d in days:
+        summary["total_calories"] += d["calories"]
+        summary["total_protein"] += d["protein"]
+        summary["total_carbs"] += d["carbs"]
+        summary["total_fat"] += d["fat"]
+        if d["on_target"]:
+            summary["days_on_target"] += 1
+    summary["average_calories"] = round(summary["total_calories"] / len(days), 1) if days else 0.0
+    return summary
+
+
+class NutritionLogService:
+    """
+    Daily nutrition logs live in users/{user_id}/nutrition_logs/{YYYY-MM-DD}.
+    Totals are kept with Increment and entries appended with ArrayUnion, so
+    logging food is a single blind write that never loses a concurrent log.
+    """
+    def __init__(self, parent_collection: str = "users", collection_name: str = "nutrition_logs"):
+        self.parent_collection = parent_collection
+        self.collection_name = collection_name
+
+    def day_ref(self, db: firestore.Client, user_id: str, date_str: str):
+        return db.collection(self.parent_collection).document(user_id)\
+                 .collection(self.collection_name).document(date_str)
+
+    def build_entry(self, log: NutritionLogCreate) -> Dict[str, Any]:
+        entry = log.model_dump()
+        # Unique id so ArrayUnion never collapses two identical foods logged the same day
+        entry["id"] = str(uuid.uuid4())
+        entry["logged_at"] = datetime.utcnow().isoformat()
+        return entry
+
+    def entries_from_diet_day(self, diet_data: Dict[str, Any], day: str, meal: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Build log entries for every food of one day of a diet's weekly_plan.
+        Returns None if the diet has no such day.
+        """
+        day_plan = next((d for d in diet_data.get("weekly_plan", []) if d.get("day", "").lower() == day.lower()), None)
+        if day_plan is None:
+            return None
+        entries = []
+        for meal_data in day_plan.get("meals", []):
+            meal_name = meal_data.get("name", "snack")
+            if meal and meal_name.lower() != meal.lower():
+                continue
+            for food in meal_data.get("foods", []):
+                entries.append(self.build_entry(NutritionLogCreate(
+                    calories=round(food.get("calories", 0)),
+                    protein=food.get("protein", 0),
+                    carbs=food.get("carbs", 0),
+                    fat=food.get("fat", 0),
+                    food_name=food.get("name", "Alimento"),
+                    meal_type=meal_name.lower(),
+                )))
+        return entries
+
+    def rollup_ref(self, db: firestore.Client, user_id: str, key: str):
+        return db.collection(self.parent_collection).document(user_id)\
+                 .collection("nutrition_rollups").document(key)
+
+    def log_entries(self, db: firestore.Client, user_id: str, date_str: str, entries: List[Dict[str, Any]], goal: int = 2000) -> None:
+        """
+        Append already-built entries to the day document and bump the weekly and
+        monthly rollups, all in one batch with no prior read.
+
+        Entries too big to fit next to a day document that is about to roll
+        over go straight into a new chunk document instead, in a transaction
+        that reads the chunk count (only ever for very large bulk logs).
+        """
+        if not entries:
+            return
+        size = sum(estimate_size(e) for e in entries)
+        if size > MAX_DOCUMENT_BYTES - ROLLOVER_BYTES:
+            self._log_to_chunk(db, user_id, date_str, entries, size, goal)
+            return
+
+        batch = db.batch()
+        batch.set(self.day_ref(db, user_id, date_str), dict(
+            self._day_totals(date_str, entries),
+            inline_bytes=firestore.Increment(size),
+            logs=firestore.ArrayUnion(entries),
+        ), merge=True)
+        self._add_rollups(db, batch, user_id, date_str, entries, goal)
+        batch.commit()
+
+    def _log_to_chunk(self, db: firestore.Client, user_id: str, date_str: str, entries: List[Dict[str, Any]], size: int, goal: int) -> None:
+        doc_ref = self.day_ref(db, user_id, date_str)
+
+        @firestore.transactional
+        def _log(transaction) -> None:
+            snapshot = doc_ref.get(transaction=transaction)
+            index = (snapshot.to_dict() or {}).get("chunk_count", 0) if snapshot.exists else 0
+            transaction.set(doc_ref.collection("chunks").document(f"{index:04d}"), {"index": index, "logs": entries})
+            transaction.set(doc_ref, dict(self._day_totals(date_str, entries), chunk_count=index + 1), merge=True)
+            self._add_rollups(db, transaction, user_id, date_str, entries, goal)
+
+        _log(db.transaction())
+
+    def _day_totals(self, date_str: str, entries: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return {
+            "date": date_str,
+            "total_calories": firestore.Increment(sum(e["calories"] for e in entries)),
+            "total_protein": firestore.Increment(sum(e["protein"] for e in entries)),
+            "total_carbs": firestore.Increment(sum(e["carbs"] for e in entries)),
+            "total_fat": firestore.Increment(sum(e["fat"] for e in entries)),
+            "log_count": firestore.Increment(len(entries)),
+        }
+
+    def _add_rollups(self, db: firestore.Client, batch, user_id: str, date_str: str, entries: List[Dict[str, Any]], goal: int) -> None:
+        """
+        Queue the weekly and monthly rollup increments on a batch or transaction.
+        """
+        calories = sum(e["calories"] for e in entries)
+        protein = sum(e["protein"] for e in entries)
+        carbs = sum(e["carbs"] for e in entries)
+        fat = sum(e["fat"] for e in entries)
+        # Rollups keep a small per-day map so any range can be rebuilt from them
+        day = date.fromisoformat(date_str)
+        for kind, key in (("week", week_key(day)), ("month", month_key(day))):
+            batch.set(self.rollup_ref(db, user_id, key), {
+                "kind": kind,
+                "period": key,
+                "total_calories": firestore.Increment(calories),
+                "total_protein": firestore.Increment(protein),
+                "total_carbs": firestore.Increment(carbs),
+                "total_fat": firestore.Increment(fat),
+                "log_count": firestore.Increment(len(entries)),
+                "days": {
+                    date_str: {
+                        "calories": firestore.Increment(calories),
+                        "protein": firestore.Increment(protein),
+                        "carbs": firestore.Increment(carbs),
+                        "fat": firestore.Increment(fat),
+                        "goal": goal,
+                    }
+                },
+            }, merge=True)
+
+    def get_history(self, db: firestore.Client, user_id: str, start: date, end: date, goal: int = 2000) -> List[Dict[str, Any]]:
+        """
+        Per-day points for [start, end] read from the coarsest rollups covering the range.
+        """
+        plan = plan_rollup_reads(start, end)
+        refs = [self.rollup_ref(db, user_id, key) for key, _, _ in plan]
+        docs = {doc.id: doc.to_dict() for doc in db.get_all(refs) if doc.exists}
+
+        days = []
+        for key, seg_start, seg_end in plan:
+            rollup = docs.get(key)
+            if not rollup:
+                continue
+            for date_str, day_data in rollup.get("days", {}).items():
+                if not seg_start.isoformat() <= date_str <= seg_end.isoformat():
+                    continue
+                day_goal = day_data.get("goal") or goal
+                day_calories = day_data.get("calories", 0)
+                days.append({
+                    "date": date_str,
+                    "calories": day_calories,
+                    "protein": day_data.get("protein", 0),
+                    "carbs": day_data.get("carbs", 0),
+                    "fat": day_data.get("fat", 0),
+                    "goal": day_goal,
+                    "on_target": abs(day_calories - day_goal) <= day_goal * ON_TARGET_TOLERANCE,
+                })
+        days.sort(key=lambda d: d["date"])
+        return days
+
+    def get_day(self, db: firestore.Client, user_id: str, date_str: str, include_chunks: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Read the day document, rolling it over first if it grew past ROLLOVER_BYTES.
+        Entries already moved to chunks are prepended to `logs` (extra reads only
+        happen on days that overflowed).
+        """
+        doc_ref = self.day_ref(db, user_id, date_str)
+        doc = doc_ref.get()
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+
+        if data.get("inline_bytes", 0) >= ROLLOVER_BYTES:
+            self.roll_over(db, user_id, date_str)
+            data = doc_ref.get().to_dict()
+
+        if include_chunks and data.get("chunk_count", 0) > 0:
+            chunk_logs = []
+            chunks = doc_ref.collection("chunks").order_by("index").stream()
+            for chunk in chunks:
+                chunk_logs.extend(chunk.to_dict().get("logs", []))
+            data["logs"] = chunk_logs + data.get("logs", [])
+        return data
+
+    def roll_over(self, db: firestore.Client, user_id: str, date_str: str) -> bool:
+        """
+        Move the inline `logs` array into a new chunk document inside a transaction.
+        Returns True if a chunk was written.
+        """
+        doc_ref = self.day_ref(db, user_id, date_str)
+
+        @firestore.transactional
+        def _roll(transaction) -> bool:
+            snapshot = doc_ref.get(transaction=transaction)
+            if not snapshot.exists:
+                return False
+            data = snapshot.to_dict()
+            if data.get("inline_bytes", 0) < ROLLOVER_BYTES:
+                # Another request already rolled this day over
+                return False
+            index = data.get("chunk_count", 0)
+            chunk_ref = doc_ref.collection("chunks").document(f"{index:04d}")
+            transaction.set(chunk_ref, {"index": index, "logs": data.get("logs", [])})
+            transaction.update(doc_ref, {
+                "logs": [],
+                "inline_bytes": 0,
+                "chunk_count": index + 1,
+            })
+            return True
+
+        return _roll(db.transaction())
+
+nutrition_log = NutritionLogService()
@@ -0,0 +1,111 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+from google.api_core.exceptions import AlreadyExists, FailedPrecondition
+from google.cloud import firestore
+from google.cloud.firestore import FieldFilter
+
+from app.core.records import merge_records
+
+# Attempts before giving up when concurrent sessions keep moving a record
+MAX_RECORD_ATTEMPTS = 5
+# Raised by a batch whose record preconditions no longer hold
+RecordConflict = (AlreadyExists, FailedPrecondition)
+
+
+class PersonalRecordService:
+    """
+    Personal records index: one document per user and exercise
+    (personal_records/{user_id}_{exercise_id}), updated as sets are logged so
+    neither the "new PR!" check nor the profile's PR table reads workouts.
+
+    Writes are compare-and-set: an existing record is updated with a
+    last_update_time precondition and a new one is created (fails if it
+    exists), so a concurrent session on the same exercise makes the commit
+    fail instead of overwriting a better set. Callers re-read and retry.
+    """
+    def __init__(self, collection_name: str = "personal_records"):
+        self.collection_name = collection_name
+
+    def record_ref(self, db: firestore.Client, user_id: str, exercise_id: str):
+        return db.collection(self.collection_name).document(f"{user_id}_{exercise_id}")
+
+    def lookup(self, db: firestore.Client, user_id: str, exercise_ids: Iterable[str]) -> Dict[str, Any]:
+        """
+        Current record snapshots of the given exercises, in a single get_all.
+        """
+        refs = [self.record_ref(db, user_id, ex_id) for ex_id in sorted(set(exercise_ids))]
+        if not refs:
+            return {}
+        return {doc.id[len(user_id) + 1:]: doc for doc in db.get_all(refs)}
+
+    def add_to_batch(
+        self,
+        db: firestore.Client,
+        batch: firestore.WriteBatch,
+        user_id: str,
+        logs: List[Dict[str, Any]],
+        snapshots: Dict[str, Any],
+        day: str,
+        workout_id: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Queue the record updates for `logs` against the snapshots from `lookup`.
+        Returns the records broken; they only hold once the batch commits.
+        """
+        by_exercise: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        for log in logs:
+            by_exercise[log["exercise_id"]].append(log)
+
+        broken = []
+        now = datetime.utcnow()
+        for ex_id, sets in by_exercise.items():
+            snapshot = snapshots.get(ex_id)
+            exists = snapshot is not None and snapshot.exists
+            changes, breaks = merge_records(snapshot.to_dict() if exists else None, sets, day, workout_id)
+            if not changes:
+                continue
+            changes["updated_at"] = now
+            ref = self.record_ref(db, user_id, ex_id)
+            if exists:
+                batch.update(ref, changes, option=db.write_option(last_update_time=snapshot.update_time))
+            else:
+                batch.create(ref, dict(changes, user_id=user_id, exercise_id=ex_id))
+            broken.extend(dict(b, exercise_id=ex_id) for b in breaks)
+        return broken
+
+    def record(self, db: firestore.Client, user_id: str, logs: List[Dict[str, Any]], day: str, workout_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Update the records for `logs` on their own. Returns the records broken.
+        """
+        exercise_ids = {log["exercise_id"] for log in logs}
+        for attempt in range(MAX_RECORD_ATTEMPTS):
+            batch = db.batch()
+            broken = self.add_to_batch(db, batch, user_id, logs, self.lookup(db, user_id, exercise_ids), day, workout_id)
+            if not len(batch):
+                return []
+            try:
+                batch.commit()
+                return broken
+            except RecordConflict:
+                if attempt == MAX_RECORD_ATTEMPTS - 1:
+                    raise
+        return []
+
+    def get_by_user(self, db: firestore.Client, user_id: str) -> List[Dict[str, Any]]:
+        """
+        Every record of the user (one document per exercise trained).
+        """
+        docs = db.collection(self.collection_name).where(filter=FieldFilter("user_id", "==", user_id)).stream()
+        records = []
+        for doc in docs:
+            data = doc.to_dict()
+            data["reps_at_weight"] = [
+                {"weight_kg": int(key) / 100, "reps": reps}
+                for key, reps in sorted((data.get("reps_at_weight") or {}).items(), key=lambda kv: int(kv[0]))
+            ]
+            records.append(data)
+        records.sort(key=lambda r: r.get("exercise_id") or "")
+        return records
+
+personal_records = PersonalRecordService()
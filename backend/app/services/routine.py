@@ -1,8 +1,14 @@
-from typing import Any, Dict, Union, List
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+from google.api_core.exceptions import FailedPrecondition
 from google.cloud import firestore
+from app.core.routine_snapshot import apply_ops, build_snapshot, flatten, patch_exercise, snapshot_exercise_ids
 from app.services.base import CRUDBase
 from app.schemas.routine import Routine, RoutineCreate, RoutineUpdate
 
+# Firestore allows 500 writes per batch
+REFRESH_BATCH_SIZE = 500
+
 class CRUDRoutine(CRUDBase[Routine, RoutineCreate, RoutineUpdate]):
     def create(self, db: firestore.Client, *, obj_in: Union[RoutineCreate, Dict[str, Any]]) -> Routine:
         from fastapi.encoders import jsonable_encoder
@@ -18,37 +24,312 @@ class CRUDRoutine(CRUDBase[Routine, RoutineCreate, RoutineUpdate]):
             
         return super().create(db, obj_in=req_data)
 
+    def exercise_docs(self, db: firestore.Client, exercise_ids: Iterable[str], transaction=None) -> Dict[str, Dict[str, Any]]:
+        """
+        Catalog entries by id, in get_all chunks of 100.
+        """
+        refs = [db.collection("exercises").document(eid) for eid in sorted(set(exercise_ids)) if eid]
+        found = {}
+        for i in range(0, len(refs), 100):
+            for doc in db.get_all(refs[i:i + 100], transaction=transaction):
+                if doc.exists:
+                    found[doc.id] = doc.to_dict()
+        return found
+
+    def snapshot_fields(self, db: firestore.Client, rows: List[Dict[str, Any]], version: int, exercises: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """
+        Routine fields holding the snapshot of `rows` (routine_exercises dicts with their "id").
+        Exercises not passed in `exercises` are read from the catalog.
+        """
+        exercises = dict(exercises or {})
+        missing = {row.get("exercise_id") for row in rows} - set(exercises)
+        if missing:
+            exercises.update(self.exercise_docs(db, missing))
+        snapshot = build_snapshot(rows, exercises, version)
+        return {"snapshot": snapshot, "exercise_ids": snapshot_exercise_ids(snapshot)}
+
+    def rebuild_snapshot(self, db: firestore.Client, id: str) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild a routine's snapshot from routine_exercises in a transaction.
+        Returns the routine data with the new snapshot, or None if it does not exist.
+        """
+        ref = db.collection(self.collection_name).document(id)
+
+        @firestore.transactional
+        def _rebuild(transaction) -> Optional[Dict[str, Any]]:
+            doc = ref.get(transaction=transaction)
+            if not doc.exists:
+                return None
+            data = doc.to_dict()
+            rows = [
+                dict(row.to_dict(), id=row.id)
+                for row in db.collection("routine_exercises")
+                             .where(filter=firestore.FieldFilter("routine_id", "==", id))
+                             .stream(transaction=transaction)
+            ]
+            exercises = self.exercise_docs(db, {row.get("exercise_id") for row in rows}, transaction=transaction)
+            version = (data.get("snapshot") or {}).get("version", 0) + 1
+            fields = self.snapshot_fields(db, rows, version, exercises)
+            transaction.update(ref, fields)
+            data.update(fields)
+            return data
+
+        return _rebuild(db.transaction())
+
+    def detail(self, id: str, data: Dict[str, Any], own_snapshot: bool = True) -> Dict[str, Any]:
+        """
+        Routine response (with `exercises`) from stored data holding a snapshot.
+        Imports pass their source's snapshot with `own_snapshot=False` (no version of their own).
+        """
+        snapshot = data.get("snapshot") or {}
+        routine_dict = self._from_doc(id, dict(data)).model_dump()
+        routine_dict["exercises"] = flatten(snapshot, id)
+        routine_dict["version"] = snapshot.get("version") if own_snapshot else None
+        return routine_dict
+
+    # --- Copy-on-write imports ---
+    #
+    # An imported routine stores no rows and no snapshot, only
+    # source_routine_id / source_version, and is hydrated from the source.
+    # So that it keeps showing what was imported, a routine's snapshot is
+    # archived under routines/{id}/versions before its rows change or it is
+    # deleted: the import resolves to the first archived version >= its own
+    # (or to the source's current snapshot if the rows never changed since).
+    # Editing an import materializes it into a regular routine.
+
+    def versions_ref(self, db: firestore.Client, id: str):
+        return db.collection(self.collection_name).document(id).collection("versions")
+
+    def archive_snapshot(self, db: firestore.Client, batch: firestore.WriteBatch, id: str, snapshot: Optional[Dict[str, Any]]) -> None:
+        """
+        Queue a copy of `snapshot` for imports that may reference it. Call before its rows change.
+        """
+        if snapshot:
+            batch.set(self.versions_ref(db, id).document(f"{snapshot['version']:08d}"), {
+                "version": snapshot["version"],
+                "snapshot": snapshot,
+                "archived_at": datetime.utcnow(),
+            })
+
+    def source_snapshot(self, db: firestore.Client, source_id: str, version: int, source: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Snapshot an import of `source_id` at `version` resolves to.
+        `source` is the source routine's data (None if it was deleted).
+        """
+        current = (source or {}).get("snapshot")
+        if current and current.get("version") == version:
+            return current
+        archived = self.versions_ref(db, source_id)\
+                       .where(filter=firestore.FieldFilter("version", ">=", version))\
+                       .order_by("version")\
+                       .limit(1)\
+                       .stream()
+        for doc in archived:
+            return doc.to_dict()["snapshot"]
+        return current
+
+    def resolve_snapshot(self, db: firestore.Client, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        The routine's own snapshot, or for an import, the source's (one more read).
+        """
+        if data.get("snapshot") is not None or not data.get("source_routine_id"):
+            return data.get("snapshot")
+        source = db.collection(self.collection_name).document(data["source_routine_id"]).get()
+        return self.source_snapshot(db, data["source_routine_id"], data.get("source_version") or 0, source.to_dict() if source.exists else None)
+
+    def import_reference(self, db: firestore.Client, id: str) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]]:
+        """
+        (routine data, reference fields, snapshot) for importing routine `id`.
+        Importing an import references the original source instead.
+        """
+        doc = db.collection(self.collection_name).document(id).get()
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+        if data.get("snapshot") is None and data.get("source_routine_id"):
+            reference = {"source_routine_id": data["source_routine_id"], "source_version": data.get("source_version")}
+            return data, reference, self.resolve_snapshot(db, data) or {}
+        if data.get("snapshot") is None:
+            data = self.rebuild_snapshot(db, id)
+        snapshot = data["snapshot"]
+        return data, {"source_routine_id": id, "source_version": snapshot["version"]}, snapshot
+
+    def materialize(self, db: firestore.Client, id: str) -> Optional[Dict[str, Any]]:
+        """
+        Turn an import into a regular routine (own rows and snapshot) before it
+        is edited. Returns the routine data; regular routines are returned as is.
+        """
+        ref = db.collection(self.collection_name).document(id)
+        while True:
+            doc = ref.get()
+            if not doc.exists:
+                return None
+            data = doc.to_dict()
+            if data.get("snapshot") is not None or not data.get("source_routine_id"):
+                return data
+
+            source_snapshot = self.resolve_snapshot(db, data) or {}
+            batch = db.batch()
+            rows, embedded = [], {}
+            for entry in flatten(source_snapshot, id):
+                if entry.get("exercise"):
+                    embedded[entry["exercise_id"]] = entry["exercise"]
+                row = {k: v for k, v in entry.items() if k not in ("id", "exercise")}
+                row_ref = db.collection("routine_exercises").document()
+                batch.set(row_ref, row)
+                rows.append(dict(row, id=row_ref.id))
+            fields = self.snapshot_fields(db, rows, version=1, exercises=embedded)
+            fields.update({"source_routine_id": firestore.DELETE_FIELD, "source_version": firestore.DELETE_FIELD})
+            batch.update(ref, fields, option=db.write_option(last_update_time=doc.update_time))
+            try:
+                batch.commit()
+            except FailedPrecondition:
+                # Changed meanwhile (possibly materialized by another request); look again
+                continue
+            data.update(fields)
+            data.pop("source_routine_id")
+            data.pop("source_version")
+            return data
+
+    # --- Partial edits ---
+
+    def patch(
+        self,
+        db: firestore.Client,
+        id: str,
+        ops: List[Dict[str, Any]],
+        fields: Optional[Dict[str, Any]] = None,
+        expected_version: Optional[int] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Apply edit ops (see app/core/routine_snapshot.apply_ops) and plain
+        routine `fields` in one batch. Only the routine_exercises rows the ops
+        touch are written, and the new snapshot is derived from the stored one,
+        reading the catalog only for exercises the routine did not use yet.
+
+        The routine update is conditional on it being unchanged since read, so
+        a concurrent edit makes the ops apply again on top of it. Raises
+        FailedPrecondition if `expected_version` is given and no longer
+        current, ValueError on invalid ops. Returns the routine data, or None
+        if it does not exist.
+        """
+        ref = db.collection(self.collection_name).document(id)
+        rows_ref = db.collection("routine_exercises")
+        if self.materialize(db, id) is None:
+            return None
+        while True:
+            doc = ref.get()
+            if not doc.exists:
+                return None
+            data = doc.to_dict()
+            if data.get("snapshot") is None:
+                # Created before snapshots existed: build it, then edit on top
+                self.rebuild_snapshot(db, id)
+                continue
+            snapshot = data["snapshot"]
+            if expected_version is not None and snapshot.get("version") != expected_version:
+                raise FailedPrecondition(f"Routine is at version {snapshot.get('version')}, not {expected_version}")
+
+            rows, changed, removed = apply_ops(snapshot, ops, lambda: rows_ref.document().id)
+            update = dict(fields or {})
+            batch = db.batch()
+            if changed or removed:
+                exercises = {
+                    entry["exercise_id"]: entry["exercise"]
+                    for entry in flatten(snapshot, id) if entry.get("exercise")
+                }
+                new_ids = {rows[row_id]["exercise_id"] for row_id in changed} - set(exercises)
+                exercises.update(self.exercise_docs(db, new_ids))
+                unknown = new_ids - set(exercises)
+                if unknown:
+                    raise ValueError(f"Unknown exercise: {', '.join(sorted(unknown))}")
+
+                self.archive_snapshot(db, batch, id, snapshot)
+                for row_id in removed:
+                    batch.delete(rows_ref.document(row_id))
+                for row_id in changed:
+                    row = {k: v for k, v in rows[row_id].items() if k != "id"}
+                    batch.set(rows_ref.document(row_id), dict(row, routine_id=id))
+                update.update(self.snapshot_fields(db, list(rows.values()), snapshot.get("version", 0) + 1, exercises))
+            if not update:
+                return data
+            batch.update(ref, update, option=db.write_option(last_update_time=doc.update_time))
+            try:
+                batch.commit()
+            except FailedPrecondition:
+                continue
+            data.update(update)
+            return data
+
     def get_with_exercises(self, db: firestore.Client, id: str) -> Union[Dict, None]:
-        routine = self.get(db, id=id)
-        if not routine:
+        """
+        Routine with its exercises from a single document read (two for a
+        copy-on-write import). Routines created before snapshots existed get
+        theirs built on first read.
+        """
+        doc = db.collection(self.collection_name).document(id).get()
+        if not doc.exists:
             return None
-        
-        # Fetch exercises
-        exercises_ref = db.collection("routine_exercises").where("routine_id", "==", id).stream()
-        exercises = []
-        for doc in exercises_ref:
-            ex_data = doc.to_dict()
-            ex_data["id"] = doc.id
-            
-            # Fetch the actual Exercise details
-            if "exercise_id" in ex_data:
-                ex_doc = db.collection("exercises").document(ex_data["exercise_id"]).get()
-                if ex_doc.exists:
-                    full_ex = ex_doc.to_dict()
-                    full_ex["id"] = ex_doc.id
-                    ex_data["exercise"] = full_ex
-                else:
-                    ex_data["exercise"] = None
-            
-            exercises.append(ex_data)
-            
-        if hasattr(routine, "model_dump"):
-            routine_dict = routine.model_dump()
-        else:
-            routine_dict = dict(routine)
-            
-        routine_dict["exercises"] = exercises
-        return routine_dict
+        data = doc.to_dict()
+        if data.get("snapshot") is None and data.get("source_routine_id"):
+            return self.detail(id, dict(data, snapshot=self.resolve_snapshot(db, data) or {}), own_snapshot=False)
+        if data.get("snapshot") is None:
+            data = self.rebuild_snapshot(db, id)
+            if data is None:
+                return None
+        return self.detail(id, data)
+
+    def refresh_exercise(self, db: firestore.Client, exercise_id: str, exercise: Optional[Dict[str, Any]]) -> int:
+        """
+        Patch the embedded copies of a catalog exercise in every routine using it.
+        Patches are committed in batches of REFRESH_BATCH_SIZE, each conditional
+        on its routine being unchanged since it was read. A batch that fails a
+        precondition is retried one routine at a time, rebuilding the routines
+        changed meanwhile. Returns the number of routines touched.
+        """
+        docs = db.collection(self.collection_name)\
+                 .where(filter=firestore.FieldFilter("exercise_ids", "array_contains", exercise_id))\
+                 .select(["snapshot", "is_public"])\
+                 .stream()
+        pending: List[Tuple[Any, Dict[str, Any]]] = []
+        touched = 0
+        for doc in docs:
+            snapshot = doc.to_dict().get("snapshot")
+            if not snapshot or not patch_exercise(snapshot, exercise_id, exercise):
+                continue
+            pending.append((doc, snapshot))
+            touched += 1
+            if len(pending) == REFRESH_BATCH_SIZE:
+                self._write_snapshots(db, pending)
+                pending = []
+        if pending:
+            self._write_snapshots(db, pending)
+        return touched
+
+    def _write_snapshots(self, db: firestore.Client, pending: List[Tuple[Any, Dict[str, Any]]]) -> None:
+        # Imported here because routine_similarity imports this module
+        from app.services.routine_similarity import routine_similarity
+
+        batch = db.batch()
+        for doc, snapshot in pending:
+            batch.update(doc.reference, {"snapshot": snapshot}, option=db.write_option(last_update_time=doc.update_time))
+        try:
+            batch.commit()
+            written = [(doc.id, dict(doc.to_dict(), snapshot=snapshot)) for doc, snapshot in pending]
+        except FailedPrecondition:
+            # The batch is all-or-nothing: find the routines that changed
+            written = []
+            for doc, snapshot in pending:
+                try:
+                    doc.reference.update({"snapshot": snapshot}, option=db.write_option(last_update_time=doc.update_time))
+                    written.append((doc.id, dict(doc.to_dict(), snapshot=snapshot)))
+                except FailedPrecondition:
+                    data = self.rebuild_snapshot(db, doc.id)
+                    if data is not None:
+                        written.append((doc.id, data))
+        # The exercise's muscle group is part of the routines' similarity vectors
+        for routine_id, data in written:
+            routine_similarity.update(routine_id, data)
 
     def get_multi_with_exercises(self, db: firestore.Client, *, creator_id: str = None, skip: int = 0, limit: int = 100) -> List[Dict]:
         docs_collection = {}
@@ -74,17 +355,25 @@ class CRUDRoutine(CRUDBase[Routine, RoutineCreate, RoutineUpdate]):
         sorted_docs = sorted(docs_collection.items(), key=lambda x: str(x[1].get("created_at", "")), reverse=True)
         paginated = sorted_docs[skip : skip + limit]
         
-        routines = [self.model(id=item[0], **item[1]) for item in paginated]
-
         results = []
         routine_map = {}
         routine_ids = []
+        # Imports of the same source/version resolve once per call
+        sources: Dict[Tuple[str, Any], Optional[Dict[str, Any]]] = {}
 
-        for routine in routines:
-            if hasattr(routine, "model_dump"):
-                r_dict = routine.model_dump()
-            else:
-                r_dict = dict(routine)
+        for doc_id, data in paginated:
+            if data.get("snapshot") is not None:
+                # Denormalized: nothing else to read
+                results.append(self.detail(doc_id, data))
+                continue
+            if data.get("source_routine_id"):
+                # Copy-on-write import: hydrated from its source
+                key = (data["source_routine_id"], data.get("source_version"))
+                if key not in sources:
+                    sources[key] = self.resolve_snapshot(db, data)
+                results.append(self.detail(doc_id, dict(data, snapshot=sources[key] or {}), own_snapshot=False))
+                continue
+            r_dict = self.model(id=doc_id, **data).model_dump()
             r_dict["exercises"] = [] # Initialize
             results.append(r_dict)
             routine_map[r_dict["id"]] = r_dict
@@ -0,0 +1,128 @@
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+from google.cloud import firestore
+from google.cloud.firestore import FieldFilter
+
+from app.core.similarity import SimilarityIndex, routine_vector
+from app.services.routine import routine as crud_routine
+
+# Score from which a public routine is reported as a duplicate
+DUPLICATE_THRESHOLD = 0.98
+# Public routines created or deleted through other workers are picked up by
+# reloading the whole index this often
+INDEX_MAX_AGE_SECONDS = 3600
+# Fields read per public routine when loading the index
+INDEX_FIELDS = ["snapshot"]
+# Fields returned per similar routine
+SUMMARY_FIELDS = ["name", "description", "creator_id", "average_rating", "rating_count"]
+
+
+class RoutineSimilarityService:
+    """
+    "Similar routines" and duplicate detection over public routines, served
+    from an in-memory SimilarityIndex (app/core/similarity.py) built from the
+    routines' snapshots, so a query never scans routines.
+
+    This worker's creates, edits and deletes update the index directly; the
+    rest arrive through the periodic reload.
+    """
+    def __init__(self):
+        self._index: Optional[SimilarityIndex] = None
+        self._loaded_at = 0.0
+        # Guards the index; Firestore loads run outside it, serialized by _refresh_lock
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        # Changes applied while a load is in progress, replayed onto the loaded index
+        self._changes: Optional[List[Tuple[str, Optional[Dict[str, float]]]]] = None
+
+    def index(self, db: firestore.Client) -> SimilarityIndex:
+        with self._lock:
+            index, loaded_at = self._index, self._loaded_at
+        if index is None:
+            # First use: callers wait for the one load in progress
+            with self._refresh_lock:
+                with self._lock:
+                    index = self._index
+                if index is None:
+                    index = self._reload(db)
+        elif time.monotonic() - loaded_at >= INDEX_MAX_AGE_SECONDS and self._refresh_lock.acquire(blocking=False):
+            # Others keep querying the current index while one caller reloads
+            try:
+                with self._lock:
+                    stale = self._loaded_at == loaded_at
+                index = self._reload(db) if stale else self._index
+            finally:
+                self._refresh_lock.release()
+        return index
+
+    def _reload(self, db: firestore.Client) -> SimilarityIndex:
+        # Caller holds _refresh_lock
+        with self._lock:
+            self._changes = []
+        try:
+            index = self._load(db)
+            with self._lock:
+                for routine_id, vector in self._changes:
+                    self._apply(index, routine_id, vector)
+                self._index = index
+                self._loaded_at = time.monotonic()
+        finally:
+            with self._lock:
+                self._changes = None
+        return index
+
+    def _load(self, db: firestore.Client) -> SimilarityIndex:
+        index = SimilarityIndex()
+        docs = db.collection(crud_routine.collection_name)\
+                 .where(filter=FieldFilter("is_public", "==", True))\
+                 .select(INDEX_FIELDS)\
+                 .stream()
+        # Imports are private, so every public routine has its own snapshot;
+        # ones created before snapshots existed join once a read builds it
+        index.load((doc.id, routine_vector(doc.to_dict().get("snapshot"))) for doc in docs)
+        return index
+
+    def _apply(self, index: SimilarityIndex, routine_id: str, vector: Optional[Dict[str, float]]) -> None:
+        # Caller holds _lock
+        if vector is None:
+            index.remove(routine_id)
+        else:
+            index.add(routine_id, vector)
+
+    def _change(self, routine_id: str, vector: Optional[Dict[str, float]]) -> None:
+        with self._lock:
+            if self._changes is not None:
+                self._changes.append((routine_id, vector))
+            if self._index is not None:
+                self._apply(self._index, routine_id, vector)
+
+    def update(self, routine_id: str, data: Dict[str, Any]) -> None:
+        """
+        Apply a routine's stored data after a create or edit. A no-op until
+        the index has been loaded.
+        """
+        public = data.get("is_public") and data.get("snapshot") is not None
+        self._change(routine_id, routine_vector(data["snapshot"]) if public else None)
+
+    def remove(self, routine_id: str) -> None:
+        self._change(routine_id, None)
+
+    def similar(self, db: firestore.Client, routine_id: str, snapshot: Optional[Dict[str, Any]], limit: int = 10) -> List[Dict[str, Any]]:
+        """
+        Public routines most similar to `snapshot` (that of routine `routine_id`,
+        which is itself excluded), best first.
+        """
+        index = self.index(db)
+        with self._lock:
+            matches = index.top_k(routine_vector(snapshot), limit, exclude=(routine_id,))
+        if not matches:
+            return []
+        refs = [db.collection(crud_routine.collection_name).document(match_id) for match_id, _ in matches]
+        docs = {doc.id: doc.to_dict() for doc in db.get_all(refs, field_paths=SUMMARY_FIELDS) if doc.exists}
+        return [
+            dict(docs[match_id], id=match_id, score=score, duplicate=score >= DUPLICATE_THRESHOLD)
+            for match_id, score in matches if match_id in docs
+        ]
+
+routine_similarity = RoutineSimilarityService()
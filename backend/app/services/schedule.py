@@ -0,0 +1,125 @@
+import heapq
+from datetime import date
+from itertools import islice
+from typing import List, Optional, Tuple
+from google.api_core.exceptions import AlreadyExists
+from google.cloud import firestore
+from google.cloud.firestore import FieldFilter
+
+from app.core.schedule import expand, occurrence_id, occurs_on, parse_occurrence_id
+from app.schemas.tracking import ScheduledWorkout, ScheduleRule, ScheduleRuleCreate
+from app.services.base import CRUDBase
+from app.services.routine import routine as crud_routine
+from app.services.summary import daily_summary
+from app.services.tracking import scheduled_workout as crud_sw
+
+
+class CRUDScheduleRule(CRUDBase[ScheduleRule, ScheduleRuleCreate, ScheduleRuleCreate]):
+    """
+    Recurring schedules (app/core/schedule.py). Creating a plan is one write;
+    its occurrences are merged into calendar and date-range reads as virtual
+    workouts and only become scheduled_workouts documents when the user
+    starts or edits one (`materialize`).
+    """
+    def routine_weekdays(self, db: firestore.Client, routine_id: str) -> List[int]:
+        """
+        Days of the routine's snapshot that have exercises. Imports resolve
+        to their source's snapshot; routines without one get it built.
+        """
+        doc = db.collection(crud_routine.collection_name).document(routine_id).get()
+        if not doc.exists:
+            return []
+        data = doc.to_dict()
+        if data.get("snapshot") is None and not data.get("source_routine_id"):
+            data = crud_routine.rebuild_snapshot(db, routine_id) or {}
+        snapshot = crud_routine.resolve_snapshot(db, data) or {}
+        return sorted({day["day_of_week"] for day in snapshot.get("days", []) if day.get("day_of_week") and day["exercises"]})
+
+    def get_by_user(self, db: firestore.Client, user_id: str) -> List[ScheduleRule]:
+        docs = db.collection(self.collection_name).where(filter=FieldFilter("user_id", "==", user_id)).stream()
+        rules = [self._from_doc(doc.id, doc.to_dict()) for doc in docs]
+        rules.sort(key=lambda r: r.start_date)
+        return rules
+
+    def _virtual(self, rule: ScheduleRule, day: date) -> ScheduledWorkout:
+        return ScheduledWorkout(
+            id=occurrence_id(rule.id, day),
+            user_id=rule.user_id,
+            routine_id=rule.routine_id,
+            scheduled_date=day,
+            status="pending",
+            created_at=rule.created_at,
+            schedule_rule_id=rule.id,
+        )
+
+    def occurrences(self, db: firestore.Client, user_id: str, start: date, end: date, limit: Optional[int] = None) -> List[ScheduledWorkout]:
+        """
+        Virtual workouts of every rule of the user within [start, end], oldest
+        first, stopping after `limit`. Callers drop the ones already
+        materialized (same id as a stored workout).
+        """
+        def days_of(rule: ScheduleRule):
+            for day in expand(rule.weekdays, rule.start_date, rule.end_date, start, end):
+                yield day, rule
+
+        # Each rule yields its days in order, so merging them lazily lets a
+        # limit stop the expansion early
+        merged = heapq.merge(*[days_of(rule) for rule in self.get_by_user(db, user_id)], key=lambda item: (item[0], item[1].id))
+        return [self._virtual(rule, day) for day, rule in islice(merged, limit)]
+
+    def _lookup(self, db: firestore.Client, workout_id: str) -> Tuple[Optional[ScheduledWorkout], bool]:
+        """(workout, stored): the stored workout, else the virtual occurrence behind `workout_id`."""
+        workout = crud_sw.get(db, id=workout_id)
+        if workout is not None:
+            return workout, True
+        parsed = parse_occurrence_id(workout_id)
+        if parsed is None:
+            return None, False
+        rule_id, day = parsed
+        rule = self.get(db, id=rule_id)
+        if rule is None or not occurs_on(rule.weekdays, rule.start_date, rule.end_date, day):
+            return None, False
+        return self._virtual(rule, day), False
+
+    def resolve(self, db: firestore.Client, workout_id: str) -> Optional[ScheduledWorkout]:
+        """
+        The stored workout, or the virtual occurrence behind `workout_id`. Never writes.
+        """
+        return self._lookup(db, workout_id)[0]
+
+    def materialize(self, db: firestore.Client, workout_id: str, user_id: Optional[str] = None) -> Optional[ScheduledWorkout]:
+        """
+        Like `resolve`, but a virtual occurrence is stored first (under its
+        occurrence id, so concurrent calls create it once) and registered in
+        the day's summary like any newly scheduled workout. With `user_id`,
+        another user's workout is treated as missing and never stored.
+        """
+        workout, stored = self._lookup(db, workout_id)
+        if workout is None or (user_id is not None and workout.user_id != user_id):
+            return None
+        if stored:
+            return workout
+        doc_data = crud_sw.build_document({
+            "user_id": workout.user_id,
+            "routine_id": workout.routine_id,
+            "scheduled_date": workout.scheduled_date,
+            "status": workout.status,
+            "schedule_rule_id": workout.schedule_rule_id,
+            "logs": [],
+        })
+        try:
+            db.collection(crud_sw.collection_name).document(workout_id).create(doc_data)
+        except AlreadyExists:
+            return crud_sw.get(db, id=workout_id)
+
+        routine = crud_routine.get(db, id=workout.routine_id)
+        daily_summary.record_workout(
+            db,
+            user_id=workout.user_id,
+            date_str=workout.scheduled_date.isoformat(),
+            routine_id=workout.routine_id,
+            routine_name=routine.name if routine else None,
+        )
+        return crud_sw._from_doc(workout_id, dict(doc_data))
+
+schedule_rule = CRUDScheduleRule("schedule_rules", ScheduleRule)
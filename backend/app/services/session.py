@@ -0,0 +1,194 @@
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+from google.cloud import firestore
+
+from app.core.concurrency import run_parallel
+from app.core.achievements import WORKOUT_LOGGED
+from app.core.challenges import session_volume
+from app.core.gamification import calculate_level, level_bounds
+from app.schemas.tracking import WorkoutSessionLog
+from app.schemas.user import User
+from app.services.achievements import achievements
+from app.services.activity import activity
+from app.services.challenges import challenges
+from app.services.exercise_history import exercise_history
+from app.services.records import MAX_RECORD_ATTEMPTS, RecordConflict, personal_records
+from app.services.routine import routine as crud_routine
+from app.services.social import content_rating as crud_rating
+from app.services.streaks import streaks
+from app.services.summary import daily_summary
+from app.services.tracking import scheduled_workout as crud_sw
+from app.services.xp import xp_ledger
+
+def session_xp(calories_burned: Optional[float]) -> int:
+    return int(calories_burned / 2) if calories_burned else 50
+
+
+def add_awards_to_batch(
+    db: firestore.Client,
+    batch: firestore.WriteBatch,
+    user_id: str,
+    day: date,
+    logs: List[Dict[str, Any]],
+    calories_burned: Optional[float],
+    workout_id: str,
+) -> Dict[str, Any]:
+    """
+    Queue the XP, achievement counters and challenge counters of a completed
+    workout on the caller's batch. Pass the return value and the commit
+    results to `apply_awards`.
+    """
+    xp_gained = session_xp(calories_burned)
+    return {
+        "user_id": user_id,
+        "xp_gained": xp_gained,
+        # Ledger event + Increment, so concurrent sessions never lose XP
+        "xp_index": xp_ledger.add_to_batch(db, batch, user_id, xp_gained, "workout_session", ref_id=workout_id),
+        # Evaluated from the commit results, no history reads
+        "achievement_event": achievements.add_to_batch(db, batch, WORKOUT_LOGGED, user_id, logs=logs),
+        "challenge_counters": challenges.add_to_batch(
+            db, batch, user_id, day,
+            volume_kg=session_volume(logs),
+            calories=calories_burned,
+        ),
+    }
+
+
+def apply_awards(db: firestore.Client, pending: Optional[Dict[str, Any]], write_results: Any, current_xp: int) -> Dict[str, Any]:
+    """
+    Read the awards queued by `add_awards_to_batch` back from the commit
+    results (`pending` is None when nothing was awarded). Returns the XP,
+    level and achievement fields of a completion response.
+    """
+    if pending is None:
+        xp_gained, new_total_xp, unlocked = 0, current_xp, []
+    else:
+        user_id, xp_gained = pending["user_id"], pending["xp_gained"]
+        # Exact post-increment total from the commit; the stored level is synced on threshold crossings
+        new_total_xp = xp_ledger.apply_result(db, user_id, xp_gained, write_results, pending["xp_index"], current_xp + xp_gained)
+        unlocked = achievements.apply_result(db, pending["achievement_event"], write_results)
+        challenges.apply_result(pending["challenge_counters"], write_results)
+
+    old_level = calculate_level(new_total_xp - xp_gained)
+    new_level = calculate_level(new_total_xp)
+    prev_level_xp, next_level_xp = level_bounds(new_level)
+    return {
+        "xp_gained": xp_gained,
+        "new_total_xp": new_total_xp,
+        "new_level": new_level,
+        "level_up": new_level > old_level,
+        "prev_level_xp": prev_level_xp,
+        "next_level_xp": next_level_xp,
+        "achievements": unlocked,
+    }
+
+
+def log_workout_session(db: firestore.Client, user: User, session_in: WorkoutSessionLog) -> Dict[str, Any]:
+    """
+    Persist a finished session: the workout, the routine rating, XP, streak,
+    achievement and challenge counters, personal records, the per-exercise
+    history, the activity heatmap and the daily summary.
+
+    The independent reads (existing rating, routine, today's summary, the
+    records of the exercises done, this year's heatmap) run concurrently, then every write goes out
+    in a single WriteBatch, so the whole thing costs one parallel read round
+    plus one commit. The batch is only rebuilt if a concurrent session moved
+    one of the records or the heatmap in between.
+    """
+    today = date.today().isoformat()
+    logs = [{"exercise_id": log.exercise_id, "reps": log.reps, "weight_kg": log.weight_kg} for log in session_in.logs]
+    exercise_ids = {log["exercise_id"] for log in logs}
+
+    # 1. Independent reads, concurrently
+    existing_rating, routine, summary, records, activity_snapshot = run_parallel(
+        lambda: crud_rating.get_by_rater_and_content(
+            db,
+            rater_id=user.id,
+            content_type='routine',
+            content_id=session_in.routine_id
+        ),
+        lambda: crud_routine.get(db, id=session_in.routine_id),
+        lambda: daily_summary.get(db, user.id, today),
+        lambda: personal_records.lookup(db, user.id, exercise_ids),
+        lambda: activity.lookup(db, user.id, date.fromisoformat(today)),
+    )
+
+    # 2. ScheduledWorkout
+    workout_data = {
+        "user_id": user.id,
+        "routine_id": session_in.routine_id,
+        "scheduled_date": today,
+        "status": 'completed',
+        "notes": f"Difficulty: {session_in.difficulty}, Rating: {session_in.rating}/5. Notes: {session_in.notes or ''}",
+        "duration_seconds": session_in.duration_seconds,
+        "calories_burned": session_in.calories_burned,
+        "created_at": datetime.utcnow().isoformat(),
+        "logs": [crud_sw.build_log(log_item) for log_item in session_in.logs]
+    }
+    workout_ref = db.collection(crud_sw.collection_name).document()
+    workout_doc = crud_sw.build_document(workout_data)
+
+    for attempt in range(MAX_RECORD_ATTEMPTS):
+        batch = db.batch()
+        batch.set(workout_ref, workout_doc)
+
+        # 3. Add or Update Rating
+        ratings_ref = db.collection(crud_rating.collection_name)
+        if existing_rating:
+            batch.update(ratings_ref.document(existing_rating.id), {"score": session_in.rating})
+        else:
+            batch.set(ratings_ref.document(), {
+                "rater_id": user.id,
+                "content_type": 'routine',
+                "content_id": session_in.routine_id,
+                "score": session_in.rating,
+                "created_at": datetime.utcnow(),
+            })
+
+        # 4. Gamification: XP, achievement and weekly/monthly challenge counters
+        awards = add_awards_to_batch(
+            db, batch, user.id, date.fromisoformat(today), logs,
+            session_in.calories_burned, workout_ref.id,
+        )
+
+        # 5. Streak (advanced from the state loaded with the user, O(1))
+        streaks.add_to_batch(db, batch, user, date.fromisoformat(today))
+
+        # 6. Dashboard summary
+        daily_summary.add_workout_to_batch(
+            db, batch, summary,
+            user_id=user.id,
+            date_str=today,
+            routine_id=session_in.routine_id,
+            routine_name=routine.name if routine else None,
+            completed=True,
+            calories_burned=session_in.calories_burned,
+            duration_seconds=session_in.duration_seconds,
+        )
+
+        # 7. Personal records (compare-and-set against the snapshots read above)
+        broken_records = personal_records.add_to_batch(db, batch, user.id, logs, records, today, workout_ref.id)
+
+        # 8. Per-exercise history for "last time you did this"
+        exercise_history.add_to_batch(db, batch, user.id, workout_ref.id, workout_data["logs"], today)
+
+        # 9. Profile heatmap (compare-and-set, like the records)
+        activity.add_to_batch(db, batch, activity_snapshot, user.id, date.fromisoformat(today))
+
+        try:
+            write_results = batch.commit()
+            break
+        except RecordConflict:
+            # Another session moved a record or the heatmap; nothing was written, so re-read and rebuild
+            if attempt == MAX_RECORD_ATTEMPTS - 1:
+                raise
+            records, activity_snapshot = run_parallel(
+                lambda: personal_records.lookup(db, user.id, exercise_ids),
+                lambda: activity.lookup(db, user.id, date.fromisoformat(today)),
+            )
+
+    return {
+        "workout": crud_sw._from_doc(workout_ref.id, dict(workout_doc)),
+        **apply_awards(db, awards, write_results, user.xp or 0),
+        "personal_records": broken_records,
+    }
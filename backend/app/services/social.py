@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Optional, Set
 from google.cloud import firestore
 from google.cloud.firestore import FieldFilter
 from app.services.base import CRUDBase
@@ -16,4 +16,18 @@ class CRUDContentRating(CRUDBase[ContentRating, ContentRatingCreate, ContentRati
             return self.model(id=doc.id, **doc.to_dict())
         return None
 
+def get_mutual_follow_ids(db: firestore.Client, user_id: str) -> Set[str]:
+    """
+    Ids of users that follow `user_id` and are followed back (the feed's "friends").
+    Only the id fields are read from the follows documents.
+    """
+    follows = db.collection("follows")
+    following = follows.where(filter=FieldFilter("follower_id", "==", user_id)).select(["following_id"]).stream()
+    following_ids = {d.get("following_id") for d in following}
+    if not following_ids:
+        return set()
+    followers = follows.where(filter=FieldFilter("following_id", "==", user_id)).select(["follower_id"]).stream()
+    follower_ids = {d.get("follower_id") for d in followers}
+    return following_ids & follower_ids
+
 content_rating = CRUDContentRating("content_ratings", ContentRating)
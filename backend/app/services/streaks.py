@@ -0,0 +1,45 @@
+from datetime import date
+from typing import Any, Dict, Optional
+from google.cloud import firestore
+
+from app.core.streaks import advance_streak
+from app.schemas.user import User
+from app.services.user import user as crud_user
+
+
+class StreakService:
+    """
+    Current/longest workout streaks (days and weeks) stored in the user's
+    `streak` map and advanced in O(1) on every completed workout.
+    """
+    def add_to_batch(self, db: firestore.Client, batch: firestore.WriteBatch, user: User, day: date) -> Optional[Dict[str, Any]]:
+        """
+        Advance from the streak loaded with `user` as part of the caller's batch.
+        Returns the new streak, or None if it did not change.
+        """
+        streak = advance_streak(user.streak, day)
+        if streak is not None:
+            batch.update(db.collection(crud_user.collection_name).document(user.id), {"streak": streak})
+            crud_user.bump_cache_version(db, user.id, "dashboard", batch=batch)
+        return streak
+
+    def record(self, db: firestore.Client, user_id: str, day: date) -> Optional[Dict[str, Any]]:
+        """
+        Advance the stored streak in a transaction (when the user is not at hand).
+        """
+        ref = db.collection(crud_user.collection_name).document(user_id)
+
+        @firestore.transactional
+        def _record(transaction) -> Optional[Dict[str, Any]]:
+            snapshot = ref.get(transaction=transaction)
+            if not snapshot.exists:
+                return None
+            streak = advance_streak(snapshot.to_dict().get("streak"), day)
+            if streak is not None:
+                transaction.update(ref, {"streak": streak})
+                crud_user.bump_cache_version(db, user_id, "dashboard", batch=transaction)
+            return streak
+
+        return _record(db.transaction())
+
+streaks = StreakService()
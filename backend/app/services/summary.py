@@ -0,0 +1,187 @@
+from typing import Any, Dict, Optional
+from google.cloud import firestore
+
+from app.schemas.tracking import ScheduledWorkout
+from app.services.user import user as crud_user
+
+# Defaults used when a completed workout has no stats of its own
+DEFAULT_WORKOUT_CALORIES = 300
+DEFAULT_WORKOUT_SECONDS = 45 * 60
+DEFAULT_MISSION_MINUTES = 45
+
+
+class DailySummaryService:
+    """
+    One document per user and day (daily_summary/{user_id}_{YYYY-MM-DD}) holding
+    everything the dashboard shows, so opening the app is a single point read.
+    Kept up to date by the tracking endpoints whenever a workout is scheduled,
+    completed or edited; app/jobs/backfill_daily_summary.py rebuilds the counters.
+    """
+    def __init__(self, collection_name: str = "daily_summary"):
+        self.collection_name = collection_name
+
+    def doc_ref(self, db: firestore.Client, user_id: str, date_str: str):
+        return db.collection(self.collection_name).document(f"{user_id}_{date_str}")
+
+    def get(self, db: firestore.Client, user_id: str, date_str: str) -> Optional[Dict[str, Any]]:
+        doc = self.doc_ref(db, user_id, date_str).get()
+        return doc.to_dict() if doc.exists else None
+
+    def _scopes(self, completed: bool) -> tuple:
+        # A completed workout also changes the user's training analytics
+        return ("dashboard", "analytics") if completed else ("dashboard",)
+
+    def completion_amounts(self, calories_burned: Optional[float], duration_seconds: Optional[int], has_routine: bool) -> Dict[str, int]:
+        """
+        What one completed workout adds to its day (same defaults the dashboard always applied).
+        """
+        cals = calories_burned or 0
+        dur_sec = duration_seconds or 0
+        if cals == 0 and has_routine:
+            cals = DEFAULT_WORKOUT_CALORIES
+            if dur_sec == 0:
+                dur_sec = DEFAULT_WORKOUT_SECONDS
+        return {
+            "calories_burned": int(cals),
+            "time_minutes": int(dur_sec / 60),
+            "completed_count": 1,
+        }
+
+    def completion_fields(self, calories_burned: Optional[float], duration_seconds: Optional[int], has_routine: bool) -> Dict[str, Any]:
+        """
+        Increments for one completed workout.
+        """
+        amounts = self.completion_amounts(calories_burned, duration_seconds, has_routine)
+        return {field: firestore.Increment(amount) for field, amount in amounts.items()}
+
+    def contribution(self, status: Optional[str], calories_burned: Optional[float], duration_seconds: Optional[int], has_routine: bool) -> Dict[str, int]:
+        """
+        Counters one stored workout adds to the summary of its day.
+        """
+        amounts = {"workout_count": 1}
+        if status == "completed":
+            amounts.update(self.completion_amounts(calories_burned, duration_seconds, has_routine))
+        return amounts
+
+    def workout_fields(
+        self,
+        *,
+        user_id: str,
+        date_str: str,
+        routine_id: Optional[str] = None,
+        routine_name: Optional[str] = None,
+        completed: bool = False,
+        calories_burned: Optional[float] = None,
+        duration_seconds: Optional[int] = None,
+        set_mission: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Merge-set payload registering one workout of the day.
+        """
+        data: Dict[str, Any] = {
+            "user_id": user_id,
+            "date": date_str,
+            "workout_count": firestore.Increment(1),
+        }
+        if completed:
+            data.update(self.completion_fields(calories_burned, duration_seconds, bool(routine_id)))
+        if set_mission:
+            data.update({
+                "mission_set": True,
+                "mission_routine_id": routine_id,
+                "mission_name": routine_name if routine_id else "Entrenamiento Personalizado",
+                "mission_duration": DEFAULT_MISSION_MINUTES if routine_name else 0,
+            })
+        return data
+
+    def add_workout_to_batch(self, db: firestore.Client, batch: firestore.WriteBatch, summary: Optional[Dict[str, Any]], **fields: Any) -> None:
+        """
+        Same as `record_workout` but as part of the caller's batch.
+        `summary` is the day's summary as read beforehand (None if missing), used to decide the mission.
+        """
+        set_mission = not (summary and summary.get("mission_set"))
+        data = self.workout_fields(set_mission=set_mission, **fields)
+        batch.set(self.doc_ref(db, fields["user_id"], fields["date_str"]), data, merge=True)
+        crud_user.bump_cache_version(db, fields["user_id"], *self._scopes(fields.get("completed", False)), batch=batch)
+
+    def record_workout(
+        self,
+        db: firestore.Client,
+        *,
+        user_id: str,
+        date_str: str,
+        routine_id: Optional[str] = None,
+        routine_name: Optional[str] = None,
+        completed: bool = False,
+        calories_burned: Optional[float] = None,
+        duration_seconds: Optional[int] = None,
+    ) -> None:
+        """
+        Register a workout for the day. The first workout of the day becomes the mission;
+        completed workouts add their calories and minutes.
+        """
+        ref = self.doc_ref(db, user_id, date_str)
+
+        @firestore.transactional
+        def _record(transaction):
+            snapshot = ref.get(transaction=transaction)
+            data = self.workout_fields(
+                user_id=user_id,
+                date_str=date_str,
+                routine_id=routine_id,
+                routine_name=routine_name,
+                completed=completed,
+                calories_burned=calories_burned,
+                duration_seconds=duration_seconds,
+                set_mission=not (snapshot.exists and snapshot.to_dict().get("mission_set")),
+            )
+            transaction.set(ref, data, merge=True)
+            crud_user.bump_cache_version(db, user_id, *self._scopes(completed), batch=transaction)
+
+        _record(db.transaction())
+
+    def record_completion(
+        self,
+        db: firestore.Client,
+        *,
+        user_id: str,
+        date_str: str,
+        routine_id: Optional[str],
+        calories_burned: Optional[float],
+        duration_seconds: Optional[int],
+    ) -> None:
+        """
+        An existing workout of that day moved to 'completed'.
+        """
+        data = {"user_id": user_id, "date": date_str}
+        data.update(self.completion_fields(calories_burned, duration_seconds, bool(routine_id)))
+        batch = db.batch()
+        batch.set(self.doc_ref(db, user_id, date_str), data, merge=True)
+        crud_user.bump_cache_version(db, user_id, *self._scopes(True), batch=batch)
+        batch.commit()
+
+    def record_change(self, db: firestore.Client, before: ScheduledWorkout, after: ScheduledWorkout) -> None:
+        """
+        An existing workout was edited: take what it added off the day it was on
+        and add what it adds now to its (possibly new) day, in one batch.
+        Covers completing, un-completing and rescheduling. The day's mission is left as it is.
+        """
+        deltas: Dict[str, Dict[str, int]] = {}
+        for workout, sign in ((before, -1), (after, 1)):
+            day = deltas.setdefault(workout.scheduled_date.isoformat(), {})
+            amounts = self.contribution(workout.status, workout.calories_burned, workout.duration_seconds, bool(workout.routine_id))
+            for field, amount in amounts.items():
+                day[field] = day.get(field, 0) + sign * amount
+
+        batch = db.batch()
+        for date_str, fields in deltas.items():
+            increments = {field: firestore.Increment(amount) for field, amount in fields.items() if amount}
+            if increments:
+                batch.set(self.doc_ref(db, after.user_id, date_str), {"user_id": after.user_id, "date": date_str, **increments}, merge=True)
+        if not len(batch):
+            return
+        completed = "completed" in (before.status, after.status)
+        crud_user.bump_cache_version(db, after.user_id, *self._scopes(completed), batch=batch)
+        batch.commit()
+
+daily_summary = DailySummaryService()
@@ -1,22 +1,158 @@
-from typing import List
+import calendar
+import uuid
+from collections import defaultdict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Union
+from google.api_core.exceptions import NotFound
 from google.cloud import firestore
 from google.cloud.firestore import FieldFilter, Query
+from fastapi.encoders import jsonable_encoder
+from app.core.config import settings
+from app.core.workout_codec import encode_logs, decode_logs
 from app.services.base import CRUDBase
+from app.services.user import user as crud_user
 from app.schemas.tracking import ScheduledWorkout, ScheduledWorkoutCreate, ScheduledWorkoutUpdate, WorkoutLog, WorkoutLogCreate, WorkoutLogUpdate
 
 class CRUDScheduledWorkout(CRUDBase[ScheduledWorkout, ScheduledWorkoutCreate, ScheduledWorkoutUpdate]):
+    def _from_doc(self, doc_id: str, data: Dict[str, Any]) -> ScheduledWorkout:
+        # Columnar sets are decoded back into `logs`; sets appended later with
+        # ArrayUnion still live in the plain `logs` array and go after them
+        packed = data.pop("logs_packed", None)
+        if packed:
+            data["logs"] = decode_logs(packed, doc_id) + (data.get("logs") or [])
+        return super()._from_doc(doc_id, data)
+
+    def build_document(self, obj_in: Union[ScheduledWorkoutCreate, Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Document data as stored, honouring WORKOUT_LOG_ENCODING.
+        Lets callers add the workout to a batch instead of writing it directly.
+        """
+        doc_data = jsonable_encoder(obj_in)
+        if 'created_at' not in doc_data:
+            doc_data['created_at'] = datetime.utcnow()
+        if settings.WORKOUT_LOG_ENCODING == "columnar" and doc_data.get("logs"):
+            packed = encode_logs(doc_data["logs"])
+            if packed is not None:
+                # Packed bytes must bypass jsonable_encoder
+                doc_data["logs_packed"] = packed
+                del doc_data["logs"]
+        return doc_data
+
+    def create(self, db: firestore.Client, *, obj_in: Union[ScheduledWorkoutCreate, Dict[str, Any]]) -> ScheduledWorkout:
+        doc_data = self.build_document(obj_in)
+        _time, doc_ref = db.collection(self.collection_name).add(doc_data)
+        # Decode so the response carries the same log ids later reads will
+        return self._from_doc(doc_ref.id, dict(doc_data))
+
+    def update(self, db: firestore.Client, *, id: str, obj_in: Union[ScheduledWorkoutUpdate, Dict[str, Any]]) -> ScheduledWorkout:
+        # Dates are stored as ISO strings (as on create) so date-range queries match them
+        if not isinstance(obj_in, dict):
+            obj_in = obj_in.model_dump(mode="json", exclude_unset=True)
+        return super().update(db, id=id, obj_in=obj_in)
+
     def get_by_user(self, db: firestore.Client, user_id: str, skip: int = 0, limit: int = 100) -> List[ScheduledWorkout]:
-        # Firestore query
-        # Firestore query
-        docs = db.collection(self.collection_name)\
+        """
+        The user's workouts, newest scheduled_date first (composite index in firestore.indexes.json).
+        """
+        query = db.collection(self.collection_name)\
+                  .where(filter=FieldFilter("user_id", "==", user_id))\
+                  .order_by("scheduled_date", direction=Query.DESCENDING)
+        if skip:
+            query = query.offset(skip)
+        return [self._from_doc(doc.id, doc.to_dict()) for doc in query.limit(limit).stream()]
+
+    def date_range_query(self, db: firestore.Client, user_id: str, start: date, end: date):
+        """
+        Workouts scheduled between `start` and `end` (inclusive), oldest first.
+        """
+        return db.collection(self.collection_name)\
                  .where(filter=FieldFilter("user_id", "==", user_id))\
-                 .limit(limit)\
-                 .stream()
-        
-        results = [self.model(id=doc.id, **doc.to_dict()) for doc in docs]
-        # Sort in memory to avoid composite index requirement
-        results.sort(key=lambda x: x.scheduled_date, reverse=True)
-        return results
+                 .where(filter=FieldFilter("scheduled_date", ">=", start.isoformat()))\
+                 .where(filter=FieldFilter("scheduled_date", "<=", end.isoformat()))\
+                 .order_by("scheduled_date")
+
+    def get_by_date_range(self, db: firestore.Client, user_id: str, start: date, end: date, limit: int = 500) -> List[ScheduledWorkout]:
+        docs = self.date_range_query(db, user_id, start, end).limit(limit).stream()
+        return [self._from_doc(doc.id, doc.to_dict()) for doc in docs]
+
+    def get_month(
+        self,
+        db: firestore.Client,
+        user_id: str,
+        year: int,
+        month: int,
+        today: date,
+        virtual: Optional[Dict[str, date]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Compact per-day status of one calendar month, reading only that month's
+        workouts and only their date and status. `virtual` maps the ids of
+        not-yet-stored pending workouts (recurring schedules) to their day.
+        """
+        first = date(year, month, 1)
+        last = date(year, month, calendar.monthrange(year, month)[1])
+        docs = self.date_range_query(db, user_id, first, last).select(["scheduled_date", "status"]).stream()
+
+        totals: Dict[str, int] = defaultdict(int)
+        completed: Dict[str, int] = defaultdict(int)
+        stored = set()
+        for doc in docs:
+            stored.add(doc.id)
+            day = str(doc.get("scheduled_date"))[:10]
+            totals[day] += 1
+            if doc.get("status") == "completed":
+                completed[day] += 1
+        for workout_id, day in (virtual or {}).items():
+            if workout_id not in stored:
+                totals[day.isoformat()] += 1
+
+        days = []
+        for day in sorted(totals):
+            if completed[day] == totals[day]:
+                status = "completed"
+            elif completed[day]:
+                status = "partial"
+            elif day < today.isoformat():
+                status = "missed"
+            else:
+                status = "scheduled"
+            days.append({"date": day, "status": status, "total": totals[day], "completed": completed[day]})
+        return {"month": first.strftime("%Y-%m"), "days": days}
+
+    def build_log(self, log_in: WorkoutLogCreate, workout_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Embedded log entry with the pseudo id/timestamp the frontend expects.
+        """
+        log_data = log_in.model_dump()
+        log_data['id'] = str(uuid.uuid4())
+        if workout_id:
+            log_data['workout_id'] = workout_id
+        log_data['created_at'] = datetime.utcnow().isoformat()
+        return log_data
+
+    def append_logs(self, db: firestore.Client, workout_id: str, logs_in: List[WorkoutLogCreate], user_id: str) -> Optional[List[WorkoutLog]]:
+        """
+        Append sets to a workout of `user_id` with ArrayUnion: the payload is
+        only the new sets instead of the whole logs array, after a projection
+        read of the owner and status (not the logs). When the workout is
+        completed the same batch bumps the user's "analytics" cache version.
+        Returns None if the workout does not exist or belongs to someone else.
+        """
+        ref = db.collection(self.collection_name).document(workout_id)
+        doc = ref.get(field_paths=["user_id", "status"])
+        meta = doc.to_dict() if doc.exists else None
+        if not meta or meta.get("user_id") != user_id:
+            return None
+        logs_data = [self.build_log(log_in, workout_id) for log_in in logs_in]
+        batch = db.batch()
+        batch.update(ref, {"logs": firestore.ArrayUnion(logs_data)})
+        if meta.get("status") == "completed":
+            crud_user.bump_cache_version(db, user_id, "analytics", batch=batch)
+        try:
+            batch.commit()
+        except NotFound:
+            return None
+        return [WorkoutLog(**log_data) for log_data in logs_data]
 
 # Logs are embedded in ScheduledWorkout, so we might not need a separate CRUD for them 
 # unless we want to query logs across all workouts (which would require a collection group index).
@@ -66,4 +66,16 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             return None
         return user
 
+    def bump_cache_version(self, db: firestore.Client, user_id: str, *scopes: str, batch: Optional[firestore.WriteBatch] = None) -> None:
+        """
+        Increment the user's cache version counters (used to build ETags) for the given scopes.
+        Added to `batch` when given, otherwise written immediately.
+        """
+        ref = db.collection(self.collection_name).document(user_id)
+        data = {"cache_versions": {scope: firestore.Increment(1) for scope in scopes}}
+        if batch is not None:
+            batch.set(ref, data, merge=True)
+        else:
+            ref.set(data, merge=True)
+
 user = CRUDUser("users", User)
@@ -0,0 +1,120 @@
+from typing import Any, Dict, List, Optional
+from google.cloud import firestore
+
+from app.core.gamification import calculate_level, crosses_threshold, get_rank, level_matches
+from app.services.leaderboard import friends_leaderboard, leaderboard
+from app.services.user import user as crud_user
+
+
+def transform_number(value: Any) -> float:
+    """
+    The number in a transform result, whether the field holds an integer or a
+    double (XP written by older clients). Raises ValueError for anything else.
+    """
+    kind = type(value).pb(value).WhichOneof("value_type")
+    if kind not in ("integer_value", "double_value"):
+        raise ValueError(f"Transform result is not a number: {kind}")
+    return getattr(value, kind)
+
+
+class XPService:
+    """
+    Every XP award is an append-only event in users/{user_id}/xp_events and an
+    Increment on users/{user_id}.xp, written together. There is no read before
+    the write, so concurrent sessions never lose XP.
+
+    The stored `level` and `rank` only change when an award crosses a level
+    threshold; the dashboard reads them as they are.
+    """
+    def __init__(self, parent_collection: str = "users", collection_name: str = "xp_events"):
+        self.parent_collection = parent_collection
+        self.collection_name = collection_name
+
+    def events_ref(self, db: firestore.Client, user_id: str):
+        return db.collection(self.parent_collection).document(user_id).collection(self.collection_name)
+
+    def add_to_batch(
+        self,
+        db: firestore.Client,
+        batch: firestore.WriteBatch,
+        user_id: str,
+        amount: int,
+        source: str,
+        ref_id: Optional[str] = None,
+    ) -> int:
+        """
+        Queue the ledger event and the XP increment on the caller's batch.
+        Returns the position of the increment in the batch, to be passed to
+        `apply_result` with the batch's commit results.
+        """
+        batch.set(self.events_ref(db, user_id).document(), {
+            "amount": amount,
+            "source": source,
+            "ref_id": ref_id,
+            # Commit time on the server, which the leaderboard catch-up relies on
+            "created_at": firestore.SERVER_TIMESTAMP,
+        })
+        index = len(batch)
+        batch.update(db.collection(self.parent_collection).document(user_id), {"xp": firestore.Increment(amount)})
+        return index
+
+    def apply_result(
+        self,
+        db: firestore.Client,
+        user_id: str,
+        amount: int,
+        write_results: Optional[List[Any]],
+        index: int,
+        fallback_xp: int,
+    ) -> int:
+        """
+        Read the post-increment XP from the commit results, sync the stored
+        level if this award crossed a threshold and update the leaderboards.
+        Returns the new total XP.
+        `fallback_xp` is used when the server did not return the transform result.
+        """
+        new_total_xp = fallback_xp
+        try:
+            new_total_xp = int(transform_number(write_results[index].transform_results[0]))
+        except (TypeError, IndexError, AttributeError, ValueError):
+            pass
+        if crosses_threshold(new_total_xp - amount, new_total_xp):
+            self.sync_level(db, user_id)
+        leaderboard.record(user_id, new_total_xp)
+        friends_leaderboard.invalidate_member(user_id)
+        return new_total_xp
+
+    def award(self, db: firestore.Client, user_id: str, amount: int, source: str, ref_id: Optional[str] = None, current_xp: int = 0) -> int:
+        """
+        Award XP on its own. Returns the new total XP.
+        """
+        batch = db.batch()
+        index = self.add_to_batch(db, batch, user_id, amount, source, ref_id)
+        results = batch.commit()
+        return self.apply_result(db, user_id, amount, results, index, current_xp + amount)
+
+    def sync_level(self, db: firestore.Client, user_id: str) -> Dict[str, Any]:
+        """
+        Store the level and rank matching the user's current XP.
+        Runs in a transaction so two awards crossing thresholds at once cannot
+        leave a stale level behind. Only writes if something changed.
+        """
+        ref = db.collection(self.parent_collection).document(user_id)
+
+        @firestore.transactional
+        def _sync(transaction) -> Dict[str, Any]:
+            snapshot = ref.get(transaction=transaction)
+            data = snapshot.to_dict() or {}
+            xp = data.get("xp") or 0
+            level = data.get("level") or 1
+            if level_matches(level, xp) and data.get("rank"):
+                return {"level": level, "rank": data["rank"]}
+            level = calculate_level(xp)
+            fields = {"level": level, "rank": get_rank(level)}
+            transaction.update(ref, fields)
+            crud_user.bump_cache_version(db, user_id, "dashboard", batch=transaction)
+            return fields
+
+        return _sync(db.transaction())
+
+xp_ledger = XPService()
@@ -0,0 +1,42 @@
+"""
+Cost of evaluating achievement rules per event.
+
+Measures the in-process part of an event (counter deltas + threshold checks),
+which is all the engine adds to a request besides the one Increment write;
+no document is read unless a badge is unlocked.
+
+Run from backend/:
+    python -m benchmarks.bench_achievements
+"""
+import random
+import timeit
+
+from app.core.achievements import (
+    CONTENT_IMPORTED, POST_RATED, RULES, USER_FOLLOWED, WORKOUT_LOGGED,
+    counter_deltas, crossed_rules,
+)
+
+def evaluate(event: str, payload: dict, totals: dict) -> list:
+    deltas = counter_deltas(event, payload)
+    return crossed_rules(deltas, totals)
+
+def run():
+    random.seed(1)
+    totals = {"workouts": 57, "volume_kg": 48_000, "followers": 12, "imports": 3, "ratings_given": 9}
+    cases = [
+        ("workout, 0 sets", WORKOUT_LOGGED, {"logs": []}),
+        ("workout, 30 sets", WORKOUT_LOGGED, {"logs": [{"reps": random.randint(5, 12), "weight_kg": random.choice([40, 60, 80])} for _ in range(30)]}),
+        ("workout, 200 sets", WORKOUT_LOGGED, {"logs": [{"reps": random.randint(5, 12), "weight_kg": random.choice([40, 60, 80])} for _ in range(200)]}),
+        ("follow", USER_FOLLOWED, {}),
+        ("import", CONTENT_IMPORTED, {"content_type": "routine"}),
+        ("rate post", POST_RATED, {"post_id": "p"}),
+    ]
+    loops = 20_000
+    print(f"{len(RULES)} rules")
+    print(f"{'event':>20} {'us/event':>9}")
+    for name, event, payload in cases:
+        t = timeit.timeit(lambda: evaluate(event, payload, totals), number=loops) / loops * 1e6
+        print(f"{name:>20} {t:>9.2f}")
+
+if __name__ == "__main__":
+    run()
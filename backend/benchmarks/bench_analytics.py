@@ -0,0 +1,90 @@
+"""
+Training analytics cost for users with long histories.
+
+Times building the NumPy arrays from stored workouts (row and columnar log
+encodings) and computing every metric, against a plain-Python loop that
+computes the same metrics from the per-set dicts.
+
+Run from backend/:
+    python -m benchmarks.bench_analytics
+"""
+import random
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+from app.core.analytics import HistoryBuilder, compute_analytics
+from app.core.workout_codec import encode_logs
+
+N_EXERCISES = 40
+MUSCLE_GROUPS = ["chest", "back", "legs", "shoulders", "arms", "core"]
+
+def make_history(n_sessions: int, sets_per_session: int = 20):
+    exercise_ids = [f"ex{i:02d}" for i in range(N_EXERCISES)]
+    info = {ex: {"name": ex, "muscle_group": MUSCLE_GROUPS[i % len(MUSCLE_GROUPS)]} for i, ex in enumerate(exercise_ids)}
+    start = date.today() - timedelta(days=n_sessions)
+    workouts = []
+    for s in range(n_sessions):
+        chosen = random.sample(exercise_ids, 5)
+        logs = [{
+            "exercise_id": chosen[i % 5],
+            "set_number": i // 5 + 1,
+            "reps": random.randint(3, 12),
+            "weight_kg": random.choice([20, 40, 60, 80, 100, 120]),
+            "created_at": "2024-01-01T10:00:00",
+        } for i in range(sets_per_session)]
+        workouts.append((start + timedelta(days=s), 3600, logs))
+    return workouts, info
+
+def build(workouts, columnar: bool):
+    builder = HistoryBuilder()
+    for day, duration, logs in workouts:
+        if columnar:
+            builder.add_workout(day, duration, packed=logs)
+        else:
+            builder.add_workout(day, duration, logs=logs)
+    return builder
+
+def python_baseline(workouts, info, weeks: int = 12):
+    first = date.today() - timedelta(days=date.today().weekday() + 7 * (weeks - 1))
+    volume = defaultdict(float)
+    weekly_best = defaultdict(float)
+    best = defaultdict(float)
+    tonnage = defaultdict(float)
+    sessions = []
+    for day, duration, logs in workouts:
+        week = (day - first).days // 7
+        session_tonnage = 0.0
+        for log in logs:
+            v = log["reps"] * log["weight_kg"]
+            e = log["weight_kg"] * (1 + log["reps"] / 30)
+            session_tonnage += v
+            best[log["exercise_id"]] = max(best[log["exercise_id"]], e)
+            if week >= 0:
+                volume[(log["exercise_id"], week)] += v
+                weekly_best[(log["exercise_id"], week)] = max(weekly_best[(log["exercise_id"], week)], e)
+                tonnage[(info[log["exercise_id"]]["muscle_group"], week)] += v
+        sessions.append(session_tonnage / (duration / 60))
+    return volume, weekly_best, best, tonnage, sessions
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+def run():
+    random.seed(1)
+    print(f"{'sessions':>9} {'sets':>8} {'build rows ms':>14} {'build packed ms':>16} {'compute ms':>11} {'python loop ms':>15}")
+    for n_sessions in (1_000, 5_000, 10_000, 20_000):
+        workouts, info = make_history(n_sessions)
+        packed = [(day, duration, encode_logs(logs)) for day, duration, logs in workouts]
+
+        builder, t_rows = timed(build, workouts, False)
+        _, t_packed = timed(build, packed, True)
+        arrays = builder.build()
+        _, t_compute = timed(compute_analytics, arrays, builder.exercise_ids, info, date.today(), 12, "epley")
+        _, t_python = timed(python_baseline, workouts, info)
+        print(f"{n_sessions:>9} {len(arrays['set_reps']):>8} {t_rows:>14.1f} {t_packed:>16.1f} {t_compute:>11.1f} {t_python:>15.1f}")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,103 @@
+"""
+Latency of POST /tracking/log-session: the old sequential flow
+(one round trip per read and write) vs. parallel reads + one batched commit.
+
+Needs a Firestore to talk to; point it at the emulator:
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 python -m benchmarks.bench_log_session
+"""
+import os
+import statistics
+import time
+from datetime import date, datetime
+
+from google.cloud import firestore
+
+from app.core.gamification import calculate_level
+from app.schemas.tracking import WorkoutLogCreate, WorkoutSessionLog
+from app.services.routine import routine as crud_routine
+from app.services.session import log_workout_session
+from app.services.social import content_rating as crud_rating
+from app.services.summary import daily_summary
+from app.services.tracking import scheduled_workout as crud_sw
+from app.services.user import user as crud_user
+
+RUNS = 30
+
+def log_session_sequential(db: firestore.Client, current_user, session_in: WorkoutSessionLog) -> dict:
+    """
+    The previous endpoint body, kept here as the baseline.
+    """
+    workout_data = {
+        "user_id": current_user.id,
+        "routine_id": session_in.routine_id,
+        "scheduled_date": date.today().isoformat(),
+        "status": 'completed',
+        "duration_seconds": session_in.duration_seconds,
+        "calories_burned": session_in.calories_burned,
+        "created_at": datetime.utcnow().isoformat(),
+        "logs": [crud_sw.build_log(log_item) for log_item in session_in.logs],
+    }
+    workout = crud_sw.create(db=db, obj_in=workout_data)
+    routine = crud_routine.get(db, id=session_in.routine_id)
+    daily_summary.record_workout(
+        db,
+        user_id=current_user.id,
+        date_str=workout_data["scheduled_date"],
+        routine_id=session_in.routine_id,
+        routine_name=routine.name if routine else None,
+        completed=True,
+        calories_burned=session_in.calories_burned,
+        duration_seconds=session_in.duration_seconds,
+    )
+    existing = crud_rating.get_by_rater_and_content(db, rater_id=current_user.id, content_type='routine', content_id=session_in.routine_id)
+    if existing:
+        crud_rating.update(db, id=existing.id, obj_in={"score": session_in.rating})
+    else:
+        crud_rating.create(db=db, obj_in={"rater_id": current_user.id, "content_type": 'routine', "content_id": session_in.routine_id, "score": session_in.rating})
+    xp_gained = int(session_in.calories_burned / 2) if session_in.calories_burned else 50
+    user_data = crud_user.get(db, id=current_user.id)
+    new_total_xp = (user_data.xp or 0) + xp_gained
+    crud_user.update(db, id=current_user.id, obj_in={"xp": new_total_xp})
+    return {"workout": workout, "new_level": calculate_level(new_total_xp)}
+
+def timed(fn, *args) -> float:
+    start = time.perf_counter()
+    fn(*args)
+    return (time.perf_counter() - start) * 1000
+
+def run():
+    if not os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        raise SystemExit("Set FIRESTORE_EMULATOR_HOST; this benchmark writes test data.")
+    db = firestore.Client(project="bench-log-session")
+
+    user_id = "bench-user"
+    db.collection("users").document(user_id).set({"username": "bench", "email": "bench@example.com", "xp": 0})
+    routine_ref = db.collection("routines").document("bench-routine")
+    routine_ref.set({"name": "Bench Routine", "creator_id": user_id, "is_public": False})
+
+    session_in = WorkoutSessionLog(
+        routine_id=routine_ref.id,
+        duration_seconds=3600,
+        calories_burned=420,
+        difficulty="medium",
+        rating=4,
+        logs=[WorkoutLogCreate(exercise_id=f"ex{i % 6}", set_number=i % 4 + 1, reps=10, weight_kg=60) for i in range(24)],
+    )
+
+    results = {}
+    for name, fn in (("sequential", log_session_sequential), ("parallel+batch", log_workout_session)):
+        samples = []
+        for _ in range(RUNS):
+            user = crud_user.get(db, id=user_id)
+            samples.append(timed(fn, db, user, session_in))
+        results[name] = samples
+
+    print(f"{'flow':>16} {'p50 ms':>8} {'p95 ms':>8} {'mean ms':>8}")
+    for name, samples in results.items():
+        samples.sort()
+        p95 = samples[int(len(samples) * 0.95) - 1]
+        print(f"{name:>16} {statistics.median(samples):>8.1f} {p95:>8.1f} {statistics.mean(samples):>8.1f}")
+
+if __name__ == "__main__":
+    run()
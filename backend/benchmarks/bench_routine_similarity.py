@@ -0,0 +1,86 @@
+"""
+Similar-routine query latency against catalog size.
+
+Builds a SimilarityIndex over synthetic public routines (exercise popularity
+skewed like a real catalog, 4-20 exercises each), then times incremental
+adds / removes and top-10 queries, against a plain-Python cosine scan over
+the routines' dict vectors.
+
+Run from backend/:
+    python -m benchmarks.bench_routine_similarity
+"""
+import math
+import random
+import time
+
+import numpy as np
+
+from app.core.similarity import SimilarityIndex, routine_vector
+
+N_EXERCISES = 400
+MUSCLE_GROUPS = ["chest", "back", "legs", "shoulders", "arms", "core", "glutes", "cardio"]
+QUERIES = 200
+UPDATES = 1_000
+
+def make_snapshot(rng: random.Random, weights):
+    chosen = set(rng.choices(range(N_EXERCISES), weights=weights, k=rng.randint(4, 20)))
+    entries = [{
+        "exercise_id": f"ex{i:03d}",
+        "target_sets": rng.randint(2, 5),
+        "exercise": {"muscle_group": MUSCLE_GROUPS[i % len(MUSCLE_GROUPS)]},
+    } for i in chosen]
+    return {"days": [{"day_of_week": 1, "exercises": entries}]}
+
+def python_top_k(vectors, query, k=10):
+    q_norm = math.sqrt(sum(w * w for w in query.values()))
+    scores = []
+    for item_id, vector in vectors.items():
+        dot = sum(w * vector.get(f, 0.0) for f, w in query.items())
+        if dot:
+            scores.append((dot / (q_norm * math.sqrt(sum(w * w for w in vector.values()))), item_id))
+    scores.sort(reverse=True)
+    return scores[:k]
+
+def percentile_ms(samples, p):
+    return float(np.percentile(samples, p)) * 1000
+
+def run():
+    rng = random.Random(1)
+    # Zipf-like popularity: a few staple lifts appear in most routines
+    weights = [1 / (rank + 1) for rank in range(N_EXERCISES)]
+    print(f"{'routines':>9} {'build s':>8} {'add us':>7} {'remove us':>10} {'query p50 ms':>13} {'query p99 ms':>13} {'python scan ms':>15}")
+    for n_routines in (1_000, 10_000, 50_000, 100_000):
+        vectors = {f"r{i}": routine_vector(make_snapshot(rng, weights)) for i in range(n_routines)}
+        queries = [routine_vector(make_snapshot(rng, weights)) for _ in range(QUERIES)]
+
+        index = SimilarityIndex()
+        start = time.perf_counter()
+        index.load(vectors.items())
+        t_build = time.perf_counter() - start
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            index.top_k(query, 10)
+            latencies.append(time.perf_counter() - start)
+
+        extra = [(f"new{i}", routine_vector(make_snapshot(rng, weights))) for i in range(UPDATES)]
+        start = time.perf_counter()
+        for item_id, vector in extra:
+            index.add(item_id, vector)
+        t_add = (time.perf_counter() - start) / UPDATES * 1e6
+        start = time.perf_counter()
+        for item_id, _ in extra:
+            index.remove(item_id)
+        t_remove = (time.perf_counter() - start) / UPDATES * 1e6
+
+        start = time.perf_counter()
+        for query in queries[:5]:
+            python_top_k(vectors, query)
+        t_python = (time.perf_counter() - start) / 5 * 1000
+
+        print(f"{n_routines:>9} {t_build:>8.2f} {t_add:>7.1f} {t_remove:>10.1f} "
+              f"{percentile_ms(latencies, 50):>13.2f} {percentile_ms(latencies, 99):>13.2f} {t_python:>15.1f}")
+
+if __name__ == "__main__":
+    run()
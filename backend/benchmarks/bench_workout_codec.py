@@ -0,0 +1,52 @@
+"""
+Size and latency of the columnar workout log encoding vs. the row layout.
+
+Run from backend/:
+    python -m benchmarks.bench_workout_codec
+"""
+import random
+import timeit
+import uuid
+from datetime import datetime, timedelta
+
+from app.core.workout_codec import encode_logs, decode_logs
+from app.schemas.tracking import ScheduledWorkout
+from app.core.doc_size import estimate_size
+
+def make_session(n_sets: int, n_exercises: int = 8) -> list:
+    workout_id = uuid.uuid4().hex[:20]
+    exercise_ids = [uuid.uuid4().hex[:20] for _ in range(n_exercises)]
+    start = datetime(2024, 1, 1, 10, 0, 0)
+    logs = []
+    for i in range(n_sets):
+        logs.append({
+            "id": str(uuid.uuid4()),
+            "workout_id": workout_id,
+            "exercise_id": exercise_ids[i * n_exercises // n_sets],
+            "set_number": i % 5 + 1,
+            "reps": random.randint(5, 12),
+            "weight_kg": random.choice([20, 40, 60, 62.5, 80, 100, 102.5]),
+            "notes": None,
+            "created_at": (start + timedelta(seconds=90 * i)).isoformat(),
+        })
+    return logs
+
+def run():
+    random.seed(1)
+    print(f"{'sets':>6} {'rows B':>9} {'packed B':>9} {'ratio':>6} {'encode us':>10} {'decode us':>10} {'rows->model us':>15} {'packed->model us':>17}")
+    for n_sets in (20, 100, 300, 1000):
+        logs = make_session(n_sets)
+        packed = encode_logs(logs)
+        base = {"user_id": "u", "routine_id": "r", "scheduled_date": "2024-01-01", "status": "completed", "created_at": "2024-01-01T10:00:00"}
+
+        rows_size = estimate_size(logs)
+        packed_size = estimate_size(packed)
+        loops = 200
+        t_enc = timeit.timeit(lambda: encode_logs(logs), number=loops) / loops * 1e6
+        t_dec = timeit.timeit(lambda: decode_logs(packed, "w"), number=loops) / loops * 1e6
+        t_rows_model = timeit.timeit(lambda: ScheduledWorkout(id="w", logs=logs, **base), number=loops) / loops * 1e6
+        t_packed_model = timeit.timeit(lambda: ScheduledWorkout(id="w", logs=decode_logs(packed, "w"), **base), number=loops) / loops * 1e6
+        print(f"{n_sets:>6} {rows_size:>9} {packed_size:>9} {rows_size / packed_size:>6.1f} {t_enc:>10.1f} {t_dec:>10.1f} {t_rows_model:>15.1f} {t_packed_model:>17.1f}")
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,27 @@
+from app.core.achievements import (
+    CONTENT_IMPORTED, RULES_BY_ID, USER_FOLLOWED, USER_UNFOLLOWED, WORKOUT_LOGGED, counter_deltas, crossed_rules,
+)
+
+
+def test_counter_deltas():
+    logs = [{"reps": 5, "weight_kg": 100}, {"reps": 10, "weight_kg": 20.5}, {"reps": None, "weight_kg": 50}]
+    assert counter_deltas(WORKOUT_LOGGED, {"logs": logs}) == {"workouts": 1, "volume_kg": 705}
+    # No volume without sets
+    assert counter_deltas(WORKOUT_LOGGED, {}) == {"workouts": 1}
+    assert counter_deltas(USER_FOLLOWED, {}) == {"followers": 1}
+    assert counter_deltas(USER_UNFOLLOWED, {}) == {"followers": -1}
+    assert counter_deltas(CONTENT_IMPORTED, {}) == {"imports": 1}
+    assert counter_deltas("unknown", {}) == {}
+
+
+def test_crossed_rules():
+    crossed = crossed_rules({"workouts": 1, "volume_kg": 12_000}, {"workouts": 10, "volume_kg": 12_500})
+    assert sorted(rule.id for rule, _ in crossed) == ["volume_10k", "workouts_10"]
+    assert (RULES_BY_ID["workouts_10"], 10) in crossed
+
+
+def test_rules_are_not_crossed_twice_or_backwards():
+    assert crossed_rules({"workouts": 1}, {"workouts": 11}) == []
+    # Losing a follower and regaining it crosses again, which callers dedupe by awarded id
+    assert crossed_rules({"followers": -1}, {"followers": 49}) == []
+    assert [rule.id for rule, _ in crossed_rules({"followers": 1}, {"followers": 50})] == ["followers_50"]
@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+from app.core.activity import BITMAP_BYTES, DAYS_PER_YEAR, active_days, day_index, empty_year, mark_day
+
+
+def test_mark_day_sets_one_bit_and_counts():
+    bitmap, intensity = mark_day(None, None, date(2024, 1, 10))
+    assert len(bitmap) == BITMAP_BYTES and len(intensity) == DAYS_PER_YEAR
+    assert bitmap[1] == 1 << 1
+    assert intensity[9] == 1
+    bitmap, intensity = mark_day(bitmap, intensity, date(2024, 1, 10))
+    assert active_days(bitmap) == 1
+    assert intensity[9] == 2
+
+
+def test_matches_a_set_of_days():
+    days = {date(2024, 1, 1) + timedelta(days=i * i % 366) for i in range(100)}
+    bitmap, intensity = empty_year()
+    for day in sorted(days):
+        bitmap, intensity = mark_day(bitmap, intensity, day)
+    assert active_days(bitmap) == len(days)
+    assert {i for i in range(DAYS_PER_YEAR) if bitmap[i >> 3] >> (i & 7) & 1} == {day_index(d) for d in days}
+
+
+def test_leap_day_and_saturation():
+    assert day_index(date(2024, 12, 31)) == 365
+    assert day_index(date(2023, 12, 31)) == 364
+    bitmap, intensity = None, None
+    for _ in range(300):
+        bitmap, intensity = mark_day(bitmap, intensity, date(2024, 12, 31))
+    assert intensity[365] == 255
+    assert active_days(bitmap) == 1
+    assert active_days(None) == 0
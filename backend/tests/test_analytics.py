@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+
+from app.core.analytics import HistoryBuilder, compute_analytics, estimate_1rm
+from app.core.workout_codec import encode_logs
+
+TODAY = date(2024, 3, 13)  # a Wednesday
+INFO = {
+    "squat": {"name": "Squat", "muscle_group": "legs"},
+    "bench": {"name": "Bench", "muscle_group": "chest"},
+}
+
+
+def test_estimate_1rm():
+    weight, reps = np.array([100.0, 100.0, 100.0, 50.0]), np.array([1, 10, 0, 40])
+    assert estimate_1rm(weight, reps).tolist() == pytest.approx([100.0, 100 * (1 + 10 / 30), 0.0, 50 * (1 + 40 / 30)])
+    brzycki = estimate_1rm(weight, reps, "brzycki")
+    assert brzycki[:3].tolist() == pytest.approx([100.0, 100 * 36 / 27, 0.0])
+    assert np.isnan(brzycki[3])
+    with pytest.raises(ValueError):
+        estimate_1rm(weight, reps, "lombardi")
+
+
+def workouts():
+    return [
+        (TODAY - timedelta(days=14), 3600, [
+            {"exercise_id": "squat", "reps": 5, "weight_kg": 100},
+            {"exercise_id": "squat", "reps": 5, "weight_kg": 110},
+        ]),
+        (TODAY, 1800, [
+            {"exercise_id": "bench", "reps": 10, "weight_kg": 60},
+            {"exercise_id": "squat", "reps": 3, "weight_kg": 120},
+        ]),
+        # Outside a 4 week window
+        (TODAY - timedelta(days=70), None, [{"exercise_id": "bench", "reps": 1, "weight_kg": 100}]),
+    ]
+
+
+def analytics(packed: bool):
+    builder = HistoryBuilder()
+    for day, duration, logs in workouts():
+        if packed:
+            builder.add_workout(day, duration, packed=encode_logs(logs))
+        else:
+            builder.add_workout(day, duration, logs=logs)
+    return compute_analytics(builder.build(), builder.exercise_ids, INFO, TODAY, weeks=4)
+
+
+def test_compute_analytics():
+    result = analytics(packed=False)
+    assert result["weeks"] == ["2024-02-19", "2024-02-26", "2024-03-04", "2024-03-11"]
+    squat, bench = result["exercises"]
+    assert squat["exercise_id"] == "squat"
+    assert squat["volume"] == [0.0, 1050.0, 0.0, 360.0]
+    assert squat["best_estimated_1rm"] == round(120 * 1.1, 1)
+    assert bench["volume"] == [0.0, 0.0, 0.0, 600.0]
+    # The all-time best includes the old single
+    assert bench["best_estimated_1rm"] == 100.0
+    assert {g["muscle_group"]: g["tonnage"][-1] for g in result["muscle_groups"]} == {"legs": 360.0, "chest": 600.0}
+    assert [s["date"] for s in result["sessions"]] == ["2024-02-28", "2024-03-13"]
+    assert result["sessions"][1]["kg_per_minute"] == 32.0
+    assert result["totals"] == {"workouts": 3, "sets": 5, "tonnage": 2110.0}
+
+
+def test_packed_logs_match_dict_logs():
+    assert analytics(packed=True) == analytics(packed=False)
+
+
+def test_empty_history():
+    builder = HistoryBuilder()
+    result = compute_analytics(builder.build(), [], {}, TODAY, weeks=2)
+    assert result["exercises"] == [] and result["sessions"] == []
+    assert result["totals"] == {"workouts": 0, "sets": 0, "tonnage": 0.0}
@@ -0,0 +1,39 @@
+from fastapi import Response
+from starlette.requests import Request
+
+from app.api.cache import CACHE_POLICIES, check_not_modified, compute_etag, etag_matches
+
+
+def make_request(if_none_match=None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+
+def test_compute_etag_is_weak_and_stable():
+    etag = compute_etag("exercises", 3, 0, 100)
+    assert etag.startswith('W/"') and etag.endswith('"')
+    assert etag == compute_etag("exercises", 3, 0, 100)
+    assert etag != compute_etag("exercises", 4, 0, 100)
+
+
+def test_etag_matches_weakly():
+    etag = compute_etag("x")
+    strong = etag.removeprefix("W/")
+    assert etag_matches(make_request(etag), etag)
+    assert etag_matches(make_request(strong), etag)
+    assert etag_matches(make_request(f'"other", {etag}'), etag)
+    assert etag_matches(make_request("*"), etag)
+    assert not etag_matches(make_request('"other"'), etag)
+    assert not etag_matches(make_request(), etag)
+
+
+def test_check_not_modified():
+    etag = compute_etag("x")
+    response = Response()
+    assert check_not_modified(make_request(), response, etag) is None
+    assert response.headers["etag"] == etag
+    assert response.headers["cache-control"] == CACHE_POLICIES["private"]
+
+    not_modified = check_not_modified(make_request(etag), Response(), etag, policy="catalog")
+    assert not_modified.status_code == 304
+    assert not_modified.headers["cache-control"] == CACHE_POLICIES["catalog"]
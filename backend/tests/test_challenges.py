@@ -0,0 +1,26 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.core.challenges import active_windows, session_volume, window_end, window_key
+
+
+@pytest.mark.parametrize("day", [date(2024, 1, 1) + timedelta(days=i) for i in range(0, 400, 3)])
+def test_window_end_is_the_last_day_with_the_same_key(day):
+    for period in ("week", "month"):
+        end = window_end(period, day)
+        assert end >= day
+        assert window_key(period, end) == window_key(period, day)
+        assert window_key(period, end + timedelta(days=1)) != window_key(period, day)
+
+
+def test_window_keys():
+    # ISO week 1 of 2025 starts on Monday 2024-12-30
+    assert active_windows(date(2024, 12, 31)) == [("week", "2025-W01"), ("month", "2024-12")]
+    assert window_end("month", date(2024, 2, 10)) == date(2024, 2, 29)
+    assert window_end("week", date(2024, 2, 10)) == date(2024, 2, 11)
+
+
+def test_session_volume():
+    assert session_volume([{"reps": 5, "weight_kg": 100}, {"reps": 3, "weight_kg": 2.5}, {"reps": 10}]) == 507
+    assert session_volume([]) == 0
@@ -0,0 +1,30 @@
+from math import sqrt
+
+import pytest
+
+from app.core.gamification import calculate_level, crosses_threshold, get_rank, level_bounds, level_matches
+
+
+def test_levels_at_thresholds():
+    assert [calculate_level(xp) for xp in (-5, 0, 99, 100, 399, 400, 899, 900)] == [1, 1, 1, 2, 2, 3, 3, 4]
+    # Exact where a float sqrt rounds wrong
+    big = (10 ** 7) ** 2 * 100
+    assert calculate_level(big - 1) == 10 ** 7
+    assert calculate_level(big) == 10 ** 7 + 1
+
+
+@pytest.mark.parametrize("xp", list(range(0, 5000, 37)) + [980_099, 980_100])
+def test_level_bounds_and_matches(xp):
+    level = calculate_level(xp)
+    assert level == int(sqrt(xp / 100)) + 1
+    start, end = level_bounds(level)
+    assert start <= xp < end
+    assert level_matches(level, xp)
+    assert not level_matches(level + 1, xp)
+    assert crosses_threshold(xp, end) and not crosses_threshold(start, end - 1)
+
+
+def test_ranks():
+    assert [get_rank(level) for level in (1, 10, 11, 31, 51, 71, 91, 150)] == [
+        "Bronze", "Bronze", "Silver", "Gold", "Platinum", "Diamond", "Champion", "Champion",
+    ]
@@ -0,0 +1,91 @@
+from datetime import date, timedelta
+
+import pytest
+from pydantic import ValidationError
+
+from app.core.doc_size import estimate_size
+from app.core.periods import month_key, week_key
+from app.schemas.nutrition import MAX_BULK_LOGS, NutritionBulkLogCreate, NutritionLogCreate
+from app.services.nutrition import nutrition_log, plan_rollup_reads, summarize_days
+
+
+def test_estimate_size():
+    assert estimate_size(None) == 1
+    assert estimate_size(3) == estimate_size(2.5) == 8
+    assert estimate_size("añ") == 4
+    assert estimate_size({"ab": [1, "x"]}) == 3 + 8 + 2
+    entry = nutrition_log.build_entry(NutritionLogCreate(calories=100, food_name="Arroz"))
+    assert estimate_size([entry, entry]) == 2 * estimate_size(entry)
+
+
+def test_build_entry_ids_are_unique():
+    log = NutritionLogCreate(calories=100, food_name="Arroz")
+    first, second = nutrition_log.build_entry(log), nutrition_log.build_entry(log)
+    assert first["id"] != second["id"]
+    assert first["calories"] == 100
+    assert first["logged_at"]
+
+
+def test_bulk_logs_are_capped():
+    log = {"calories": 100, "food_name": "Arroz"}
+    assert len(NutritionBulkLogCreate(logs=[log] * MAX_BULK_LOGS).logs) == MAX_BULK_LOGS
+    with pytest.raises(ValidationError):
+        NutritionBulkLogCreate(logs=[log] * (MAX_BULK_LOGS + 1))
+    with pytest.raises(ValidationError):
+        NutritionLogCreate(calories=1, food_name="x" * 201)
+
+
+DIET = {"weekly_plan": [
+    {"day": "Monday", "meals": [
+        {"name": "Breakfast", "foods": [{"name": "Avena", "calories": 150.4, "protein": 5}]},
+        {"name": "Lunch", "foods": [{"name": "Pollo", "calories": 300, "protein": 40}, {"name": "Arroz", "calories": 200}]},
+    ]},
+]}
+
+
+def test_entries_from_diet_day():
+    entries = nutrition_log.entries_from_diet_day(DIET, "monday")
+    assert [(e["food_name"], e["meal_type"], e["calories"]) for e in entries] == [
+        ("Avena", "breakfast", 150), ("Pollo", "lunch", 300), ("Arroz", "lunch", 200),
+    ]
+    assert [e["food_name"] for e in nutrition_log.entries_from_diet_day(DIET, "Monday", meal="LUNCH")] == ["Pollo", "Arroz"]
+    assert nutrition_log.entries_from_diet_day(DIET, "Tuesday") is None
+
+
+@pytest.mark.parametrize("start,end", [
+    (date(2024, 1, 1), date(2024, 1, 1)),
+    (date(2024, 1, 29), date(2024, 2, 2)),
+    (date(2024, 1, 10), date(2024, 3, 20)),
+    (date(2023, 12, 30), date(2024, 1, 2)),
+    (date(2024, 2, 26), date(2024, 3, 3)),
+])
+def test_plan_rollup_reads_cover_the_range_once(start, end):
+    reads = plan_rollup_reads(start, end)
+    covered = []
+    for key, first, last in reads:
+        day = first
+        while day <= last:
+            # Every day is read from the rollup it belongs to
+            assert key in (week_key(day), month_key(day))
+            covered.append(day)
+            day += timedelta(days=1)
+    assert covered == [start + timedelta(days=i) for i in range((end - start).days + 1)]
+    assert len({key for key, _, _ in reads}) == len(reads)
+
+
+def test_plan_rollup_reads_prefers_a_week_within_a_month():
+    assert plan_rollup_reads(date(2024, 1, 8), date(2024, 1, 10)) == [("2024-W02", date(2024, 1, 8), date(2024, 1, 10))]
+    assert [key for key, _, _ in plan_rollup_reads(date(2024, 1, 1), date(2024, 1, 31))] == ["2024-01"]
+
+
+def test_summarize_days():
+    days = [
+        {"calories": 2000, "protein": 100.0, "carbs": 200.0, "fat": 70.0, "on_target": True},
+        {"calories": 1500, "protein": 80.0, "carbs": 150.0, "fat": 50.0, "on_target": False},
+    ]
+    summary = summarize_days(days)
+    assert summary["total_calories"] == 3500
+    assert summary["total_protein"] == 180.0
+    assert summary["average_calories"] == 1750.0
+    assert (summary["days_logged"], summary["days_on_target"]) == (2, 1)
+    assert summarize_days([])["average_calories"] == 0.0
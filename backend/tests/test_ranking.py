@@ -0,0 +1,48 @@
+import random
+
+import pytest
+
+from app.core.ranking import XPRankIndex
+
+
+def reference(xp):
+    """Brute-force ranking: most XP first, ties by user id."""
+    return [(rank, user_id, value) for rank, (user_id, value) in enumerate(sorted(xp.items(), key=lambda kv: (-kv[1], kv[0])), 1)]
+
+
+@pytest.mark.parametrize("num_buckets,bucket_width", [(1, 1), (3, 10), (7, 1), (16, 10), (100, 1)])
+def test_matches_brute_force(num_buckets, bucket_width):
+    rng = random.Random(num_buckets * 31 + bucket_width)
+    index = XPRankIndex(num_buckets, bucket_width)
+    xp = {}
+    for _ in range(500):
+        user_id = f"u{rng.randrange(50)}"
+        roll = rng.random()
+        if roll < 0.7:
+            # Past the last bucket too, which the last bucket absorbs
+            value = rng.randrange(num_buckets * bucket_width * 2)
+            index.update(user_id, value)
+            xp[user_id] = value
+        elif roll < 0.9:
+            index.remove(user_id)
+            xp.pop(user_id, None)
+        else:
+            index.load(list(xp.items()))
+
+        expected = reference(xp)
+        assert len(index) == len(xp)
+        for rank, user_id_, value in expected:
+            assert index.rank(user_id_) == rank
+            assert index.get(user_id_) == value
+        offset, limit = rng.randrange(len(expected) + 2), rng.randrange(1, 20)
+        assert index.top(offset, limit) == expected[offset:offset + limit]
+
+
+def test_missing_user():
+    index = XPRankIndex(8)
+    index.update("a", 5)
+    assert index.rank("b") is None
+    assert index.percentile("b") is None
+    assert "b" not in index
+    index.remove("b")
+    assert len(index) == 1
@@ -0,0 +1,30 @@
+from app.core.records import merge_records, weight_key
+
+
+def test_first_sets_set_records_without_breaks():
+    changes, breaks = merge_records(None, [{"reps": 5, "weight_kg": 100}, {"reps": 8, "weight_kg": 80}], "2024-01-01", "w1")
+    assert changes["max_weight"]["weight_kg"] == 100
+    assert changes["volume_set"]["value"] == 8 * 80
+    assert changes["reps_at_weight"] == {weight_key(100): 5, weight_key(80): 8}
+    assert breaks == []
+
+
+def test_breaks_are_reported_once_against_the_stored_record():
+    record, _ = merge_records(None, [{"reps": 5, "weight_kg": 100}], "2024-01-01")
+    changes, breaks = merge_records(record, [{"reps": 5, "weight_kg": 105}, {"reps": 3, "weight_kg": 110}], "2024-01-08", "w2")
+    by_type = {b["type"]: b for b in breaks if b["type"] != "reps_at_weight"}
+    assert by_type["max_weight"]["previous"] == 100
+    assert by_type["max_weight"]["value"] == 110
+    assert changes["max_weight"]["workout_id"] == "w2"
+
+
+def test_no_improvement_changes_nothing():
+    record, _ = merge_records(None, [{"reps": 5, "weight_kg": 100}], "2024-01-01")
+    assert merge_records(record, [{"reps": 5, "weight_kg": 100}, {"reps": 0, "weight_kg": 200}], "2024-01-08") == ({}, [])
+
+
+def test_more_reps_at_a_known_weight():
+    record, _ = merge_records(None, [{"reps": 5, "weight_kg": 102.5}], "2024-01-01")
+    changes, breaks = merge_records(record, [{"reps": 6, "weight_kg": 102.50}], "2024-01-08")
+    assert changes["reps_at_weight"][weight_key(102.5)] == 6
+    assert {"type": "reps_at_weight", "value": 6, "previous": 5, "reps": 6, "weight_kg": 102.5} in breaks
@@ -0,0 +1,39 @@
+from unittest import mock
+
+from app.services.routine import routine as crud_routine
+
+SNAPSHOT_V1 = {"version": 1, "days": [{"day_of_week": 1, "exercises": [{"id": "a", "exercise_id": "squat"}]}]}
+SNAPSHOT_V2 = {"version": 2, "days": []}
+
+
+def make_db(source, archived=()):
+    """Client whose routine reads return `source` and whose versions query returns `archived` snapshots."""
+    db = mock.MagicMock()
+    doc = db.collection.return_value.document.return_value
+    doc.get.return_value = mock.Mock(exists=source is not None, to_dict=lambda: source)
+    versions = doc.collection.return_value.where.return_value.order_by.return_value.limit.return_value
+    versions.stream.return_value = [mock.Mock(to_dict=lambda s=s: {"version": s["version"], "snapshot": s}) for s in archived]
+    return db
+
+
+def test_own_snapshot_needs_no_read():
+    db = make_db(None)
+    assert crud_routine.resolve_snapshot(db, {"snapshot": SNAPSHOT_V1}) is SNAPSHOT_V1
+    assert crud_routine.resolve_snapshot(db, {}) is None
+    db.collection.assert_not_called()
+
+
+def test_import_resolves_to_the_current_source():
+    db = make_db({"snapshot": SNAPSHOT_V1})
+    assert crud_routine.resolve_snapshot(db, {"source_routine_id": "src", "source_version": 1}) == SNAPSHOT_V1
+    db.collection.return_value.document.return_value.collection.assert_not_called()
+
+
+def test_import_of_an_edited_source_resolves_to_the_archive():
+    db = make_db({"snapshot": SNAPSHOT_V2}, archived=[SNAPSHOT_V1])
+    assert crud_routine.resolve_snapshot(db, {"source_routine_id": "src", "source_version": 1}) == SNAPSHOT_V1
+
+
+def test_import_of_a_deleted_source():
+    assert crud_routine.resolve_snapshot(make_db(None, archived=[SNAPSHOT_V1]), {"source_routine_id": "src", "source_version": 1}) == SNAPSHOT_V1
+    assert crud_routine.resolve_snapshot(make_db(None), {"source_routine_id": "src", "source_version": 1}) is None
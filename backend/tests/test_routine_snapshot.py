@@ -0,0 +1,117 @@
+import itertools
+
+import pytest
+
+from app.core.routine_snapshot import apply_ops, build_snapshot, flatten, patch_exercise, snapshot_exercise_ids
+
+EXERCISES = {
+    "squat": {"name": "Squat", "muscle_group": "legs", "video_url": None},
+    "bench": {"name": "Bench Press", "muscle_group": "chest", "video_url": None},
+    "row": {"name": "Row", "muscle_group": "back", "video_url": None},
+}
+
+
+def make_snapshot():
+    rows = [
+        {"id": "a", "routine_id": "r1", "exercise_id": "squat", "day_of_week": 1, "order_index": 0, "target_sets": 5},
+        {"id": "b", "routine_id": "r1", "exercise_id": "bench", "day_of_week": 1, "order_index": 1, "target_sets": 3},
+        {"id": "c", "routine_id": "r1", "exercise_id": "row", "day_of_week": 3, "order_index": 0, "target_reps_max": 12},
+    ]
+    return build_snapshot(rows, EXERCISES, version=1)
+
+
+def new_ids():
+    counter = itertools.count()
+    return lambda: f"new{next(counter)}"
+
+
+def layout(rows):
+    """{day: [row ids in order]} of apply_ops' rows."""
+    days = {}
+    for row in sorted(rows.values(), key=lambda r: (r["day_of_week"], r["order_index"])):
+        days.setdefault(row["day_of_week"], []).append(row["id"])
+    return days
+
+
+def test_build_snapshot_groups_rows_by_day():
+    snapshot = make_snapshot()
+    assert [day["day_of_week"] for day in snapshot["days"]] == [1, 3]
+    assert [entry["id"] for entry in snapshot["days"][0]["exercises"]] == ["a", "b"]
+    assert snapshot["days"][0]["exercises"][0]["exercise"] == {"id": "squat", **EXERCISES["squat"]}
+    assert "routine_id" not in snapshot["days"][0]["exercises"][0]
+    assert snapshot_exercise_ids(snapshot) == ["bench", "row", "squat"]
+    assert [entry["routine_id"] for entry in flatten(snapshot, "r2")] == ["r2"] * 3
+
+
+def test_patch_exercise_bumps_version_only_when_referenced():
+    snapshot = make_snapshot()
+    assert patch_exercise(snapshot, "squat", dict(EXERCISES["squat"], name="Back Squat"))
+    assert snapshot["version"] == 2
+    assert snapshot["days"][0]["exercises"][0]["exercise"]["name"] == "Back Squat"
+    assert not patch_exercise(snapshot, "deadlift", {"name": "Deadlift"})
+    assert snapshot["version"] == 2
+
+
+def test_move_across_days_renumbers_both_days():
+    rows, changed, removed = apply_ops(make_snapshot(), [{"op": "move_exercise", "row_id": "a", "day_of_week": 3, "index": 0}], new_ids())
+    assert layout(rows) == {1: ["b"], 3: ["a", "c"]}
+    assert rows["a"]["day_of_week"] == 3
+    assert [rows[r]["order_index"] for r in ("b", "a", "c")] == [0, 0, 1]
+    assert changed == {"a", "b", "c"}
+    assert removed == set()
+
+
+def test_move_within_day_clamps_index():
+    rows, changed, _ = apply_ops(make_snapshot(), [{"op": "move_exercise", "row_id": "a", "index": 99}], new_ids())
+    assert layout(rows) == {1: ["b", "a"], 3: ["c"]}
+    assert changed == {"a", "b"}
+
+
+def test_replace_day_drops_old_rows_and_adds_new_ones():
+    ops = [{"op": "replace_day", "day_of_week": 1, "exercises": [{"exercise_id": "row"}, {"exercise_id": "squat", "target_sets": 4}]}]
+    rows, changed, removed = apply_ops(make_snapshot(), ops, new_ids())
+    assert layout(rows) == {1: ["new0", "new1"], 3: ["c"]}
+    assert rows["new1"]["target_sets"] == 4
+    assert changed == {"new0", "new1"}
+    assert removed == {"a", "b"}
+
+
+def test_add_and_remove_renumber():
+    ops = [
+        {"op": "add_exercise", "day_of_week": 1, "index": 0, "exercise": {"exercise_id": "row"}},
+        {"op": "remove_exercise", "row_id": "b"},
+        {"op": "remove_day", "day_of_week": 3},
+    ]
+    rows, changed, removed = apply_ops(make_snapshot(), ops, new_ids())
+    assert layout(rows) == {1: ["new0", "a"]}
+    assert rows["a"]["order_index"] == 1
+    assert changed == {"new0", "a"}
+    assert removed == {"b", "c"}
+
+
+def test_update_sets_and_clears_fields():
+    ops = [{"op": "update_exercise", "row_id": "c", "exercise": {"target_sets": 4, "target_reps_max": None, "exercise_id": None}}]
+    rows, changed, _ = apply_ops(make_snapshot(), ops, new_ids())
+    assert rows["c"]["target_sets"] == 4
+    assert rows["c"]["target_reps_max"] is None
+    # exercise_id cannot be cleared
+    assert rows["c"]["exercise_id"] == "row"
+    assert changed == {"c"}
+
+
+def test_add_ignores_none_fields():
+    ops = [{"op": "add_exercise", "day_of_week": 2, "exercise": {"exercise_id": "row", "target_sets": None}}]
+    rows, _, _ = apply_ops(make_snapshot(), ops, new_ids())
+    assert "target_sets" not in rows["new0"]
+
+
+@pytest.mark.parametrize("op", [
+    {"op": "update_exercise", "row_id": "missing", "exercise": {}},
+    {"op": "add_exercise", "day_of_week": 1, "exercise": {"target_sets": 3}},
+    {"op": "add_exercise", "exercise": {"exercise_id": "row"}},
+    {"op": "replace_day", "exercises": []},
+    {"op": "rename"},
+])
+def test_invalid_ops_raise(op):
+    with pytest.raises(ValueError):
+        apply_ops(make_snapshot(), [op], new_ids())
@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+
+import pytest
+
+from app.core.schedule import expand, occurrence_id, occurs_on, parse_occurrence_id
+
+
+def test_expand_matches_occurs_on():
+    weekdays, rule_start, rule_end = [1, 3, 7], date(2024, 2, 20), date(2024, 3, 10)
+    start, end = date(2024, 2, 1), date(2024, 3, 5)
+    day, expected = start, []
+    while day <= end:
+        if occurs_on(weekdays, rule_start, rule_end, day):
+            expected.append(day)
+        day += timedelta(days=1)
+    assert list(expand(weekdays, rule_start, rule_end, start, end)) == expected
+    assert expected[0] == date(2024, 2, 21)
+    assert all(d.isoweekday() in weekdays for d in expected)
+
+
+def test_expand_outside_rule_is_empty():
+    assert list(expand([1, 2, 3, 4, 5, 6, 7], date(2024, 1, 1), date(2024, 1, 31), date(2024, 2, 1), date(2024, 2, 28))) == []
+
+
+@pytest.mark.parametrize("rule_id", ["rule", "rule_with_underscores", "abc123"])
+def test_occurrence_id_round_trip(rule_id):
+    day = date(2024, 2, 29)
+    assert parse_occurrence_id(occurrence_id(rule_id, day)) == (rule_id, day)
+
+
+@pytest.mark.parametrize("workout_id", ["plainid", "_2024-01-01", "rule_notadate", "rule_2024-13-01"])
+def test_parse_other_ids(workout_id):
+    assert parse_occurrence_id(workout_id) is None
@@ -0,0 +1,71 @@
+import math
+import random
+
+from app.core.similarity import MUSCLE_GROUP_WEIGHT, SimilarityIndex, routine_vector
+
+FEATURES = [f"ex:{i}" for i in range(40)] + [f"mg:{i}" for i in range(6)]
+
+
+def cosine(a, b):
+    dot = sum(w * b.get(f, 0.0) for f, w in a.items())
+    return dot / (math.sqrt(sum(w * w for w in a.values())) * math.sqrt(sum(w * w for w in b.values())))
+
+
+def random_vector(rng):
+    return {f: float(rng.randint(1, 5)) for f in rng.sample(FEATURES, rng.randint(1, 8))}
+
+
+def test_top_k_matches_brute_force():
+    rng = random.Random(3)
+    index = SimilarityIndex()
+    vectors = {}
+    # Enough removes to go through several compactions
+    for step in range(2000):
+        item_id = f"r{rng.randrange(80)}"
+        if rng.random() < 0.6:
+            vector = random_vector(rng)
+            index.add(item_id, vector)
+            vectors[item_id] = vector
+        else:
+            assert index.remove(item_id) == (item_id in vectors)
+            vectors.pop(item_id, None)
+        assert len(index) == len(vectors)
+
+        if step % 10 == 0:
+            query, k = random_vector(rng), rng.randint(1, 15)
+            expected = sorted(
+                ((item, cosine(query, vector)) for item, vector in vectors.items() if cosine(query, vector) > 0),
+                key=lambda pair: -pair[1],
+            )[:k]
+            got = index.top_k(query, k)
+            assert len(got) == len(expected)
+            for (_, got_score), (_, expected_score) in zip(got, expected):
+                assert abs(got_score - expected_score) < 1e-3
+
+
+def test_exclude_and_empty_vectors():
+    index = SimilarityIndex()
+    index.add("a", {"ex:1": 1.0})
+    index.add("b", {"ex:1": 1.0, "ex:2": 1.0})
+    index.add("empty", {})
+    assert "empty" not in index
+    assert [item for item, _ in index.top_k({"ex:1": 1.0}, 5)] == ["a", "b"]
+    assert [item for item, _ in index.top_k({"ex:1": 1.0}, 5, exclude=("a",))] == ["b"]
+    assert index.top_k({"ex:9": 1.0}, 5) == []
+    assert index.top_k({"ex:1": 1.0}, 0) == []
+
+
+def test_routine_vector_weights_sets_and_groups():
+    snapshot = {"days": [
+        {"day_of_week": 1, "exercises": [
+            {"exercise_id": "squat", "target_sets": 5, "exercise": {"muscle_group": "legs"}},
+            {"exercise_id": "lunge", "exercise": {"muscle_group": "legs"}},
+        ]},
+        {"day_of_week": 3, "exercises": [{"exercise_id": "squat", "target_sets": 3, "exercise": None}]},
+    ]}
+    assert routine_vector(snapshot) == {
+        "ex:squat": 8.0,
+        "ex:lunge": 3.0,
+        "mg:legs": 8.0 * MUSCLE_GROUP_WEIGHT,
+    }
+    assert routine_vector(None) == {}
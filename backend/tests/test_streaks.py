@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+
+from app.core.streaks import advance_streak, current_streaks, week_start
+
+
+def replay(days):
+    streak = None
+    for day in days:
+        streak = advance_streak(streak, day) or streak
+    return streak
+
+
+def reference(days):
+    """Longest runs of consecutive days and of consecutive weeks, from the full history."""
+    def longest(values, step):
+        best = run = 0
+        previous = None
+        for value in sorted(set(values)):
+            run = run + 1 if previous is not None and value - previous == step else 1
+            best, previous = max(best, run), value
+        return best
+    return longest(days, timedelta(days=1)), longest([week_start(d) for d in days], timedelta(weeks=1))
+
+
+def test_matches_full_history():
+    start = date(2024, 1, 1)
+    offsets = [0, 1, 2, 4, 5, 9, 15, 16, 17, 18, 30, 37, 44]
+    days = [start + timedelta(days=o) for o in offsets]
+    streak = replay(days)
+    assert (streak["longest_days"], streak["longest_weeks"]) == reference(days)
+    assert streak["last_day"] == days[-1].isoformat()
+
+
+def test_same_or_older_day_is_ignored():
+    streak = advance_streak(None, date(2024, 1, 10))
+    assert advance_streak(streak, date(2024, 1, 10)) is None
+    assert advance_streak(streak, date(2024, 1, 9)) is None
+
+
+def test_current_streaks_expire():
+    streak = replay([date(2024, 1, 1), date(2024, 1, 2)])
+    assert current_streaks(streak, date(2024, 1, 3))["current_days"] == 2
+    assert current_streaks(streak, date(2024, 1, 4))["current_days"] == 0
+    assert current_streaks(streak, date(2024, 1, 14))["current_weeks"] == 1
+    assert current_streaks(streak, date(2024, 1, 15))["current_weeks"] == 0
+    assert current_streaks(streak, date(2024, 1, 15))["longest_days"] == 2
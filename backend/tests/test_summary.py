@@ -0,0 +1,33 @@
+from google.cloud import firestore
+
+from app.services.summary import DEFAULT_MISSION_MINUTES, DEFAULT_WORKOUT_CALORIES, DEFAULT_WORKOUT_SECONDS, daily_summary
+
+
+def test_completion_defaults_apply_to_routines_without_stats():
+    assert daily_summary.completion_fields(None, None, has_routine=True) == {
+        "calories_burned": firestore.Increment(DEFAULT_WORKOUT_CALORIES),
+        "time_minutes": firestore.Increment(DEFAULT_WORKOUT_SECONDS // 60),
+        "completed_count": firestore.Increment(1),
+    }
+    assert daily_summary.completion_fields(None, None, has_routine=False)["calories_burned"] == firestore.Increment(0)
+    fields = daily_summary.completion_fields(250.7, 1830, has_routine=True)
+    assert fields["calories_burned"] == firestore.Increment(250)
+    assert fields["time_minutes"] == firestore.Increment(30)
+
+
+def test_workout_fields():
+    data = daily_summary.workout_fields(user_id="u1", date_str="2024-01-01", routine_id="r1", routine_name="Push", set_mission=True)
+    assert data["workout_count"] == firestore.Increment(1)
+    assert "completed_count" not in data
+    assert (data["mission_routine_id"], data["mission_name"], data["mission_duration"]) == ("r1", "Push", DEFAULT_MISSION_MINUTES)
+
+    data = daily_summary.workout_fields(user_id="u1", date_str="2024-01-01", completed=True)
+    assert data["completed_count"] == firestore.Increment(1)
+    assert "mission_set" not in data
+
+
+def test_contribution_matches_completion_fields():
+    assert daily_summary.contribution("pending", 500, 600, has_routine=True) == {"workout_count": 1}
+    completed = daily_summary.contribution("completed", None, None, has_routine=True)
+    assert completed.pop("workout_count") == 1
+    assert {field: firestore.Increment(amount) for field, amount in completed.items()} == daily_summary.completion_fields(None, None, has_routine=True)
@@ -0,0 +1,47 @@
+import pytest
+
+from app.core.workout_codec import decode_logs, encode_logs
+
+
+def test_round_trip():
+    logs = [
+        {"exercise_id": "squat", "set_number": 1, "reps": 5, "weight_kg": 102.5, "created_at": "2024-01-01T10:00:00"},
+        {"exercise_id": "bench", "set_number": 1, "reps": 8, "weight_kg": 60.0, "created_at": "2024-01-01T10:03:00.250000", "notes": "paused"},
+        {"exercise_id": "squat", "set_number": 2, "reps": 5, "weight_kg": 0.01, "created_at": "2024-01-01T09:59:30Z"},
+    ]
+    packed = encode_logs(logs)
+    assert packed["exercises"] == ["squat", "bench"]
+    assert packed["base_ts"] == "2024-01-01T09:59:30"
+
+    decoded = decode_logs(packed, "w1")
+    assert [log["id"] for log in decoded] == ["w1-0", "w1-1", "w1-2"]
+    for original, log in zip(logs, decoded):
+        assert log["workout_id"] == "w1"
+        for field in ("exercise_id", "set_number", "reps", "weight_kg"):
+            assert log[field] == original[field]
+        assert log["notes"] == original.get("notes")
+    assert [log["created_at"] for log in decoded] == ["2024-01-01T10:00:00", "2024-01-01T10:03:00.250000", "2024-01-01T09:59:30"]
+
+
+def test_empty():
+    assert decode_logs(encode_logs([])) == []
+
+
+def test_unknown_version():
+    packed = dict(encode_logs([]), v=99)
+    with pytest.raises(ValueError):
+        decode_logs(packed)
+
+
+@pytest.mark.parametrize("overrides", [
+    {"reps": -1},
+    {"set_number": 70000},
+    {"weight_kg": 30_000_000},
+    {"created_at": "2024-03-01T10:00:00"},
+])
+def test_out_of_range_values_are_not_packed(overrides):
+    logs = [
+        {"exercise_id": "squat", "set_number": 1, "reps": 5, "weight_kg": 100, "created_at": "2024-01-01T10:00:00"},
+        dict({"exercise_id": "squat", "set_number": 2, "reps": 5, "weight_kg": 100, "created_at": "2024-01-01T10:05:00"}, **overrides),
+    ]
+    assert encode_logs(logs) is None
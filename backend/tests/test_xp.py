@@ -0,0 +1,16 @@
+import pytest
+from google.cloud.firestore_v1.types import document
+
+from app.services.xp import transform_number
+
+
+def test_integer_and_double_transform_results():
+    assert transform_number(document.Value(integer_value=1250)) == 1250
+    assert transform_number(document.Value(double_value=1250.5)) == 1250.5
+    # A zero is still a value of its type, not a missing one
+    assert transform_number(document.Value(double_value=0.0)) == 0
+
+
+def test_non_numeric_transform_result():
+    with pytest.raises(ValueError):
+        transform_number(document.Value(string_value="1250"))